@@ -1,10 +1,23 @@
 from .broker import Broker
+from .cache import BodyCache, RequestCache
 from .client import Client
+from .codec import JsonCodec
+from .concurrency import AdaptiveLimit
 from .connection import Connection
+from .endpoint import Endpoint
 from .errors import ActivemqManagerError
+from .fleet import Fleet, FleetResult
+from .instrumentation import Instrumentation, Metrics, RequestEvent, Span, span
 from .job import ScheduledJob
+from .poller import Poller, PollerSnapshot
 from .queue import Queue
+from .registry import DestinationEvent, DestinationRegistry
+from .schema import MBeanSchema
+from .snapshot import SnapshotClient, SnapshotWriter
+from .subscription import Subscription, SubscriptionIndex
+from .topic import Topic
 from .message import Message, MessageData
+from .table import MessageTable
 
 __version__ = '0.1.0-dev'
 
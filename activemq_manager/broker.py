@@ -1,21 +1,31 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+from collections import deque
 from datetime import datetime, timedelta
 from typing import TYPE_CHECKING
 
 import httpx
-from asyncio_pool import AioPool
 
+from .cache import BodyCache, mbean_type
+from .concurrency import AdaptiveLimit, fan_out
 from .connection import Connection
 from .errors import ActivemqManagerError
-from .helpers import parse_object_name
+from .helpers import activemq_stamp_datetime, merge_config, parse_object_name, truncated_paths
+from .instrumentation import current_span, Span
 from .job import ScheduledJob
+from .poller import Poller
 from .queue import Queue
+from .registry import DestinationRegistry
+from .schema import MBeanSchema, list_path
+from .subscription import Subscription, SubscriptionIndex
+from .topic import Topic
 
 
 if TYPE_CHECKING:
-    from typing import Any, AsyncGenerator, Dict, Type, Optional
+    from os import PathLike
+    from typing import Any, AsyncGenerator, Deque, Dict, Iterable, List, Sequence, Set, Tuple, Type, Optional, Union
     from .client import Client
 
 
@@ -26,74 +36,434 @@ class Broker:
     dtformat: str = '%Y-%m-%d %H:%M:%S'
     _connection_class: Type[Connection] = Connection
     _queue_class: Type[Queue] = Queue
+    _topic_class: Type[Topic] = Topic
+    # the job scheduler is scanned in a single request when it holds few jobs and otherwise in
+    # time shards whose width adapts to keep the number of jobs in each near job_shard_target
+    job_shard_target: int = 5000
+    job_shard_initial_width: timedelta = timedelta(days=1)
+    # upper bound on the estimated memory used by cached message bodies
+    body_cache_bytes: int = 32 * 1024 * 1024
+    # depth of the jolokia list tree fetched for a schema: attr/op => name => metadata => args;
+    # with less the argument lists are cut off and the operation signatures are lost
+    schema_max_depth: int = 4
 
-    def __init__(self, client: Client, name: str = 'localhost', workers: int = 10) -> None:
+    def __init__(
+        self,
+        client: Client,
+        name: str = 'localhost',
+        workers: int = 10,
+        batch_size: Optional[int] = None,
+        config: Optional[Dict[str, Any]] = None
+    ) -> None:
         self._client = client
         self.name = name
-        self._pool: AioPool = AioPool(workers)
+        self.batch_size = batch_size
+        # jolokia processing parameters for the reads of this broker; added to those of the client
+        self.config = merge_config(config) or dict()
+        # fan-outs share the learned limit but each call schedules its own requests; workers
+        # is the upper bound on the number of concurrent requests per broker fan-out
+        self._limit = AdaptiveLimit(maximum=workers)
+        self.body_cache = BodyCache(self.body_cache_bytes)
+        self._version: Optional[str] = None
+        # connection <=> destination map filled in by every subscription search
+        self.subscription_index = SubscriptionIndex()
+        # queue and topic names; refreshed by queue(), queues(), topic() and topics()
+        self.destinations = DestinationRegistry(self)
 
     def __repr__(self) -> str:
         return f'<activemq_manager.Client object endpoint={self._client.endpoint}>'
 
-    async def attributes(self) -> Dict[str, Any]:
-        return await self._client.dict_request('read', f'org.apache.activemq:type=Broker,brokerName={self.name}')
+    def _config(self, config: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        # processing parameters of a read; the client adds its own when the request is sent
+        return merge_config(self.config, config)
+
+    def _store(self, obj: Union[Queue, Topic, Connection, Subscription], attributes: Dict[str, Any], config: Optional[Dict[str, Any]] = None) -> None:
+        obj._attributes = attributes
+        max_collection_size = (merge_config(self._client.config, self.config, config) or {}).get('maxCollectionSize')
+        obj._truncated = truncated_paths(attributes, max_collection_size)
+
+    async def attributes(self, config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return await self._client.dict_request('read', f'org.apache.activemq:type=Broker,brokerName={self.name}', config=self._config(config))
 
-    async def attribute(self, attribute_: str) -> Any:
+    async def attribute(self, attribute_: str, path: Optional[str] = None, config: Optional[Dict[str, Any]] = None) -> Any:
+        # path selects a value within the attribute, e.g. attribute('TransportConnectors', path='openwire')
         return await self._client.request(
             'read',
             f'org.apache.activemq:type=Broker,brokerName={self.name}',
-            attribute=attribute_
+            attribute=attribute_,
+            path=path,
+            config=self._config(config)
         )
 
-    async def queues(self) -> AsyncGenerator:
-        async def _worker(queue_name) -> Queue:
-            return await self._queue_class.new(self, queue_name)
+    async def schema(self, mbean: str) -> MBeanSchema:
+        # attribute and operation metadata for the kind of mbean; fetched with a jolokia list
+        # request once per broker version and shared by every broker object of the client
+        if self._version is None:
+            self._version = str(await self.attribute('BrokerVersion'))
+        kind = mbean_type(mbean)
+        key = (self.name, self._version, kind)
+        schema = self._client.schemas.get(key)
+        if schema is None:
+            value = await self._client.dict_request('list', None, path=list_path(mbean), config={'maxDepth': self.schema_max_depth})
+            schema = self._client.schemas[key] = MBeanSchema.from_list(kind, value)
+        return schema
+
+    async def projection(self, mbean: str, attributes: Optional[Iterable[str]]) -> Optional[List[str]]:
+        # validate the attributes of a read against the schema; None reads the default attributes
+        if attributes is None:
+            return None
+        return (await self.schema(mbean)).validate(attributes)
+
+    async def _pattern_read(self, mbean: str, attribute=None, config: Optional[Dict[str, Any]] = None) -> Dict[str, Dict[str, Any]]:
+        # read every mbean matching a wildcard object name in a single request; the
+        # response is keyed by the object name of each matching mbean
+        try:
+            return await self._client.dict_request('read', mbean, attribute=attribute, config=self._config(config))
+        except ActivemqManagerError as e:
+            # jolokia responds with a 404 when the pattern does not match anything
+            if e.get('status') == 404:
+                return dict()
+            raise
+
+    def _fan_out_span(self, name: str, **attributes) -> Optional[Span]:
+        # fan-outs are only traced while a span is current or when the client has instruments
+        parent = current_span.get()
+        if parent is None and not self._client.instruments:
+            return None
+        return Span(name, parent, broker=self.name, **attributes)
 
-        _queue_names = list()
-        for object_name in await self._client.list_request('search', f'org.apache.activemq:type=Broker,brokerName={self.name},destinationType=Queue,destinationName=*'):
-            queue_name = parse_object_name(object_name).get('destinationName')
-            _queue_names.append(queue_name)
+    def _finish_span(self, span: Optional[Span]) -> None:
+        if span is None:
+            return
+        span.finish()
+        if span.parent is None:
+            self._client._span_finished(span)
 
-        async with self._pool:
-            async for _queue in self._pool.itermap(_worker, _queue_names):
-                yield _queue
+    async def bulk_update(
+        self,
+        objects: Iterable[Union[Queue, Topic, Connection, Subscription]],
+        batch_size: Optional[int] = None,
+        attributes: Optional[List[str]] = None,
+        config: Optional[Dict[str, Any]] = None
+    ) -> AsyncGenerator:
+        async def _worker(batch: List[Union[Queue, Topic, Connection, Subscription]]) -> List[Union[Queue, Topic, Connection, Subscription]]:
+            results = await self._client.bulk_request([obj._read_request(attributes, config=config) for obj in batch], batch_size=len(batch))
+            for obj, result in zip(batch, results):
+                if isinstance(result, ActivemqManagerError):
+                    raise result
+                self._store(obj, result, config)
+            return batch
+
+        if batch_size is None:
+            batch_size = self.batch_size or self._client.batch_size
+
+        _objects = list(objects)
+        _batches = [_objects[i:i + batch_size] for i in range(0, len(_objects), batch_size)]
+
+        _span = self._fan_out_span('Broker.bulk_update', objects=len(_objects), batches=len(_batches))
+        try:
+            async for _batch in fan_out(_worker, _batches, self._limit, span=_span):
+                for obj in _batch:
+                    yield obj
+        finally:
+            self._finish_span(_span)
+
+    async def _destinations(
+        self,
+        destination_class: Union[Type[Queue], Type[Topic]],
+        destination_type: str,
+        batch_size: Optional[int] = None,
+        pattern_read: bool = False,
+        attributes: Optional[Iterable[str]] = None,
+        config: Optional[Dict[str, Any]] = None,
+        pattern: str = '*'
+    ) -> AsyncGenerator:
+        # pattern selects destination names with the wildcards of object names: * and ?
+        mbean = self.destinations.mbean(destination_type, pattern)
+        # the schema is fetched with the first matching object name since jolokia cannot list a pattern
+        _attributes = list(attributes) if attributes is not None else None
 
-    async def queue(self, name):
-        queue_objects = await self._client.list_request('search', f'org.apache.activemq:type=Broker,brokerName={self.name},destinationType=Queue,destinationName={name}')
-        if len(queue_objects) == 1:
-            queue_name = parse_object_name(queue_objects[0]).get('destinationName')
-            return await self._queue_class.new(self, queue_name)
+        if pattern_read is True:
+            _results = await self._pattern_read(mbean, attribute=_attributes, config=config)
+            if _results:
+                await self.projection(next(iter(_results)), _attributes)
+            for object_name, attributes_ in _results.items():
+                destination = destination_class(self, parse_object_name(object_name)['destinationName'])
+                self._store(destination, attributes_, config)
+                yield destination
+        else:
+            await self.destinations.refresh(destination_type)
+            names = self.destinations.match(pattern, destination_type)
+            if names:
+                await self.projection(self.destinations.mbean(destination_type, names[0]), _attributes)
+            _destinations = [destination_class(self, name) for name in names]
+
+            async for _destination in self.bulk_update(_destinations, batch_size=batch_size, attributes=_attributes, config=config):
+                yield _destination
+
+    async def queues(
+        self,
+        batch_size: Optional[int] = None,
+        pattern_read: bool = False,
+        attributes: Optional[Iterable[str]] = None,
+        config: Optional[Dict[str, Any]] = None,
+        pattern: str = '*'
+    ) -> AsyncGenerator:
+        async for _queue in self._destinations(self._queue_class, 'Queue', batch_size=batch_size, pattern_read=pattern_read, attributes=attributes, config=config, pattern=pattern):
+            yield _queue
+
+    async def queue(self, name, attributes: Optional[Iterable[str]] = None, config: Optional[Dict[str, Any]] = None):
+        await self.destinations.refresh('Queue')
+        if self.destinations.has(name, 'Queue'):
+            return await self._queue_class.new(self, name, attributes=attributes, config=config)
         else:
             raise ActivemqManagerError(f'queue not found: {name}')
 
-    async def _jobs(
+    async def topics(
         self,
+        batch_size: Optional[int] = None,
+        pattern_read: bool = False,
+        attributes: Optional[Iterable[str]] = None,
+        config: Optional[Dict[str, Any]] = None,
+        pattern: str = '*'
+    ) -> AsyncGenerator:
+        async for _topic in self._destinations(self._topic_class, 'Topic', batch_size=batch_size, pattern_read=pattern_read, attributes=attributes, config=config, pattern=pattern):
+            yield _topic
+
+    async def topic(self, name, attributes: Optional[Iterable[str]] = None, config: Optional[Dict[str, Any]] = None):
+        await self.destinations.refresh('Topic')
+        if self.destinations.has(name, 'Topic'):
+            return await self._topic_class.new(self, name, attributes=attributes, config=config)
+        else:
+            raise ActivemqManagerError(f'topic not found: {name}')
+
+    def poller(
+        self,
+        interval: float = 15.0,
+        attributes: Optional[Sequence[str]] = None,
+        capacity: int = 60,
+        destination_type: str = 'Queue'
+    ) -> Poller:
+        return Poller(self, interval=interval, attributes=attributes, capacity=capacity, destination_type=destination_type)
+
+    @property
+    def _scheduler_mbean(self) -> str:
+        return f'org.apache.activemq:type=Broker,brokerName={self.name},service=JobScheduler,name=JMS'
+
+    @staticmethod
+    def _jobs_arguments(
         start: Optional[datetime] = None,
         end: Optional[datetime] = None
-    ) -> Dict[str, Any]:
+    ) -> List[str]:
         if not start:
             start = datetime.now()
         if not end:
             end = start + timedelta(weeks=52)
+        return [
+            start.strftime(Broker.dtformat),
+            end.strftime(Broker.dtformat)
+        ]
+
+    async def _jobs(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> Dict[str, Any]:
         return await self._client.dict_request(
             'exec',
-            f'org.apache.activemq:type=Broker,brokerName={self.name},service=JobScheduler,name=JMS',
+            self._scheduler_mbean,
+            operation='getAllJobs(java.lang.String,java.lang.String)',
+            arguments=self._jobs_arguments(start, end)
+        )
+
+    async def _iter_jobs(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        all_jobs: bool = False
+    ) -> AsyncGenerator:
+        # the job map can be very large so decode it one job at a time
+        if all_jobs is True:
+            operation, arguments = 'getAllJobs()', []
+        else:
+            operation, arguments = 'getAllJobs(java.lang.String,java.lang.String)', self._jobs_arguments(start, end)
+        async for job_id, data in self._client.stream_dict_request('exec', self._scheduler_mbean, operation=operation, arguments=arguments):
+            yield job_id, data
+
+    async def _job_shard(self, start: datetime, end: datetime) -> Optional[Dict[str, Any]]:
+        # returns None when the shard holds far more jobs than the target so it can be split
+        # before the whole shard is loaded into memory
+        jobs: Dict[str, Any] = dict()
+        splittable = end - start >= timedelta(seconds=2)
+        stream = self._client.stream_dict_request(
+            'exec',
+            self._scheduler_mbean,
             operation='getAllJobs(java.lang.String,java.lang.String)',
-            arguments=[
-                start.strftime(Broker.dtformat),
-                end.strftime(Broker.dtformat)
-            ]
+            arguments=[start.strftime(Broker.dtformat), end.strftime(Broker.dtformat)]
         )
+        try:
+            async for job_id, data in stream:
+                jobs[job_id] = data
+                if splittable and len(jobs) > self.job_shard_target * 4:
+                    return None
+        finally:
+            await stream.aclose()
+        return jobs
+
+    async def _job_shards(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        concurrency: int = 4
+    ) -> AsyncGenerator[List[Dict[str, Any]], None]:
+        # fetch the jobs window as consecutive shards, several at a time, and yield each shard
+        # in order sorted by the next execution time
+        if not start:
+            start = datetime.now()
+        if not end:
+            end = start + timedelta(weeks=52)
+        start = start.replace(microsecond=0)
+        end = end.replace(microsecond=0)
+
+        _span = self._fan_out_span('Broker.job_shards', concurrency=concurrency)
+
+        async def _shard(shard_start: datetime, shard_end: datetime) -> Optional[Dict[str, Any]]:
+            if _span is None:
+                return await self._job_shard(shard_start, shard_end)
+            with _span.child(f'{_span.name}[{shard_start.strftime(Broker.dtformat)}]'):
+                return await self._job_shard(shard_start, shard_end)
+
+        def _spawn(shard_start: datetime, shard_end: datetime) -> Tuple[datetime, datetime, asyncio.Future]:
+            return shard_start, shard_end, asyncio.ensure_future(_shard(shard_start, shard_end))
+
+        # the first shard spans the whole window; only when it holds too many jobs is the window
+        # scanned again in shards of the initial width
+        width = end - start
+        probing = True
+        cursor = start
+        scheduled = False
+        pending: Deque[Tuple[datetime, datetime, asyncio.Future]] = deque()
+        # getAllJobs includes both ends of the range so the shards overlap by one second; jobs
+        # scheduled exactly on the boundary are returned by both shards
+        boundary_ids: Set[str] = set()
+
+        try:
+            while pending or not scheduled:
+                while not scheduled and len(pending) < concurrency:
+                    shard_end = min(cursor + width, end)
+                    pending.append(_spawn(cursor, shard_end))
+                    cursor = shard_end
+                    scheduled = shard_end >= end
 
-    async def job_count(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> int:
+                shard_start, shard_end, future = pending.popleft()
+                jobs = await future
+
+                if jobs is None and probing:
+                    width = self.job_shard_initial_width
+                    probing = False
+                    cursor = start
+                    scheduled = False
+                    continue
+                elif jobs is None:
+                    middle = (shard_start + (shard_end - shard_start) / 2).replace(microsecond=0)
+                    pending.appendleft(_spawn(middle, shard_end))
+                    pending.appendleft(_spawn(shard_start, middle))
+                    width = max(timedelta(seconds=1), width / 4)
+                    continue
+
+                if len(jobs) > self.job_shard_target:
+                    width = max(timedelta(seconds=1), width / 2)
+                elif len(jobs) < self.job_shard_target / 4:
+                    width = width * 2
+
+                shard = sorted((data for job_id, data in jobs.items() if job_id not in boundary_ids), key=lambda data: data['next'])
+                boundary = shard_end.strftime(Broker.dtformat)
+                boundary_ids = {job_id for job_id, data in jobs.items() if data['next'] == boundary}
+                yield shard
+        finally:
+            for _, _, future in pending:
+                future.cancel()
+            self._finish_span(_span)
+
+    async def job_count(self, start: Optional[datetime] = None, end: Optional[datetime] = None, concurrency: int = 4) -> int:
         count = 0
-        for _ in (await self._jobs(start, end)).keys():
-            count += 1
+        async for shard in self._job_shards(start, end, concurrency):
+            count += len(shard)
         return count
 
-    async def jobs(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> AsyncGenerator:
-        for data in (await self._jobs(start, end)).values():
-            yield ScheduledJob(self, data['jobId'], data)
+    async def job_histogram(
+        self,
+        bucket: timedelta = timedelta(hours=1),
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        concurrency: int = 4
+    ) -> Dict[datetime, int]:
+        # number of jobs per bucket keyed by the start of the bucket; empty buckets are omitted
+        if not start:
+            start = datetime.now()
+        start = start.replace(microsecond=0)
+
+        histogram: Dict[datetime, int] = dict()
+        async for shard in self._job_shards(start, end, concurrency):
+            for data in shard:
+                key = start + ((activemq_stamp_datetime(data['next']) - start) // bucket) * bucket
+                histogram[key] = histogram.get(key, 0) + 1
+        return histogram
+
+    async def jobs(self, start: Optional[datetime] = None, end: Optional[datetime] = None, concurrency: int = 4) -> AsyncGenerator:
+        async for shard in self._job_shards(start, end, concurrency):
+            for data in shard:
+                yield ScheduledJob(self, data['jobId'], data)
+
+    async def delete_jobs(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        ids: Optional[Iterable[str]] = None,
+        concurrency: int = 4
+    ) -> int:
+        if ids is not None:
+            if start or end:
+                raise ValueError('ids cannot be combined with start or end')
+            return await self._delete_jobs_by_id(list(ids), concurrency)
+
+        # removeAllJobs does not return anything so the jobs are counted before they are removed
+        if start is None and end is None:
+            logger.info(f'delete all scheduled messages from {self.name}')
+            count = 0
+            async for _ in self._iter_jobs(all_jobs=True):
+                count += 1
+            await self._client.request('exec', self._scheduler_mbean, operation='removeAllJobs()', arguments=[])
+        else:
+            arguments = self._jobs_arguments(start, end)
+            logger.info(f'delete scheduled messages from {self.name} [start={arguments[0]}, end={arguments[1]}]')
+            count = await self.job_count(start, end)
+            await self._client.request('exec', self._scheduler_mbean, operation='removeAllJobs(java.lang.String,java.lang.String)', arguments=arguments)
+        return count
+
+    async def _delete_jobs_by_id(self, ids: List[str], concurrency: int) -> int:
+        async def _worker(batch: List[str]) -> int:
+            results = await self._client.bulk_request([
+                self._client._payload('exec', self._scheduler_mbean, operation='removeJob(java.lang.String)', arguments=[id_])
+                for id_ in batch
+            ], batch_size=len(batch))
+            for id_, result in zip(batch, results):
+                if isinstance(result, ActivemqManagerError):
+                    logger.warning(f'failed to delete scheduled message {id_}: {result}')
+            return sum(1 for result in results if not isinstance(result, ActivemqManagerError))
+
+        logger.info(f'delete {len(ids)} scheduled messages from {self.name}')
+        batch_size = self.batch_size or self._client.batch_size
+        _batches = [ids[i:i + batch_size] for i in range(0, len(ids), batch_size)]
+
+        count = 0
+        _span = self._fan_out_span('Broker.delete_jobs', jobs=len(ids), batches=len(_batches))
+        try:
+            async for result in fan_out(_worker, _batches, self._limit, maximum=concurrency, span=_span):
+                count += result
+        finally:
+            self._finish_span(_span)
+        return count
 
     async def _connections(self) -> AsyncGenerator:
         for connection_type in (await self.attribute('TransportConnectors')).keys():
@@ -106,9 +476,33 @@ class Broker:
             count += 1
         return count
 
-    async def connections(self, update_attributes: bool = True) -> AsyncGenerator:
-        async def _worker(connection) -> Connection:
-            return await connection.update()
+    async def connections(
+        self,
+        update_attributes: bool = True,
+        batch_size: Optional[int] = None,
+        pattern_read: bool = False,
+        attributes: Optional[Iterable[str]] = None,
+        config: Optional[Dict[str, Any]] = None
+    ) -> AsyncGenerator:
+        _attributes = list(attributes) if attributes is not None else None
+        if pattern_read is True:
+            _results = await self._pattern_read(
+                f'org.apache.activemq:type=Broker,brokerName={self.name},connector=clientConnectors,connectorName=*,connectionViewType=remoteAddress,connectionName=*',
+                attribute=_attributes or self._connection_class.default_attribute,
+                config=config
+            )
+            if _results:
+                await self.projection(next(iter(_results)), _attributes)
+            for object_name, attributes_ in _results.items():
+                _parsed_object_name = parse_object_name(object_name)
+                _connection = self._connection_class(
+                    self,
+                    _parsed_object_name['connectionName'],
+                    _parsed_object_name['connectorName']
+                )
+                self._store(_connection, attributes_, config)
+                yield _connection
+            return
 
         _connections = list()
         async for connection_type, object_name in self._connections():
@@ -123,9 +517,95 @@ class Broker:
                 raise ActivemqManagerError(f'connectionName property not found in {_parsed_object_name}')
 
         if update_attributes is True:
-            async with self._pool:
-                async for _connection in self._pool.itermap(_worker, _connections):
-                    yield _connection
+            if _connections:
+                await self.projection(_connections[0].mbean, _attributes)
+            async for _connection in self.bulk_update(_connections, batch_size=batch_size, attributes=_attributes, config=config):
+                yield _connection
         else:
             for _connection in _connections:
                 yield _connection
+
+    async def snapshot(self, path: Union[str, PathLike], messages: bool = False, batch_size: Optional[int] = None) -> int:
+        # write the attributes of the broker, its destinations and connections, the scheduled
+        # jobs and optionally the message headers of every queue to a file which can be opened
+        # with SnapshotClient; returns the number of records written
+        from .snapshot import SnapshotWriter
+
+        part_size = 1000
+        with open(path, 'wb') as f:
+            writer = SnapshotWriter(f, codec=self._client.codec)
+            writer.meta(broker=self.name, source=self._client.source, created=datetime.now().strftime(Broker.dtformat))
+            writer.read(f'org.apache.activemq:type=Broker,brokerName={self.name}', await self.attributes())
+
+            _queues: List[Queue] = list()
+            async for _queue in self.queues(batch_size=batch_size):
+                writer.read(_queue.mbean, _queue._attributes)
+                _queues.append(_queue)
+            async for _topic in self.topics(batch_size=batch_size):
+                writer.read(_topic.mbean, _topic._attributes)
+            async for _connection in self.connections(batch_size=batch_size):
+                writer.read(_connection.mbean, _connection._attributes)
+
+            # jobs are written in parts so the job map is never held in memory as a whole
+            jobs_payload = self._client._payload('exec', self._scheduler_mbean, operation='getAllJobs()', arguments=[])
+            jobs: Dict[str, Any] = dict()
+            try:
+                async for job_id, data in self._iter_jobs(all_jobs=True):
+                    jobs[job_id] = data
+                    if len(jobs) >= self.job_shard_target:
+                        writer.write(jobs_payload, jobs, part=True)
+                        jobs = dict()
+            except ActivemqManagerError as e:
+                logger.warning(f'scheduled jobs were not included in the snapshot: {e}')
+            else:
+                writer.write(jobs_payload, jobs, part=True)
+
+            if messages is True:
+                for _queue in _queues:
+                    browse_payload = self._client._payload('exec', _queue.mbean, operation='browseAsTable()', arguments=[])
+                    rows: Dict[str, Any] = dict()
+                    async for message in _queue.iter_messages():
+                        rows[message.id] = message._attributes
+                        if len(rows) >= part_size:
+                            writer.write(browse_payload, rows, part=True)
+                            rows = dict()
+                    writer.write(browse_payload, rows, part=True)
+
+            return writer.records
+
+    async def subscriptions(
+        self,
+        endpoint: str = 'Consumer',
+        destination_type: str = '*',
+        destination_name: str = '*',
+        client_id: str = '*',
+        attributes: Optional[Iterable[str]] = None,
+        batch_size: Optional[int] = None,
+        config: Optional[Dict[str, Any]] = None
+    ) -> AsyncGenerator[Subscription, None]:
+        # search the consumer or producer mbeans matching the pattern and read them with paged
+        # bulk reads; values are object name values so client ids must be encoded
+        if endpoint not in ('Consumer', 'Producer'):
+            raise ValueError(f'endpoint must be Consumer or Producer: {endpoint}')
+        mbean = f'org.apache.activemq:type=Broker,brokerName={self.name},destinationType={destination_type},destinationName={destination_name},endpoint={endpoint},clientId={client_id},*'
+
+        object_names = await self._client.list_request('search', mbean)
+        _attributes = list(attributes) if attributes is not None else None
+        if object_names:
+            await self.projection(object_names[0], _attributes)
+        if _attributes is not None and 'ClientId' not in _attributes:
+            # the client id is needed for the subscription index
+            _attributes.append('ClientId')
+
+        _subscriptions = [Subscription(self, object_name) for object_name in object_names]
+        async for _subscription in self.bulk_update(_subscriptions, batch_size=batch_size, attributes=_attributes, config=config):
+            yield _subscription
+        # only a complete search replaces the index entries of the pattern
+        self.subscription_index.sync(mbean, _subscriptions)
+
+    async def index_subscriptions(self, batch_size: Optional[int] = None) -> SubscriptionIndex:
+        # rebuild the subscription index from every consumer and producer of the broker
+        for endpoint in ('Consumer', 'Producer'):
+            async for _ in self.subscriptions(endpoint, attributes=['ClientId'], batch_size=batch_size):
+                pass
+        return self.subscription_index
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+from .helpers import canonical_object_name, parse_object_name
+
+
+if TYPE_CHECKING:
+    from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(val)) for key, val in value.items()))
+    elif isinstance(value, (list, tuple)):
+        return tuple(_freeze(val) for val in value)
+    return value
+
+
+def mbean_type(mbean: str) -> str:
+    # classify an object name (or pattern) so each kind of mbean can have its own ttl
+    properties = parse_object_name(mbean)
+    if 'endpoint' in properties:
+        return properties['endpoint']
+    elif 'destinationType' in properties:
+        return properties['destinationType']
+    elif 'connector' in properties:
+        return 'Connection'
+    elif 'service' in properties:
+        return properties['service']
+    return 'Broker'
+
+
+def request_key(payload: Dict[str, Any]) -> Hashable:
+    return (
+        payload.get('type'),
+        canonical_object_name(payload.get('mbean') or ''),
+        _freeze(payload.get('attribute')),
+        payload.get('operation'),
+        _freeze(payload.get('arguments')),
+        payload.get('path'),
+        _freeze(payload.get('config'))
+    )
+
+
+class RequestCache:
+    # exec operations which do not change the state of the broker
+    read_only_operations = {
+        'browse',
+        'browseAsTable',
+        'browseMessages',
+        'getAllJobs',
+        'getNextScheduleTime'
+    }
+    default_ttl: Dict[str, float] = {
+        'Broker': 5.0,
+        'Queue': 2.0,
+        'Topic': 2.0,
+        'Connection': 5.0,
+        'JobScheduler': 2.0
+    }
+
+    def __init__(
+        self,
+        maxsize: int = 4096,
+        ttl: Optional[Dict[str, float]] = None,
+        fallback_ttl: float = 1.0,
+        clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = dict(self.default_ttl)
+        if ttl:
+            self.ttl.update(ttl)
+        self.fallback_ttl = fallback_ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # incremented on every invalidation so responses for requests which were sent
+        # before the invalidation are not stored
+        self.generation = 0
+        self._clock = clock
+        self._entries: OrderedDict[Hashable, Tuple[float, str, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return f'<activemq_manager.RequestCache object entries={len(self._entries)} hits={self.hits} misses={self.misses}>'
+
+    @classmethod
+    def _operation_name(cls, payload: Dict[str, Any]) -> str:
+        return str(payload.get('operation') or '').split('(')[0]
+
+    @classmethod
+    def cacheable(cls, payload: Dict[str, Any]) -> bool:
+        type_ = payload.get('type')
+        if type_ in ('read', 'search', 'list'):
+            return True
+        return type_ == 'exec' and cls._operation_name(payload) in cls.read_only_operations
+
+    @classmethod
+    def mutates(cls, payload: Dict[str, Any]) -> bool:
+        return payload.get('type') == 'write' or (payload.get('type') == 'exec' and not cls.cacheable(payload))
+
+    def get(self, payload: Dict[str, Any]) -> Tuple[bool, Any]:
+        if not self.cacheable(payload):
+            return False, None
+
+        key = request_key(payload)
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > self._clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[2]
+            del self._entries[key]
+        self.misses += 1
+        return False, None
+
+    def store(self, payload: Dict[str, Any], value: Any, generation: Optional[int] = None) -> None:
+        if not self.cacheable(payload) or (generation is not None and generation != self.generation):
+            return
+
+        mbean = payload.get('mbean') or ''
+        ttl = self.ttl.get(mbean_type(mbean), self.fallback_ttl)
+        if ttl <= 0:
+            return
+
+        key = request_key(payload)
+        self._entries[key] = (self._clock() + ttl, parse_object_name(mbean).get('brokerName', ''), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, broker: Optional[str] = None) -> None:
+        # drop every entry or only the entries for a single broker
+        self.generation += 1
+        if broker is None:
+            self._entries.clear()
+        else:
+            for key in [key for key, entry in self._entries.items() if entry[1] in (broker, '*')]:
+                del self._entries[key]
+
+    def invalidate_request(self, payload: Dict[str, Any]) -> None:
+        # a mutation on any mbean of a broker can change the queue, broker and search results
+        # of that broker (e.g. a move changes the target queue) so the whole broker is dropped
+        self.invalidate(parse_object_name(payload.get('mbean') or '').get('brokerName'))
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+
+class BodyCache:
+    # browseMessages results (headers and body) keyed by message id and bounded by an
+    # estimate of their size in memory
+    def __init__(self, maxbytes: int = 32 * 1024 * 1024) -> None:
+        self.maxbytes = maxbytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[str, Tuple[str, int, Dict[str, Any]]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, message_id: object) -> bool:
+        return message_id in self._entries
+
+    def __repr__(self) -> str:
+        return f'<activemq_manager.BodyCache object entries={len(self._entries)} bytes={self.bytes}>'
+
+    @staticmethod
+    def estimate(data: Dict[str, Any]) -> int:
+        # a byte array is a list of small ints which costs a pointer (8 bytes) per byte
+        content = data.get('content')
+        if isinstance(content, dict) and isinstance(content.get('data'), list):
+            return 512 + 8 * len(content['data'])
+        text = data.get('text')
+        return 512 + (len(text) if isinstance(text, str) else 0)
+
+    def get(self, message_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(message_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(message_id)
+        self.hits += 1
+        return entry[2]
+
+    def store(self, message_id: str, queue: str, data: Dict[str, Any]) -> None:
+        size = self.estimate(data)
+        self.discard(message_id)
+        if size > self.maxbytes:
+            return
+        self._entries[message_id] = (queue, size, data)
+        self.bytes += size
+        while self.bytes > self.maxbytes:
+            _, (_, _size, _) = self._entries.popitem(last=False)
+            self.bytes -= _size
+            self.evictions += 1
+
+    def discard(self, message_id: str) -> None:
+        entry = self._entries.pop(message_id, None)
+        if entry is not None:
+            self.bytes -= entry[1]
+
+    def invalidate(self, queue: Optional[str] = None) -> None:
+        # drop every entry or only the messages which were browsed from a single queue
+        if queue is None:
+            self._entries.clear()
+            self.bytes = 0
+        else:
+            for message_id in [message_id for message_id, entry in self._entries.items() if entry[0] == queue]:
+                self.discard(message_id)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'entries': len(self._entries),
+            'bytes': self.bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
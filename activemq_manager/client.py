@@ -2,44 +2,106 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import time
 import warnings
 from concurrent.futures import Executor
+from contextlib import asynccontextmanager
 from typing import overload, TYPE_CHECKING
 
 import httpx
 from httpx._client import ClientState
 
 from .broker import Broker
+from .cache import RequestCache, request_key
+from .codec import get_codec, response_status
+from .endpoint import Endpoint
 from .errors import ActivemqManagerError
+from .helpers import merge_config
+from .instrumentation import current_span, RequestEvent, Span
+from .stream import JsonValueParser
 
 
 if TYPE_CHECKING:
-    from typing import Any, Dict, List, Optional, Type
+    from typing import Any, AsyncGenerator, AsyncIterator, Dict, Hashable, Iterable, List, Optional, Sequence, Set, Tuple, Type, Union
+    from .codec import JsonCodec
+    from .instrumentation import Instrumentation
+    from .schema import MBeanSchema
 
 
 logger = logging.getLogger(__name__)
 
 
-def _raise_for_status(response: httpx.Response) -> None:
+def _raise_for_status(response: httpx.Response, **data) -> None:
     try:
         response.raise_for_status()
     except httpx.HTTPError as e:
-        raise ActivemqManagerError(e)
+        raise ActivemqManagerError(e, **data)
+
+
+class _Flight:
+    # a request which is on the wire; concurrent callers with the same read-only request share it
+    def __init__(self, task: asyncio.Future, generation: Optional[int]) -> None:
+        self.task = task
+        # the cache generation when the request was sent; a caller which joins after an
+        # invalidation must not store a response which may predate it
+        self.generation = generation
+        self.waiters = 0
+        # the request keys under which the flight can be joined
+        self.keys: List[Hashable] = list()
 
 
 class Client:
     _broker_class: Type[Broker] = Broker
+    default_config: Dict[str, Any] = dict()
+    # read through every endpoint to find the one whose broker is the master
+    master_mbean: str = 'org.apache.activemq:type=Broker,brokerName=*'
 
     def __init__(
         self,
-        endpoint: str,
+        endpoint: Union[str, Sequence[str]],
         origin: str = 'http://localhost:80',
+        batch_size: int = 100,
+        cache: Optional[RequestCache] = None,
+        coalesce: bool = True,
+        target: Optional[Union[str, Dict[str, Any]]] = None,
+        config: Optional[Dict[str, Any]] = None,
+        instruments: Optional[Iterable[Instrumentation]] = None,
+        hedge_percentile: Optional[float] = None,
+        codec: Optional[Union[str, JsonCodec]] = None,
         **http_client_kwargs
     ):
-        self.endpoint = endpoint
+        self.__http_client: Optional[httpx.AsyncClient] = None
+        # several jolokia agents of the same broker (or of a master/slave pair); reads go to the
+        # fastest healthy one and writes to the one whose broker is the master
+        self.endpoints = [Endpoint(url) for url in ([endpoint] if isinstance(endpoint, str) else endpoint)]
+        if not self.endpoints:
+            raise ValueError('at least one endpoint is required')
+        if hedge_percentile is not None and not 0 < hedge_percentile < 1:
+            raise ValueError(f'hedge_percentile must be between 0 and 1: {hedge_percentile}')
+        self.endpoint = self.endpoints[0].url
+        # reads slower than this percentile of the latencies of an endpoint are sent to a second one
+        self.hedge_percentile = hedge_percentile
+        self.hedged = 0
+        # json encoder/decoder of requests and responses; orjson or msgspec when installed
+        self.codec = get_codec(codec)
         self.origin = origin
+        # jolokia proxy mode; every request is forwarded by the agent at endpoint to this jmx service url
+        self.target: Optional[Dict[str, Any]] = {'url': target} if isinstance(target, str) else target
+        # optional semaphore shared with other clients to cap the number of concurrent http requests
+        self.limiter: Optional[asyncio.Semaphore] = None
+        # jolokia processing parameters (maxDepth, maxCollectionSize, ...) sent with every request;
+        # brokers and single calls can add to or override them
+        self.config = merge_config(self.default_config, config) or dict()
+        # hooks called before and after every http exchange, e.g. Metrics
+        self.instruments: List[Instrumentation] = list(instruments or [])
+        self.batch_size = batch_size
+        self.cache = cache
+        self.coalesce = coalesce
+        # mbean schemas keyed by (broker name, broker version, mbean kind)
+        self.schemas: Dict[Tuple[str, str, str], MBeanSchema] = dict()
+        self._inflight: Dict[Hashable, Tuple[_Flight, int]] = dict()
+        self._probes: Dict[Endpoint, asyncio.Future] = dict()
         self._http_client_kwargs = http_client_kwargs
-        self.__http_client: Optional[httpx.AsyncClient] = None
 
     def __del__(self) -> None:
         if self.__http_client and self.__http_client._state is ClientState.OPENED:
@@ -70,33 +132,456 @@ class Client:
     async def close(self) -> None:
         await self._http_client.aclose()
 
-    async def _request(self, type_, mbean, **kwargs) -> Any:
+    @staticmethod
+    def _payload(type_, mbean, **kwargs) -> Dict[str, Any]:
         payload = {
             'type': type_,
             'mbean': mbean
         }
+        if mbean is None:
+            # list requests address mbeans with a path instead
+            del payload['mbean']
         payload.update(kwargs)
+        for key in ('config', 'path'):
+            if key in payload and payload[key] is None:
+                del payload[key]
+        return payload
+
+    @property
+    def source(self) -> str:
+        # where the requests of this client end up; used to tag results from several brokers
+        return self.target['url'] if self.target else self.endpoint
+
+    def _configured(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if not self.config and 'config' not in payload:
+            return payload
+        config = {key: val for key, val in (merge_config(self.config, payload.get('config')) or {}).items() if val is not None}
+        if config:
+            return dict(payload, config=config)
+        return {key: val for key, val in payload.items() if key != 'config'}
+
+    def _targeted(self, payload: Any) -> Any:
+        if self.target is None:
+            return payload
+        elif isinstance(payload, list):
+            return [dict(item, target=self.target) for item in payload]
+        return dict(payload, target=self.target)
+
+    @asynccontextmanager
+    async def _slot(self) -> AsyncIterator[None]:
+        if self.limiter is None:
+            yield
+        else:
+            async with self.limiter:
+                yield
+
+    def _source(self, endpoint: Endpoint) -> str:
+        return self.target['url'] if self.target else endpoint.url
+
+    def _begin(self, payloads: List[Dict[str, Any]], source: str, streaming: bool = False) -> Optional[RequestEvent]:
+        # events are only created when someone is listening: an instrument or a current span
+        _span = current_span.get()
+        if not self.instruments and _span is None:
+            return None
+        event = RequestEvent(source, payloads, streaming=streaming)
+        event.span = _span
+        for instrument in self.instruments:
+            instrument.before_request(event)
+        return event
+
+    def _end(self, event: Optional[RequestEvent], status: Optional[int], error: Optional[BaseException] = None) -> None:
+        if event is None:
+            return
+        event.finish(status, error)
+        if event.span is not None:
+            operation, kind = event.labels[0] if event.requests else ('', '')
+            child = Span(f'{operation} {kind}', event.span, requests=len(event.requests), status=status)
+            child.start, child.end, child.error = event.start, event.start + event.seconds, error
+        for instrument in self.instruments:
+            instrument.after_request(event)
+
+    def _span_finished(self, span: Span) -> None:
+        for instrument in self.instruments:
+            instrument.span_finished(span)
+
+    @staticmethod
+    def _statuses(result: Any) -> List[Optional[int]]:
+        results = result if isinstance(result, list) else [result]
+        return [item.get('status') if isinstance(item, dict) else None for item in results]
+
+    def _candidates(self, exclude: Set[Endpoint]) -> List[Endpoint]:
+        # healthy endpoints, fastest first; an endpoint without a measured latency is tried
+        # before the others so each one gets measured. when every endpoint has failed they are
+        # tried anyway, the one which failed the longest time ago first
+        endpoints = [endpoint for endpoint in self.endpoints if endpoint not in exclude]
+        healthy = [endpoint for endpoint in endpoints if endpoint.healthy]
+        if healthy:
+            return sorted(healthy, key=lambda endpoint: endpoint.latency or 0.0)
+        return sorted(endpoints, key=lambda endpoint: endpoint.retry_at)
+
+    async def _probe(self, endpoint: Endpoint) -> bool:
+        # concurrent probes of the same endpoint share one request
+        pending = self._probes.get(endpoint)
+        if pending is None:
+            pending = self._probes[endpoint] = asyncio.ensure_future(self._read_role(endpoint))
+            pending.add_done_callback(lambda _: self._probes.pop(endpoint, None))
+        return await asyncio.shield(pending)
+
+    async def _read_role(self, endpoint: Endpoint) -> bool:
+        # a slave either has no broker mbean yet or reports Slave=true
+        payload = self._payload('read', self.master_mbean, attribute='Slave')
+        try:
+            value = self._value(await self._exchange(endpoint, payload, self.codec.dumps(self._targeted(payload))))
+        except ActivemqManagerError as e:
+            logger.debug('%s is not the master: %s', endpoint.url, e)
+            # an endpoint which did not respond keeps an unknown role until it is probed again
+            if e.get('endpoint') is None:
+                endpoint.master = False
+            return False
+        endpoint.master = isinstance(value, dict) and any(
+            isinstance(attributes, dict) and attributes.get('Slave') is False for attributes in value.values()
+        )
+        return endpoint.master
+
+    async def _master(self) -> Endpoint:
+        if len(self.endpoints) == 1:
+            return self.endpoints[0]
+        for endpoint in self.endpoints:
+            if endpoint.master and endpoint.healthy:
+                return endpoint
+
+        for endpoint in self._candidates(set()):
+            if await self._probe(endpoint):
+                logger.info('master broker is reached through %s', endpoint.url)
+                return endpoint
+        raise ActivemqManagerError('none of the endpoints reaches a master broker', endpoints=[endpoint.url for endpoint in self.endpoints])
+
+    async def _readers(self, exclude: Set[Endpoint]) -> List[Endpoint]:
+        # the candidates for a read; a slave has no destination mbeans so endpoints which reach
+        # one are skipped. the role of an endpoint is probed before its first read
+        if len(self.endpoints) == 1:
+            return self._candidates(exclude)
+        unknown = [endpoint for endpoint in self._candidates(exclude) if endpoint.master is None and endpoint.healthy]
+        if unknown:
+            await asyncio.gather(*[self._probe(endpoint) for endpoint in unknown])
+        readers = self._candidates(exclude | {endpoint for endpoint in self.endpoints if endpoint.master is False})
+        # when no endpoint reaches a master the first read is sent anyway and fails there; a
+        # failed read is not sent on to a slave
+        return readers if readers or exclude else self._candidates(exclude)
+
+    async def _exchange(self, endpoint: Endpoint, payload: Any, content: bytes, raw: bool = False) -> Any:
+        # one http request to one endpoint; network errors and server errors mark the endpoint as
+        # failed and carry its url so the request can be sent to another endpoint. raw returns
+        # the response body without decoding it
+        event = self._begin(payload if isinstance(payload, list) else [payload], self._source(endpoint))
+        if event is not None:
+            event.bytes_out = len(content)
+        start = time.monotonic()
+        try:
+            async with self._slot():
+                _response: httpx.Response = await self._http_client.post(
+                    f'{endpoint.url}/api/jolokia',
+                    headers={
+                        'Origin': self.origin,
+                        'Content-Type': 'application/json'
+                    },
+                    content=content
+                )
+        except httpx.TransportError as e:
+            # connection errors as well as timeouts
+            logger.exception(e)
+            endpoint.failed()
+            error = ActivemqManagerError('api call failed', endpoint=endpoint.url, error=e)
+            self._end(event, None, error)
+            raise error
+        except BaseException as e:
+            # cancellation and any other error still finish the event so in_flight does not leak
+            self._end(event, None, e)
+            raise
+
+        if _response.status_code >= 500:
+            endpoint.failed()
+        else:
+            endpoint.record(time.monotonic() - start)
+        try:
+            _raise_for_status(_response, **({'endpoint': endpoint.url} if _response.status_code >= 500 else {}))
+            result = _response.content if raw else self.codec.loads(_response.content)
+            if event is not None:
+                event.bytes_in = len(_response.content)
+                event.statuses = [response_status(result)] if raw else self._statuses(result)
+        except BaseException as e:
+            self._end(event, _response.status_code, e)
+            raise
+        self._end(event, _response.status_code)
+        return result
+
+    async def _hedged(self, candidates: List[Endpoint], payload: Any, content: bytes, tried: Set[Endpoint], raw: bool = False) -> Any:
+        primary = candidates[0]
+        tried.add(primary)
+        delay = primary.percentile(self.hedge_percentile) if self.hedge_percentile is not None and len(candidates) > 1 else None
+        if delay is None:
+            return await self._exchange(primary, payload, content, raw=raw)
 
-        logger.debug(f'api payload: {payload}')
+        # the request is sent to a second endpoint as well when the first one takes longer than
+        # usual; whichever answers first is used and the other request is cancelled
+        start = time.monotonic()
+        first = asyncio.ensure_future(self._exchange(primary, payload, content, raw=raw))
+        tasks = {first}
         try:
-            _response: httpx.Response = await self._http_client.post(
-                f'{self.endpoint}/api/jolokia',
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                logger.debug('hedging request to %s after %.3fs', candidates[1].url, delay)
+                self.hedged += 1
+                tried.add(candidates[1])
+                tasks.add(asyncio.ensure_future(self._exchange(candidates[1], payload, content, raw=raw)))
+
+            errors: List[BaseException] = list()
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    error = task.exception()
+                    if error is None:
+                        if task is not first and not first.done():
+                            # the first endpoint is cancelled before it answers; it took at least
+                            # this long, which keeps it from being picked as the fastest again
+                            primary.record(time.monotonic() - start)
+                        return task.result()
+                    errors.append(error)
+            raise errors[-1]
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _post(self, payload: Any, raw: bool = False) -> Any:
+        # logged before the target is added so proxy credentials are not written to the log
+        logger.debug('api payload: %s', payload)
+        content = self.codec.dumps(self._targeted(payload))
+        if any(RequestCache.mutates(item) for item in (payload if isinstance(payload, list) else [payload])):
+            # writes are not sent to another endpoint after a failure since they may have been applied
+            return await self._exchange(await self._master(), payload, content, raw=raw)
+
+        tried: Set[Endpoint] = set()
+        candidates = await self._readers(tried)
+        while True:
+            try:
+                return await self._hedged(candidates, payload, content, tried, raw=raw)
+            except ActivemqManagerError as e:
+                if e.get('endpoint') is None:
+                    raise
+                candidates = await self._readers(tried)
+                if not candidates:
+                    raise
+                logger.warning('request failed on %s; trying another endpoint', e['endpoint'])
+
+    @staticmethod
+    def _error(result: Any) -> ActivemqManagerError:
+        if isinstance(result, dict) and result.get('status') == 304:
+            # ifModifiedSince was given and nothing has changed; the response has no value
+            return ActivemqManagerError('not modified', status=304, request=result.get('request'))
+        elif isinstance(result, dict) and 'error' in result:
+            return ActivemqManagerError(
+                result['error'],
+                status=result.get('status'),
+                error_type=result.get('error_type'),
+                request=result.get('request')
+            )
+        return ActivemqManagerError('http request returned an unexpected payload', result=result)
+
+    @classmethod
+    def _value(cls, result: Any) -> Any:
+        if isinstance(result, dict) and result.get('status') == 200:
+            return result['value']
+        raise cls._error(result)
+
+    async def _send(self, payloads: List[Dict[str, Any]]) -> List[Any]:
+        # post the payloads and return the raw jolokia response objects
+        if len(payloads) == 1:
+            return [await self._post(payloads[0])]
+
+        results = await self._post(payloads)
+        if not isinstance(results, list) or len(results) != len(payloads):
+            raise ActivemqManagerError('bulk request returned an unexpected payload', results=results)
+        return results
+
+    async def _send_and_invalidate(self, payloads: List[Dict[str, Any]]) -> List[Any]:
+        try:
+            return await self._send(payloads)
+        finally:
+            if self.cache is not None:
+                for payload in payloads:
+                    if self.cache.mutates(payload):
+                        self.cache.invalidate_request(payload)
+
+    def _start_flight(self, payloads: List[Dict[str, Any]]) -> _Flight:
+        generation = self.cache.generation if self.cache is not None else None
+        flight = _Flight(asyncio.ensure_future(self._send_and_invalidate(payloads)), generation)
+        if self.coalesce is True:
+            for index, payload in enumerate(payloads):
+                if RequestCache.cacheable(payload):
+                    key = request_key(payload)
+                    self._inflight[key] = (flight, index)
+                    flight.keys.append(key)
+            flight.task.add_done_callback(lambda _: self._land(flight))
+        return flight
+
+    def _land(self, flight: _Flight) -> None:
+        # the flight can no longer be joined; called when it is done or about to be cancelled
+        for key in flight.keys:
+            if self._inflight.get(key, (None, 0))[0] is flight:
+                del self._inflight[key]
+        flight.keys.clear()
+
+    async def _execute(self, payloads: List[Dict[str, Any]]) -> List[Any]:
+        # returns the value, or an ActivemqManagerError, for each payload
+        payloads = [self._configured(payload) for payload in payloads]
+        values: List[Any] = [None] * len(payloads)
+        misses: List[int] = list()
+        for i, payload in enumerate(payloads):
+            if self.cache is not None:
+                hit, value = self.cache.get(payload)
+                if hit:
+                    values[i] = value
+                    continue
+            misses.append(i)
+
+        if not misses:
+            return values
+
+        # identical read-only requests which are already in flight are joined instead of sent again
+        waits: List[Tuple[int, _Flight, int]] = list()
+        unsent: List[int] = list()
+        for i in misses:
+            inflight = self._inflight.get(request_key(payloads[i])) if self.coalesce and RequestCache.cacheable(payloads[i]) else None
+            if inflight is not None:
+                waits.append((i, inflight[0], inflight[1]))
+            else:
+                unsent.append(i)
+        if unsent:
+            flight = self._start_flight([payloads[i] for i in unsent])
+            waits.extend((i, flight, index) for index, i in enumerate(unsent))
+
+        flights: Set[_Flight] = {flight for _, flight, _ in waits}
+        for flight in flights:
+            flight.waiters += 1
+        try:
+            # the flight is shielded so a cancelled caller does not cancel the request for the
+            # others; it is only cancelled once nobody is waiting on it
+            for flight in flights:
+                await asyncio.shield(flight.task)
+        finally:
+            for flight in flights:
+                flight.waiters -= 1
+                if flight.waiters == 0 and not flight.task.done():
+                    # a request issued before the task has finished cancelling gets a new flight
+                    self._land(flight)
+                    flight.task.cancel()
+
+        for i, flight, index in waits:
+            try:
+                values[i] = self._value(flight.task.result()[index])
+            except ActivemqManagerError as e:
+                values[i] = e
+            else:
+                if self.cache is not None:
+                    self.cache.store(payloads[i], values[i], generation=flight.generation)
+        return values
+
+    async def _request(self, type_, mbean, **kwargs) -> Any:
+        value = (await self._execute([self._payload(type_, mbean, **kwargs)]))[0]
+        if isinstance(value, ActivemqManagerError):
+            raise value
+        return value
+
+    async def bulk_request(self, requests: Iterable[Dict[str, Any]], batch_size: Optional[int] = None) -> List[Any]:
+        # results are returned in the same order as the requests; a failed request
+        # is represented by an ActivemqManagerError instead of raising
+        requests = list(requests)
+        if batch_size is None:
+            batch_size = self.batch_size
+        if batch_size < 1:
+            raise ValueError(f'batch_size must be greater than zero: {batch_size}')
+
+        values: List[Any] = list()
+        for i in range(0, len(requests), batch_size):
+            values.extend(await self._execute(requests[i:i + batch_size]))
+        return values
+
+    async def _stream(self, expected_container: str, type_, mbean, **kwargs) -> AsyncGenerator[Tuple[Optional[str], Any], None]:
+        # decode the response incrementally and yield the members of "value" as they arrive.
+        # the http status is checked before the first member but jolokia writes its own status
+        # after the value: an error response has no value so nothing is yielded before its error
+        # is raised, while a response which breaks off part way raises only after the members
+        # which arrived in full were yielded. callers which cannot act on a partial result should
+        # use dict_request or list_request. streams are sent to a single endpoint without failover
+        # or hedging, decoded without the codec and never cached or coalesced
+        payload = self._configured(self._payload(type_, mbean, **kwargs))
+        logger.debug('api payload (streaming): %s', payload)
+        content = self.codec.dumps(self._targeted(payload))
+        # streamed responses are not retried or hedged once items may have been yielded
+        endpoint = await self._master() if RequestCache.mutates(payload) else (await self._readers(set()))[0]
+        event = self._begin([payload], self._source(endpoint), streaming=True)
+        start = time.monotonic()
+        status: Optional[int] = None
+        error: Optional[BaseException] = None
+
+        parser = JsonValueParser()
+        try:
+            async with self._slot(), self._http_client.stream(
+                'POST',
+                f'{endpoint.url}/api/jolokia',
                 headers={
-                    'Origin': self.origin
+                    'Origin': self.origin,
+                    'Content-Type': 'application/json'
                 },
-                json=payload
-            )
-        except httpx.NetworkError as e:
+                content=content
+            ) as _response:
+                status = _response.status_code
+                if status >= 500:
+                    endpoint.failed()
+                else:
+                    endpoint.record(time.monotonic() - start)
+                _raise_for_status(_response)
+                async for chunk in _response.aiter_bytes():
+                    if event is not None:
+                        event.bytes_in += len(chunk)
+                    items = parser.feed(chunk)
+                    if parser.container is not None and parser.container != expected_container:
+                        break
+                    for item in items:
+                        yield item
+                else:
+                    for item in parser.close():
+                        yield item
+        except httpx.TransportError as e:
             logger.exception(e)
-            raise ActivemqManagerError('api call failed')
+            endpoint.failed()
+            error = ActivemqManagerError('api call failed', endpoint=endpoint.url, error=e)
+            raise error
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            if event is not None:
+                event.bytes_out = len(content)
+                event.statuses = [parser.fields.get('status')]
+            self._end(event, status, error)
 
-        _raise_for_status(_response)
+        if parser.container is None:
+            # there was no "value" container; raise the error or the unexpected payload
+            self._value(parser.fields)
+        if parser.container != expected_container:
+            raise ActivemqManagerError('dictionary was expected' if expected_container == '{' else 'list was expected')
+        elif parser.fields.get('status') != 200:
+            raise self._error(parser.fields)
 
-        _payload = _response.json()
-        if _payload.get('status') == 200:
-            return _payload['value']
-        else:
-            raise ActivemqManagerError('http request returned an unexpected payload', response=_response)
+    async def stream_dict_request(self, type_, mbean, **kwargs) -> AsyncGenerator[Tuple[str, Any], None]:
+        async for key, value in self._stream('{', type_, mbean, **kwargs):
+            if key is not None:
+                yield key, value
+
+    async def stream_list_request(self, type_, mbean, **kwargs) -> AsyncGenerator[Any, None]:
+        async for _, value in self._stream('[', type_, mbean, **kwargs):
+            yield value
 
     async def dict_request(self, type_, mbean, **kwargs) -> Dict:
         _results = await self._request(type_, mbean, **kwargs)
@@ -115,5 +600,19 @@ class Client:
     async def request(self, type_, mbean, **kwargs) -> Any:
         return await self._request(type_, mbean, **kwargs)
 
-    def broker(self, name: str = 'localhost', workers: int = 10) -> Broker:
-        return Broker(self, name=name, workers=workers)
+    async def raw_request(self, type_, mbean, **kwargs) -> bytes:
+        # the undecoded jolokia response, e.g. to be written to a file as is; only the status is
+        # read from the body and the response is decoded only to raise its error. the cache
+        # and the coalescing of requests are bypassed
+        payload = self._configured(self._payload(type_, mbean, **kwargs))
+        try:
+            content = await self._post(payload, raw=True)
+        finally:
+            if self.cache is not None and self.cache.mutates(payload):
+                self.cache.invalidate_request(payload)
+        if response_status(content) != 200:
+            raise self._error(self.codec.loads(content))
+        return content
+
+    def broker(self, name: str = 'localhost', workers: int = 10, batch_size: Optional[int] = None, config: Optional[Dict[str, Any]] = None) -> Broker:
+        return self._broker_class(self, name=name, workers=workers, batch_size=batch_size, config=config)
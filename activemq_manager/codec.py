@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import json
+from typing import TYPE_CHECKING
+
+
+if TYPE_CHECKING:
+    from typing import Any, Dict, Optional, Type, Union
+
+
+class JsonCodec:
+    # encodes requests and decodes responses; the standard library json module is always
+    # available and is used when neither orjson nor msgspec is installed
+    name: str = 'json'
+
+    def __repr__(self) -> str:
+        return f'<activemq_manager.JsonCodec object name={self.name}>'
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value, separators=(',', ':')).encode('utf-8')
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec(JsonCodec):
+    name = 'orjson'
+
+    def __init__(self) -> None:
+        import orjson
+        self._orjson = orjson
+
+    def dumps(self, value: Any) -> bytes:
+        return self._orjson.dumps(value)
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return self._orjson.loads(data)
+
+
+class MsgspecCodec(JsonCodec):
+    name = 'msgspec'
+
+    def __init__(self) -> None:
+        import msgspec
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+
+    def dumps(self, value: Any) -> bytes:
+        return self._encoder.encode(value)
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return self._decoder.decode(data)
+
+
+codecs: Dict[str, Type[JsonCodec]] = {
+    'orjson': OrjsonCodec,
+    'msgspec': MsgspecCodec,
+    'json': JsonCodec
+}
+
+
+def get_codec(codec: Optional[Union[str, JsonCodec]] = None) -> JsonCodec:
+    # a codec instance, a codec name or None for the fastest one which is installed
+    if isinstance(codec, JsonCodec):
+        return codec
+    elif codec is not None:
+        if codec not in codecs:
+            raise ValueError(f'unknown json codec: {codec}')
+        return codecs[codec]()
+
+    for codec_class in codecs.values():
+        try:
+            return codec_class()
+        except ImportError:
+            continue
+    return JsonCodec()
+
+
+def response_status(content: bytes) -> Optional[int]:
+    # read the status of a jolokia response without decoding its value. a "status" within a
+    # string is escaped so every match is a key, but objects within the value may have a status
+    # key of their own: a match belongs to the response when the rest of the document decodes as
+    # a complete object from there. jolokia writes the status after the value so the last match
+    # is tried first and usually only a few bytes are decoded
+    end = len(content)
+    while True:
+        index = content.rfind(b'"status"', 0, end)
+        if index < 0:
+            return None
+        try:
+            fields = json.loads(b'{' + content[index:])
+        except ValueError:
+            # a nested object is closed before the end of the document
+            end = index
+            continue
+        status = fields.get('status') if isinstance(fields, dict) else None
+        return status if isinstance(status, int) else None
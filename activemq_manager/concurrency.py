@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import TYPE_CHECKING
+
+
+if TYPE_CHECKING:
+    from typing import Any, AsyncGenerator, Awaitable, Callable, Iterable, Optional, Set
+    from .instrumentation import Span
+
+
+class AdaptiveLimit:
+    # additive-increase/multiplicative-decrease concurrency limit; the limit grows while
+    # requests succeed at a steady latency and is cut back on errors or when the latency
+    # rises well above the observed baseline
+
+    def __init__(
+        self,
+        maximum: int = 10,
+        minimum: int = 1,
+        initial: Optional[int] = None,
+        backoff: float = 0.5,
+        latency_tolerance: float = 2.0,
+        smoothing: float = 0.2
+    ) -> None:
+        if minimum < 1 or maximum < minimum:
+            raise ValueError(f'invalid concurrency limits [minimum={minimum}, maximum={maximum}]')
+        self.maximum = maximum
+        self.minimum = minimum
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.smoothing = smoothing
+        self._limit = float(min(maximum, max(minimum, initial if initial is not None else min(4, maximum))))
+        self._baseline: Optional[float] = None
+        self._last_decrease = 0.0
+
+    def __repr__(self) -> str:
+        return f'<activemq_manager.AdaptiveLimit object limit={self.limit} maximum={self.maximum}>'
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def baseline(self) -> Optional[float]:
+        return self._baseline
+
+    def record(self, latency: float, error: bool = False) -> None:
+        congested = error or (self._baseline is not None and latency > self._baseline * self.latency_tolerance)
+
+        if congested:
+            # only back off once per round trip so a burst of slow responses counts once
+            now = time.monotonic()
+            if now - self._last_decrease >= (self._baseline or latency):
+                self._limit = max(float(self.minimum), self._limit * self.backoff)
+                self._last_decrease = now
+        else:
+            # roughly +1 for every `limit` successful requests
+            self._limit = min(float(self.maximum), self._limit + 1 / self._limit)
+
+        if not error:
+            if self._baseline is None:
+                self._baseline = latency
+            else:
+                self._baseline += self.smoothing * (latency - self._baseline)
+
+
+async def fan_out(
+    fn: Callable[[Any], Awaitable[Any]],
+    items: Iterable[Any],
+    limit: AdaptiveLimit,
+    maximum: Optional[int] = None,
+    span: Optional[Span] = None
+) -> AsyncGenerator[Any, None]:
+    # call fn for every item with no more than limit.limit calls in flight and yield the
+    # results in the order they complete; the first error is raised and the remaining
+    # calls are cancelled. with a span, each call runs in a child span of it
+
+    async def _call(item: Any, index: int) -> Any:
+        if span is None:
+            return await fn(item)
+        with span.child(f'{span.name}[{index}]'):
+            return await fn(item)
+
+    async def _timed(item: Any, index: int) -> Any:
+        start = time.monotonic()
+        try:
+            result = await _call(item, index)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            limit.record(time.monotonic() - start, error=True)
+            raise
+        limit.record(time.monotonic() - start)
+        return result
+
+    _items = enumerate(items)
+    exhausted = False
+    pending: Set[asyncio.Future] = set()
+    try:
+        while True:
+            _limit = limit.limit if maximum is None else min(limit.limit, maximum)
+            while not exhausted and len(pending) < _limit:
+                try:
+                    index, item = next(_items)
+                except StopIteration:
+                    exhausted = True
+                else:
+                    pending.add(asyncio.ensure_future(_timed(item, index)))
+
+            if not pending:
+                break
+
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    finally:
+        for future in pending:
+            future.cancel()
@@ -5,12 +5,13 @@ from datetime import datetime
 from uuid import UUID
 from typing import TYPE_CHECKING
 
-from .errors import ActivemqManagerError
+from .helpers import cached_attribute, encode_object_name_part
 
 
 if TYPE_CHECKING:
-    from typing import Any, Dict, Optional, Type
+    from typing import Any, AsyncGenerator, Dict, Iterable, List, Optional, Type
     from .broker import Broker
+    from .subscription import Subscription
 
 
 logger = logging.getLogger(__name__)
@@ -30,12 +31,15 @@ class Connection:
         'Slow',
         'UserName'
     ]
+    __slots__ = ('broker', 'name', 'type', '_attributes', '_truncated')
 
     def __init__(self, broker: Broker, name: str, type_: str) -> None:
         self.broker = broker
         self.name = name
         self.type = type_
         self._attributes: Dict[str, Any] = {}
+        # attribute paths whose collections were cut at maxCollectionSize
+        self._truncated: List[str] = list()
 
     def __repr__(self) -> str:
         return f'<activemq_manager.Connection object name={self.name}>'
@@ -44,20 +48,13 @@ class Connection:
     def _client(self):
         return self.broker._client
 
-    @staticmethod
-    async def new(broker: Broker, name: str, type_: str) -> Connection:
-        conn = Connection(broker, name, type_)
-        return await conn.update()
+    @classmethod
+    async def new(cls, broker: Broker, name: str, type_: str, attributes: Optional[Iterable[str]] = None, config: Optional[Dict[str, Any]] = None) -> Connection:
+        conn = cls(broker, name, type_)
+        return await conn.update(attributes=attributes, config=config)
 
     def _attribute(self, name: str, expected_type: Type) -> Any:
-        if not self._attributes:
-            ActivemqManagerError('attributes have not been cached')
-        elif name not in self._attributes:
-            ActivemqManagerError(f'attribute name does not exist: {name}')
-        elif not isinstance(self._attributes[name], expected_type):
-            ActivemqManagerError(f'attribute type is incorrect: {name}')
-
-        return self._attributes[name]
+        return cached_attribute(self._attributes, name, expected_type)
 
     @property
     def client_id(self) -> str:
@@ -75,12 +72,45 @@ class Connection:
     def slow(self) -> bool:
         return self._attribute('Slow', bool)
 
-    async def update(self) -> Connection:
-        self._attributes = await self.attributes()
+    @property
+    def mbean(self) -> str:
+        return f'org.apache.activemq:type=Broker,brokerName={self.broker.name},connector=clientConnectors,connectorName={self.type},connectionViewType=remoteAddress,connectionName={self.name}'
+
+    def _read_request(self, attribute=None, config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        if attribute is None:
+            attribute = self.default_attribute
+        return self._client._payload('read', self.mbean, attribute=attribute, config=self.broker._config(config))
+
+    async def update(self, attributes: Optional[Iterable[str]] = None, config: Optional[Dict[str, Any]] = None) -> Connection:
+        # attributes limits the read to a projection which is validated against the mbean schema
+        self.broker._store(self, await self.attributes(await self.broker.projection(self.mbean, attributes), config=config), config)
         return self
 
-    async def attributes(self, attribute=None) -> Dict[str, Any]:
+    @property
+    def truncated(self) -> List[str]:
+        return self._truncated
+
+    async def attributes(self, attribute=None, config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         if attribute is None:
             attribute = self.default_attribute
 
-        return await self.broker._client.dict_request('read', f'org.apache.activemq:type=Broker,brokerName={self.broker.name},connector=clientConnectors,connectorName={self.type},connectionViewType=remoteAddress,connectionName={self.name}', attribute=attribute)
+        return await self.broker._client.dict_request('read', self.mbean, attribute=attribute, config=self.broker._config(config))
+
+    async def _subscriptions(self, endpoint: str, attributes: Optional[Iterable[str]], batch_size: Optional[int]) -> AsyncGenerator[Subscription, None]:
+        if 'ClientId' not in self._attributes:
+            self.broker._store(self, dict(self._attributes, **await self.attributes(['ClientId'])))
+        async for _subscription in self.broker.subscriptions(
+            endpoint,
+            client_id=encode_object_name_part(self.client_id),
+            attributes=attributes,
+            batch_size=batch_size
+        ):
+            yield _subscription
+
+    async def consumers(self, attributes: Optional[Iterable[str]] = None, batch_size: Optional[int] = None) -> AsyncGenerator[Subscription, None]:
+        async for _subscription in self._subscriptions('Consumer', attributes, batch_size):
+            yield _subscription
+
+    async def producers(self, attributes: Optional[Iterable[str]] = None, batch_size: Optional[int] = None) -> AsyncGenerator[Subscription, None]:
+        async for _subscription in self._subscriptions('Producer', attributes, batch_size):
+            yield _subscription
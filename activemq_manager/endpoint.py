@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import time
+from collections import deque
+from typing import TYPE_CHECKING
+
+
+if TYPE_CHECKING:
+    from typing import Deque, Optional
+
+
+class Endpoint:
+    # one jolokia agent of a client; tracks the smoothed latency of its responses and backs off
+    # after failures so reads can be routed to the fastest healthy agent
+    smoothing: float = 0.3
+    # number of recent latencies kept to compute hedging percentiles
+    window: int = 100
+    min_samples: int = 10
+    retry_after: float = 1.0
+    max_retry_after: float = 30.0
+    __slots__ = ('url', 'latency', 'failures', 'retry_at', 'master', 'requests', '_samples')
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+        # exponentially weighted moving average of the response time in seconds
+        self.latency: Optional[float] = None
+        self.failures = 0
+        self.retry_at = 0.0
+        # None until the Slave attribute of the broker was read through this endpoint
+        self.master: Optional[bool] = None
+        self.requests = 0
+        self._samples: Deque[float] = deque(maxlen=self.window)
+
+    def __repr__(self) -> str:
+        latency = f'{self.latency:.3f}' if self.latency is not None else None
+        return f'<activemq_manager.Endpoint object url={self.url} latency={latency} healthy={self.healthy}>'
+
+    @property
+    def healthy(self) -> bool:
+        return self.retry_at <= time.monotonic()
+
+    def record(self, seconds: float) -> None:
+        self.requests += 1
+        self.failures = 0
+        self.retry_at = 0.0
+        self._samples.append(seconds)
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency += self.smoothing * (seconds - self.latency)
+
+    def failed(self) -> None:
+        # the endpoint is skipped for retry_after seconds, doubling with every consecutive failure
+        self.requests += 1
+        self.failures += 1
+        self.master = None
+        self.retry_at = time.monotonic() + min(self.max_retry_after, self.retry_after * 2 ** (self.failures - 1))
+
+    def percentile(self, q: float) -> Optional[float]:
+        if len(self._samples) < self.min_samples:
+            return None
+        samples = sorted(self._samples)
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
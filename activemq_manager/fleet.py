@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import NamedTuple, TYPE_CHECKING
+from urllib.parse import urlsplit
+
+from .client import Client
+from .errors import ActivemqManagerError
+from .helpers import parse_object_name
+
+
+if TYPE_CHECKING:
+    from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Union
+    from .broker import Broker
+
+
+logger = logging.getLogger(__name__)
+
+
+class FleetResult(NamedTuple):
+    broker: Broker
+    source: str
+    value: Any
+    error: Optional[ActivemqManagerError]
+    seconds: float
+
+
+async def _collect(iterable: AsyncGenerator) -> List[Any]:
+    return [item async for item in iterable]
+
+
+def _remote_host(remote_address: str) -> Optional[str]:
+    # bridges report the remote address as tcp://host:port or /host:port
+    if '://' not in remote_address:
+        remote_address = f'tcp://{remote_address.lstrip("/")}'
+    return urlsplit(remote_address).hostname
+
+
+def default_endpoint(remote_address: str, broker_name: str) -> Optional[str]:
+    # map the openwire address of a network bridge to the jolokia endpoint of the web console
+    host = _remote_host(remote_address)
+    return f'http://{host}:8161' if host else None
+
+
+def default_target(remote_address: str, broker_name: str) -> Optional[str]:
+    # map the openwire address of a network bridge to the jmx service url of the broker
+    host = _remote_host(remote_address)
+    return f'service:jmx:rmi:///jndi/rmi://{host}:1099/jmxrmi' if host else None
+
+
+class Fleet:
+    # run the same read against many brokers at once; brokers are reached directly through
+    # their own jolokia endpoint or through a single jolokia agent in proxy mode
+
+    def __init__(
+        self,
+        endpoints: Iterable[Union[str, Client]] = (),
+        proxy: Optional[str] = None,
+        targets: Iterable[Union[str, Dict[str, Any]]] = (),
+        concurrency: int = 50,
+        timeout: float = 30.0,
+        workers: int = 4,
+        **client_kwargs
+    ) -> None:
+        if concurrency < 1:
+            raise ValueError(f'concurrency must be greater than zero: {concurrency}')
+        self.proxy = proxy
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.workers = workers
+        self.brokers: List[Broker] = list()
+        # the last error of each source which could not be connected
+        self.errors: Dict[str, ActivemqManagerError] = dict()
+        self._client_kwargs = client_kwargs
+        self._clients: List[Client] = list()
+        self._connected: Set[int] = set()
+        self._limiter: Optional[asyncio.Semaphore] = None
+
+        for endpoint in endpoints:
+            self.add(endpoint)
+        for target in targets:
+            self.add_target(target)
+
+    def __repr__(self) -> str:
+        return f'<activemq_manager.Fleet object clients={len(self._clients)} brokers={len(self.brokers)}>'
+
+    async def __aenter__(self) -> Fleet:
+        return await self.connect()
+
+    async def __aexit__(self, *args, **kwargs) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        await asyncio.gather(*[client.close() for client in self._clients])
+
+    @property
+    def sources(self) -> List[str]:
+        return [client.source for client in self._clients]
+
+    def add(self, endpoint: Union[str, Client]) -> Client:
+        client = endpoint if isinstance(endpoint, Client) else Client(endpoint, **self._client_kwargs)
+        self._clients.append(client)
+        return client
+
+    def add_target(self, target: Union[str, Dict[str, Any]]) -> Client:
+        if self.proxy is None:
+            raise ActivemqManagerError('a proxy endpoint is required for jolokia proxy targets')
+        return self.add(Client(self.proxy, target=target, **self._client_kwargs))
+
+    async def _connect(self, client: Client) -> List[Broker]:
+        # a jolokia agent can serve more than one broker; find the names of every one of them
+        object_names = await asyncio.wait_for(
+            client.list_request('search', 'org.apache.activemq:type=Broker,brokerName=*'),
+            self.timeout
+        )
+        names = sorted({parse_object_name(object_name)['brokerName'] for object_name in object_names})
+        return [client.broker(name, workers=self.workers) for name in names]
+
+    async def connect(self) -> Fleet:
+        if self._limiter is None:
+            self._limiter = asyncio.Semaphore(self.concurrency)
+
+        clients = [client for client in self._clients if id(client) not in self._connected]
+        for client in clients:
+            client.limiter = self._limiter
+
+        results = await asyncio.gather(*[self._connect(client) for client in clients], return_exceptions=True)
+        for client, result in zip(clients, results):
+            if isinstance(result, asyncio.TimeoutError):
+                self.errors[client.source] = ActivemqManagerError(f'broker did not respond within {self.timeout} seconds', source=client.source)
+            elif isinstance(result, ActivemqManagerError):
+                self.errors[client.source] = result
+            elif isinstance(result, Exception):
+                # e.g. an http error or a response which is not json; one broken source must not
+                # keep the others from connecting
+                self.errors[client.source] = ActivemqManagerError(f'unable to connect: {result!r}', source=client.source, error=result)
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                self._connected.add(id(client))
+                self.errors.pop(client.source, None)
+                self.brokers.extend(result)
+        for source, error in self.errors.items():
+            logger.warning(f'unable to connect to {source}: {error}')
+        return self
+
+    async def discover(
+        self,
+        endpoint_for: Optional[Callable[[str, str], Optional[str]]] = None,
+        max_rounds: int = 8
+    ) -> List[Broker]:
+        # follow the network bridges of every broker to the brokers on the other side; the
+        # remote openwire address is mapped to an endpoint (or a proxy target) by endpoint_for
+        if endpoint_for is None:
+            endpoint_for = default_endpoint if self.proxy is None else default_target
+
+        discovered: List[Broker] = list()
+        for _ in range(max_rounds):
+            known = {broker.name for broker in self.brokers}
+            sources = set(self.sources)
+            added = False
+            async for result in self.sweep(lambda broker: broker._pattern_read(
+                f'org.apache.activemq:type=Broker,brokerName={broker.name},connector=networkConnectors,networkConnectorName=*,networkBridge=*',
+                attribute=['RemoteAddress', 'RemoteBrokerName']
+            )):
+                if result.error is not None:
+                    continue
+                for bridge in result.value.values():
+                    remote_name = bridge.get('RemoteBrokerName')
+                    remote_address = bridge.get('RemoteAddress')
+                    if not remote_name or not remote_address or remote_name in known:
+                        continue
+                    endpoint = endpoint_for(remote_address, remote_name)
+                    if endpoint is None or endpoint in sources:
+                        continue
+                    if self.proxy is None:
+                        self.add(endpoint)
+                    else:
+                        self.add_target(endpoint)
+                    sources.add(endpoint)
+                    known.add(remote_name)
+                    added = True
+            if not added:
+                break
+
+            count = len(self.brokers)
+            await self.connect()
+            discovered.extend(self.brokers[count:])
+        return discovered
+
+    async def sweep(self, fn: Callable[[Broker], Awaitable[Any]], timeout: Optional[float] = None) -> AsyncGenerator[FleetResult, None]:
+        # call fn for every broker at the same time and yield the results as they complete; a
+        # broker which fails or does not finish within the timeout yields a result with an
+        # error instead of holding up the others
+        if timeout is None:
+            timeout = self.timeout
+
+        async def _run(broker: Broker) -> FleetResult:
+            start = time.monotonic()
+            try:
+                value = await asyncio.wait_for(fn(broker), timeout)
+            except asyncio.TimeoutError:
+                return FleetResult(broker, broker._client.source, None, ActivemqManagerError(
+                    f'broker did not respond within {timeout} seconds',
+                    broker=broker.name,
+                    source=broker._client.source
+                ), time.monotonic() - start)
+            except ActivemqManagerError as e:
+                return FleetResult(broker, broker._client.source, None, e, time.monotonic() - start)
+            except Exception as e:
+                return FleetResult(broker, broker._client.source, None, ActivemqManagerError(
+                    f'broker request failed: {e!r}',
+                    broker=broker.name,
+                    source=broker._client.source,
+                    error=e
+                ), time.monotonic() - start)
+            return FleetResult(broker, broker._client.source, value, None, time.monotonic() - start)
+
+        pending: Set[asyncio.Future] = {asyncio.ensure_future(_run(broker)) for broker in self.brokers}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    async def attributes(self, timeout: Optional[float] = None) -> AsyncGenerator[FleetResult, None]:
+        async for result in self.sweep(lambda broker: broker.attributes(), timeout=timeout):
+            yield result
+
+    async def attribute(self, attribute_: str, timeout: Optional[float] = None) -> AsyncGenerator[FleetResult, None]:
+        async for result in self.sweep(lambda broker: broker.attribute(attribute_), timeout=timeout):
+            yield result
+
+    async def queues(self, timeout: Optional[float] = None, **kwargs) -> AsyncGenerator[FleetResult, None]:
+        async for result in self.sweep(lambda broker: _collect(broker.queues(**kwargs)), timeout=timeout):
+            yield result
+
+    async def topics(self, timeout: Optional[float] = None, **kwargs) -> AsyncGenerator[FleetResult, None]:
+        async for result in self.sweep(lambda broker: _collect(broker.topics(**kwargs)), timeout=timeout):
+            yield result
+
+    async def connections(self, timeout: Optional[float] = None, **kwargs) -> AsyncGenerator[FleetResult, None]:
+        async for result in self.sweep(lambda broker: _collect(broker.connections(**kwargs)), timeout=timeout):
+            yield result
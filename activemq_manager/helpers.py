@@ -1,18 +1,22 @@
 from __future__ import annotations
 
-from datetime import datetime
+import re
+from datetime import datetime, timezone
+from fnmatch import fnmatchcase
 from typing import TYPE_CHECKING
 
+from .errors import ActivemqManagerError
+
 
 if TYPE_CHECKING:
-    from typing import Dict
+    from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
 
 
 def activemq_stamp_datetime(timestamp: str) -> datetime:
     if len(timestamp) != 19 and len(timestamp) != 24 and len(timestamp) != 27:
         raise ValueError('activemq timestamps are either 20, 24, or 27 characters: got {} ({})'.format(len(timestamp), timestamp))
 
-    microsecond = int(timestamp[20:23]) * 1000 if len(timestamp) == 26 else 0
+    microsecond = int(timestamp[20:23]) * 1000 if len(timestamp) > 19 and timestamp[19] == '.' else 0
 
     return datetime(
         year=int(timestamp[0:4]),
@@ -25,9 +29,144 @@ def activemq_stamp_datetime(timestamp: str) -> datetime:
     )
 
 
+def _dateparser_parse(timestamp: str) -> Optional[datetime]:
+    # dateparser is slow to import and to run so it is only used for unexpected formats
+    import dateparser
+    return dateparser.parse(timestamp)
+
+
+def parse_timestamp(timestamp: Any) -> Optional[datetime]:
+    # jolokia serializes java.util.Date as ISO-8601 (e.g. 2022-01-05T10:30:20-05:00) and
+    # message objects carry JMSTimestamp as epoch milliseconds
+    if isinstance(timestamp, (int, float)) and not isinstance(timestamp, bool):
+        return datetime.fromtimestamp(timestamp / 1000, tz=timezone.utc)
+    elif not isinstance(timestamp, str) or not timestamp:
+        return None
+
+    _timestamp = timestamp
+    if _timestamp[-1] in 'Zz':
+        _timestamp = f'{_timestamp[:-1]}+00:00'
+    elif len(_timestamp) > 24 and _timestamp[-5] in '+-' and _timestamp[-4:].isdigit():
+        _timestamp = f'{_timestamp[:-2]}:{_timestamp[-2:]}'
+    try:
+        return datetime.fromisoformat(_timestamp)
+    except ValueError:
+        return _dateparser_parse(timestamp)
+
+
+def parse_timestamps(timestamps: Iterable[Any]) -> List[Optional[datetime]]:
+    # browse results share a handful of distinct (second precision) timestamps so each
+    # distinct value is only parsed once
+    parsed: Dict[Any, Optional[datetime]] = dict()
+    results: List[Optional[datetime]] = list()
+    for timestamp in timestamps:
+        try:
+            results.append(parsed[timestamp])
+        except KeyError:
+            value = parsed[timestamp] = parse_timestamp(timestamp)
+            results.append(value)
+        except TypeError:
+            results.append(parse_timestamp(timestamp))
+    return results
+
+
+def _object_name_parts(path: str) -> Tuple[str, str]:
+    domain, separator, properties = path.partition(':')
+    if not separator or '=' in domain:
+        return '', path
+    return domain, properties
+
+
 def parse_object_name(path: str) -> Dict[str, str]:
     parts: Dict[str, str] = dict()
-    for part in path.split(','):
-        key, val = tuple(part.split('='))
-        parts[key] = val
+    for part in _object_name_parts(path)[1].split(','):
+        if '=' in part:
+            key, val = part.split('=', 1)
+            parts[key] = val
     return parts
+
+
+def canonical_object_name(path: str) -> str:
+    # jolokia reports object names with the properties sorted by key
+    domain, properties = _object_name_parts(path)
+    parts = sorted(part for part in properties.split(',') if '=' in part)
+    if '*' in properties.split(','):
+        parts.append('*')
+    return f'{domain}:{",".join(parts)}' if domain else ','.join(parts)
+
+
+def object_name_matches(pattern: str, object_name: str) -> bool:
+    # jmx object name pattern matching: wildcards in the domain and in property values, and a
+    # trailing * property which allows properties that are not in the pattern
+    pattern_domain, pattern_properties = _object_name_parts(pattern)
+    domain, _ = _object_name_parts(object_name)
+    if not fnmatchcase(domain, pattern_domain):
+        return False
+    expected = parse_object_name(pattern)
+    properties = parse_object_name(object_name)
+    if '*' not in pattern_properties.split(',') and set(expected) != set(properties):
+        return False
+    return all(key in properties and fnmatchcase(properties[key], val) for key, val in expected.items())
+
+
+def encode_object_name_part(value: str) -> str:
+    # activemq replaces characters which are not allowed in object name values (JMXSupport)
+    value = re.sub(r"[:,'\"]", '_', value)
+    return value.replace('?', '&qe;').replace('=', '&amp;').replace('*', '&ast;')
+
+
+# jolokia processing parameters which can be sent in the config of a request
+PROCESSING_PARAMETERS = frozenset({
+    'maxDepth',
+    'maxCollectionSize',
+    'maxObjects',
+    'ignoreErrors',
+    'serializeLong',
+    'serializeException',
+    'includeStackTrace',
+    'canonicalNaming',
+    'ifModifiedSince'
+})
+
+
+def merge_config(*configs: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    # later configs take precedence; a value of None unsets a parameter of an earlier config
+    # and is only dropped when the request is sent
+    merged: Dict[str, Any] = dict()
+    for config in configs:
+        if not config:
+            continue
+        unknown = set(config) - PROCESSING_PARAMETERS
+        if unknown:
+            raise ValueError(f'unknown jolokia processing parameters: {", ".join(sorted(unknown))}')
+        merged.update(config)
+    return merged or None
+
+
+def truncated_paths(value: Any, max_collection_size: Optional[int], path: str = '') -> List[str]:
+    # jolokia cuts collections at maxCollectionSize without marking them; a collection of
+    # exactly that size is reported as truncated
+    if not max_collection_size or not isinstance(value, (dict, list)):
+        return []
+    paths: List[str] = list()
+    if path and len(value) >= max_collection_size:
+        paths.append(path)
+    items = value.items() if isinstance(value, dict) else enumerate(value)
+    for key, val in items:
+        paths.extend(truncated_paths(val, max_collection_size, f'{path}/{key}' if path else str(key)))
+    return paths
+
+
+def cached_attribute(attributes: Dict[str, Any], name: str, expected_type: Type) -> Any:
+    # attributes of a queue, topic, connection or subscription as stored by the last read; with
+    # ignoreErrors jolokia puts an "ERROR: ..." message in place of an attribute which failed
+    if not attributes:
+        raise ActivemqManagerError('attributes have not been cached')
+    elif name not in attributes:
+        raise ActivemqManagerError(f'attribute was not read: {name}')
+    value = attributes[name]
+    if isinstance(value, str) and value.startswith('ERROR: '):
+        raise ActivemqManagerError(f'attribute could not be read: {name}', error=value)
+    elif value is not None and not isinstance(value, expected_type):
+        raise ActivemqManagerError(f'attribute type is incorrect: {name}', value=value)
+    return value
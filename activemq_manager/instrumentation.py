@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import bisect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING
+
+from .cache import mbean_type
+
+
+if TYPE_CHECKING:
+    from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+# the span requests are attributed to; set per task so concurrent fan-out calls each get their own
+current_span: ContextVar[Optional[Span]] = ContextVar('activemq_manager_span', default=None)
+
+
+def operation_label(payload: Dict[str, Any]) -> Tuple[str, str]:
+    # (operation, mbean kind), e.g. ('read', 'Queue') or ('browseAsTable', 'Queue')
+    type_ = payload.get('type') or ''
+    if type_ == 'exec':
+        type_ = str(payload.get('operation') or '').split('(')[0]
+    return type_, mbean_type(payload.get('mbean') or '')
+
+
+class Span:
+    # a timed unit of work; fan-outs create a child span per call and every http request made
+    # while a span is current is recorded as a child of it
+    __slots__ = ('name', 'parent', 'attributes', 'children', 'start', 'end', 'error')
+
+    def __init__(self, name: str, parent: Optional[Span] = None, **attributes) -> None:
+        self.name = name
+        self.parent = parent
+        self.attributes = attributes
+        self.children: List[Span] = list()
+        self.start = time.monotonic()
+        self.end: Optional[float] = None
+        self.error: Optional[BaseException] = None
+        if parent is not None:
+            parent.children.append(self)
+
+    def __repr__(self) -> str:
+        return f'<activemq_manager.Span object name={self.name} seconds={self.seconds:.3f} children={len(self.children)}>'
+
+    @property
+    def seconds(self) -> float:
+        return (self.end if self.end is not None else time.monotonic()) - self.start
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        if self.end is None:
+            self.end = time.monotonic()
+            self.error = error
+
+    @contextmanager
+    def child(self, name: str, **attributes) -> Iterator[Span]:
+        with span(name, parent=self, **attributes) as _span:
+            yield _span
+
+    def walk(self, depth: int = 0) -> Iterator[Tuple[int, Span]]:
+        yield depth, self
+        for child in self.children:
+            yield from child.walk(depth + 1)
+
+    def slowest(self, n: int = 10) -> List[Span]:
+        # the slowest spans below this one which did not start any requests of their own
+        leaves = [_span for _, _span in self.walk() if not _span.children and _span is not self]
+        return sorted(leaves, key=lambda _span: _span.seconds, reverse=True)[:n]
+
+    def format(self) -> str:
+        return '\n'.join(
+            f'{"  " * depth}{_span.name} {_span.seconds * 1000:.1f}ms'
+            + ''.join(f' {key}={val}' for key, val in _span.attributes.items())
+            for depth, _span in self.walk()
+        )
+
+
+@contextmanager
+def span(name: str, parent: Optional[Span] = None, **attributes) -> Iterator[Span]:
+    # start a span below the current one (or parent) and make it current until the block exits
+    _span = Span(name, parent if parent is not None else current_span.get(), **attributes)
+    token = current_span.set(_span)
+    try:
+        yield _span
+    except BaseException as e:
+        _span.finish(e)
+        raise
+    finally:
+        current_span.reset(token)
+        _span.finish()
+
+
+class RequestEvent:
+    # one http exchange with the jolokia agent; a bulk request carries every payload it sent
+    __slots__ = ('source', 'requests', 'streaming', 'start', 'seconds', 'status', 'statuses', 'bytes_out', 'bytes_in', 'error', 'span')
+
+    def __init__(self, source: str, requests: Sequence[Dict[str, Any]], streaming: bool = False) -> None:
+        self.source = source
+        self.requests = requests
+        self.streaming = streaming
+        self.start = time.monotonic()
+        self.seconds = 0.0
+        # http status of the exchange and the jolokia status of each request
+        self.status: Optional[int] = None
+        self.statuses: List[Optional[int]] = list()
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.error: Optional[BaseException] = None
+        self.span: Optional[Span] = None
+
+    def __repr__(self) -> str:
+        return f'<activemq_manager.RequestEvent object requests={len(self.requests)} status={self.status} seconds={self.seconds:.3f}>'
+
+    @property
+    def labels(self) -> List[Tuple[str, str]]:
+        return [operation_label(payload) for payload in self.requests]
+
+    def finish(self, status: Optional[int], error: Optional[BaseException] = None) -> None:
+        self.seconds = time.monotonic() - self.start
+        self.status = status
+        self.error = error
+
+
+class Instrumentation:
+    # base class of the objects passed to Client(instruments=[...]); every method is optional
+
+    def before_request(self, event: RequestEvent) -> None:
+        pass
+
+    def after_request(self, event: RequestEvent) -> None:
+        pass
+
+    def span_finished(self, span: Span) -> None:
+        # called for spans which were started by a fan-out without a parent span
+        pass
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels) -> str:
+    return '{' + ','.join(f'{key}="{_escape(str(val))}"' for key, val in labels.items()) + '}'
+
+
+class Metrics(Instrumentation):
+    # latency histograms, request/error/byte counters and an in-flight gauge per source and
+    # (operation, mbean kind); render() returns them in the prometheus text format
+    default_buckets: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self, buckets: Optional[Sequence[float]] = None, namespace: str = 'activemq_manager') -> None:
+        self.buckets = tuple(sorted(buckets or self.default_buckets))
+        self.namespace = namespace
+        # (source, operation, kind) => [bucket counts..., +Inf count], sum
+        self._histograms: Dict[Tuple[str, str, str], List[int]] = dict()
+        self._sums: Dict[Tuple[str, str, str], float] = dict()
+        # (source, operation, kind, status) => count
+        self._requests: Dict[Tuple[str, str, str, str], int] = dict()
+        self._bytes: Dict[Tuple[str, str], int] = dict()
+        self._in_flight: Dict[str, int] = dict()
+
+    def __repr__(self) -> str:
+        return f'<activemq_manager.Metrics object series={len(self._histograms)}>'
+
+    def before_request(self, event: RequestEvent) -> None:
+        self._in_flight[event.source] = self._in_flight.get(event.source, 0) + 1
+
+    def after_request(self, event: RequestEvent) -> None:
+        self._in_flight[event.source] -= 1
+        for direction, count in (('out', event.bytes_out), ('in', event.bytes_in)):
+            self._bytes[(event.source, direction)] = self._bytes.get((event.source, direction), 0) + count
+
+        bucket = bisect.bisect_left(self.buckets, event.seconds)
+        for i, (operation, kind) in enumerate(event.labels):
+            key = (event.source, operation, kind)
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(self.buckets) + 1)
+            histogram[bucket] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + event.seconds
+
+            status = event.statuses[i] if i < len(event.statuses) else None
+            if status is None:
+                status = event.status
+            request_key = (event.source, operation, kind, str(status) if status is not None else 'error')
+            self._requests[request_key] = self._requests.get(request_key, 0) + 1
+
+    def count(self, operation: Optional[str] = None, kind: Optional[str] = None, status: Optional[str] = None) -> int:
+        return sum(
+            count for (_, _operation, _kind, _status), count in self._requests.items()
+            if (operation is None or operation == _operation) and (kind is None or kind == _kind) and (status is None or status == _status)
+        )
+
+    @property
+    def in_flight(self) -> int:
+        return sum(self._in_flight.values())
+
+    def render(self) -> str:
+        name = f'{self.namespace}_request_duration_seconds'
+        lines = [f'# HELP {name} Latency of jolokia http requests.', f'# TYPE {name} histogram']
+        for (source, operation, kind), histogram in sorted(self._histograms.items()):
+            cumulative = 0
+            for le, count in zip([*(repr(bucket) for bucket in self.buckets), '+Inf'], histogram):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(source=source, operation=operation, mbean=kind, le=le)} {cumulative}')
+            lines.append(f'{name}_sum{_labels(source=source, operation=operation, mbean=kind)} {self._sums[(source, operation, kind)]}')
+            lines.append(f'{name}_count{_labels(source=source, operation=operation, mbean=kind)} {cumulative}')
+
+        name = f'{self.namespace}_requests_total'
+        lines.extend([f'# HELP {name} Jolokia requests by status.', f'# TYPE {name} counter'])
+        for (source, operation, kind, status), count in sorted(self._requests.items()):
+            lines.append(f'{name}{_labels(source=source, operation=operation, mbean=kind, status=status)} {count}')
+
+        name = f'{self.namespace}_bytes_total'
+        lines.extend([f'# HELP {name} Bytes sent to and received from jolokia.', f'# TYPE {name} counter'])
+        for (source, direction), count in sorted(self._bytes.items()):
+            lines.append(f'{name}{_labels(source=source, direction=direction)} {count}')
+
+        name = f'{self.namespace}_requests_in_flight'
+        lines.extend([f'# HELP {name} Http requests waiting for a response.', f'# TYPE {name} gauge'])
+        for source, count in sorted(self._in_flight.items()):
+            lines.append(f'{name}{_labels(source=source)} {count}')
+        return '\n'.join(lines) + '\n'
@@ -17,6 +17,8 @@ logger = logging.getLogger(__name__)
 
 
 class ScheduledJob:
+    __slots__ = ('broker', 'id', '_data')
+
     def __init__(self, broker: Broker, id_: str, data: Dict[str, Any]):
         self.broker = broker
         self.id = id_
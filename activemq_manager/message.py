@@ -1,29 +1,47 @@
 from __future__ import annotations
 
 import logging
+from array import array
 from collections import namedtuple, OrderedDict
 from typing import TYPE_CHECKING
 
-import dateparser
-
 from .errors import ActivemqManagerError
+from .helpers import parse_timestamp
 
 
 if TYPE_CHECKING:
     from datetime import datetime
-    from typing import Any, Dict, List, Optional
+    from os import PathLike
+    from typing import Any, Dict, Iterator, List, Optional, Union
     from .queue import Queue
 
 
 logger = logging.getLogger(__name__)
 MessageData = namedtuple('MessageData', ['header', 'properties', 'message'])
+_UNSET = object()
+
+
+def _to_bytes(values: List[int]) -> bytes:
+    # jolokia serializes a java byte[] as a list of signed values (-128 to 127)
+    try:
+        return bytes(values)
+    except ValueError:
+        try:
+            return array('b', values).tobytes()
+        except OverflowError:
+            return bytes(value & 0xff for value in values)
 
 
 class Message:
+    __slots__ = ('queue', 'id', '_attributes', '_timestamp', '_data')
+
     def __init__(self, queue: Queue, id_: str, attributes: Dict[str, Any]):
         self.queue = queue
         self.id = id_
         self._attributes = attributes
+        self._timestamp: Any = _UNSET
+        # browseMessages result; attached by Queue.fetch_bodies() or the first call to data()
+        self._data: Optional[Dict[str, Any]] = None
 
     def __repr__(self) -> str:
         return f'<activemq_manager.Message object id={self.id}>'
@@ -34,7 +52,9 @@ class Message:
 
     @property
     def timestamp(self) -> Optional[datetime]:
-        return dateparser.parse(self._attributes['JMSTimestamp'])
+        if self._timestamp is _UNSET:
+            self._timestamp = parse_timestamp(self._attributes['JMSTimestamp'])
+        return self._timestamp
 
     @property
     def persistent(self) -> bool:
@@ -45,44 +65,100 @@ class Message:
         return self._attributes['StringProperties']
 
     async def data(self):
-        api_response = await self._client.list_request('exec', f'org.apache.activemq:brokerName={self.queue.broker.name},type=Broker,destinationType=Queue,destinationName={self.queue.name}', operation='browseMessages(java.lang.String)', arguments=[f"JMSMessageID = '{self.id}'"])
-        if len(api_response) == 1:
-            return api_response[0]
+        if self._data is not None:
+            return self._data
+
+        body_cache = self.queue.broker.body_cache
+        self._data = body_cache.get(self.id)
+        if self._data is None:
+            api_response = await self._client.list_request('exec', f'org.apache.activemq:brokerName={self.queue.broker.name},type=Broker,destinationType=Queue,destinationName={self.queue.name}', operation='browseMessages(java.lang.String)', arguments=[f"JMSMessageID = '{self.id}'"])
+            if len(api_response) == 1:
+                self._data = api_response[0]
+                body_cache.store(self.id, self.queue.name, api_response[0])
+            else:
+                raise ActivemqManagerError(f'only one message should have been return [count={len(api_response)}]')
+        return self._data
+
+    async def body(self) -> bytes:
+        data = await self.data()
+        if 'text' in data:
+            return data['text'].encode('utf-8')
+        elif 'content' in data:
+            return self.decode_byte_array(data['content'])
         else:
-            raise ActivemqManagerError(f'only one message should have been return [count={len(api_response)}]')
+            raise ActivemqManagerError(f'cannot parse message content from {data}')
 
-    async def text(self) -> str:
+    async def text(self, encoding: str = 'utf-8', errors: str = 'replace') -> str:
         data = await self.data()
         if 'text' in data:
             return data['text']
         elif 'content' in data:
-            return self.parse_byte_array(data['content'])
+            return self.parse_byte_array(data['content'], encoding=encoding, errors=errors)
+        else:
+            raise ActivemqManagerError(f'cannot parse message content from {data}')
+
+    async def save_body(self, path: Union[str, PathLike], chunk_size: int = 65536) -> int:
+        # write the body to path a chunk at a time; returns the number of bytes written
+        data = await self.data()
+        if 'text' in data:
+            chunks: Iterator[bytes] = self._text_chunks(data['text'], chunk_size)
+        elif 'content' in data:
+            if not self.is_byte_array(data['content']):
+                raise ValueError(f'data is not a byte array: {data["content"]}')
+            chunks = self._byte_array_chunks(data['content'], chunk_size)
         else:
             raise ActivemqManagerError(f'cannot parse message content from {data}')
 
+        written = 0
+        with open(path, 'wb') as f:
+            for chunk in chunks:
+                written += f.write(chunk)
+        return written
+
     async def delete(self) -> None:
         logger.info(f'delete message from {self.queue.name}: {self.id}')
         await self._client.request('exec', f'org.apache.activemq:brokerName={self.queue.broker.name},type=Broker,destinationType=Queue,destinationName={self.queue.name}', operation='removeMessage(java.lang.String)', arguments=[self.id])
+        self.queue.broker.body_cache.discard(self.id)
 
     async def retry(self) -> None:
         logger.info(f'retrying message from {self.queue.name}: {self.id}')
         await self._client.request('exec', f'org.apache.activemq:brokerName={self.queue.broker.name},type=Broker,destinationType=Queue,destinationName={self.queue.name}', operation='retryMessage(java.lang.String)', arguments=[self.id])
+        self.queue.broker.body_cache.discard(self.id)
 
     async def move(self, target_queue) -> None:
         logger.info(f'moving message from {self.queue.name} to {target_queue}: {self.id}')
         await self._client.request('exec', f'org.apache.activemq:brokerName={self.queue.broker.name},type=Broker,destinationType=Queue,destinationName={self.queue.name}', operation='moveMessageTo(java.lang.String, java.lang.String)', arguments=[self.id, target_queue])
+        self.queue.broker.body_cache.discard(self.id)
+
+    @staticmethod
+    def _text_chunks(text: str, chunk_size: int) -> Iterator[bytes]:
+        # encode chunk_size characters at a time so a large body is never held twice in memory;
+        # slicing by character never splits a multi-byte sequence
+        for i in range(0, len(text), chunk_size):
+            yield text[i:i + chunk_size].encode('utf-8')
 
     @staticmethod
-    def parse_byte_array(data) -> str:
+    def _byte_array_chunks(data: Dict[str, Any], chunk_size: int) -> Iterator[bytes]:
+        first_index = data['offset']
+        final_index = data['offset'] + data['length']
+        for i in range(first_index, final_index, chunk_size):
+            yield _to_bytes(data['data'][i:min(i + chunk_size, final_index)])
+
+    @staticmethod
+    def decode_byte_array(data) -> bytes:
         if not Message.is_byte_array(data):
             raise ValueError(f'data is not a byte array: {data}')
         first_index = data['offset']
         final_index = data['offset'] + data['length']
-        trimmed_data = data['data'][first_index:final_index]
-        value = ''
-        for c in trimmed_data:
-            value += chr(c)
-        return value
+        if first_index == 0 and final_index == len(data['data']):
+            return _to_bytes(data['data'])
+        return _to_bytes(data['data'][first_index:final_index])
+
+    @staticmethod
+    def parse_byte_array(data, encoding: str = 'utf-8', errors: str = 'replace') -> str:
+        # bytes messages may hold any binary payload so undecodable bytes are replaced unless
+        # errors='strict' is passed
+        return Message.decode_byte_array(data).decode(encoding, errors)
 
     @staticmethod
     def is_byte_array(data: Any) -> bool:
@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import operator
+import time
+from array import array
+from itertools import compress
+from typing import TYPE_CHECKING
+
+from .errors import ActivemqManagerError
+from .helpers import parse_object_name
+
+
+if TYPE_CHECKING:
+    from typing import AsyncGenerator, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+    from .broker import Broker
+
+
+logger = logging.getLogger(__name__)
+NAN = float('nan')
+INF = float('inf')
+
+
+def _column(values: Iterable[float]) -> array:
+    return array('d', values)
+
+
+def _rate(delta: float, seconds: float) -> float:
+    # counters which went backwards were reset (e.g. a broker restart); the rate is unknown
+    return delta / seconds if delta >= 0 else NAN
+
+
+def _drain(size: float, net: float) -> float:
+    if size == 0:
+        return 0.0
+    elif math.isnan(size) or math.isnan(net):
+        return NAN
+    return size / net if net > 0 else INF
+
+
+class PollerSnapshot:
+    # the latest sample of every destination together with the change since an earlier
+    # sample; every column is an array('d') in the same order as names
+
+    def __init__(
+        self,
+        names: List[str],
+        timestamp: float,
+        seconds: float,
+        values: Dict[str, array],
+        deltas: Dict[str, array]
+    ) -> None:
+        self.names = names
+        self.timestamp = timestamp
+        self.seconds = seconds
+        self.values = values
+        self.deltas = deltas
+
+    def __repr__(self) -> str:
+        return f'<activemq_manager.PollerSnapshot object destinations={len(self.names)} seconds={self.seconds:.1f}>'
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _column(self, columns: Dict[str, array], attribute: str) -> array:
+        try:
+            return columns[attribute]
+        except KeyError:
+            raise ActivemqManagerError(f'attribute was not polled: {attribute}')
+
+    def rate(self, attribute: str) -> array:
+        # change per second of a counter attribute
+        return _column(map(_rate, self._column(self.deltas, attribute), [self.seconds] * len(self.names)))
+
+    @property
+    def enqueue_rate(self) -> array:
+        return self.rate('EnqueueCount')
+
+    @property
+    def dequeue_rate(self) -> array:
+        return self.rate('DequeueCount')
+
+    @property
+    def growth(self) -> array:
+        # change of the queue size per second; negative while the queue is draining
+        return _column(map(operator.truediv, self._column(self.deltas, 'QueueSize'), [self.seconds] * len(self.names)))
+
+    @property
+    def time_to_drain(self) -> array:
+        # seconds until the queue is empty at the current net dequeue rate; inf if it is not draining
+        net = map(operator.sub, self.dequeue_rate, self.enqueue_rate)
+        return _column(map(_drain, self._column(self.values, 'QueueSize'), net))
+
+    def rows(self) -> Iterator[Tuple[str, Dict[str, float]]]:
+        columns = dict(self.values)
+        for attribute in ('EnqueueCount', 'DequeueCount'):
+            if attribute in self.deltas:
+                columns[f'{attribute}Rate'] = self.rate(attribute)
+        if 'QueueSize' in self.deltas:
+            columns['Growth'] = self.growth
+            if 'EnqueueCount' in self.deltas and 'DequeueCount' in self.deltas:
+                columns['TimeToDrain'] = self.time_to_drain
+
+        for i, name in enumerate(self.names):
+            yield name, {attribute: column[i] for attribute, column in columns.items()}
+
+    def to_dict(self) -> Dict[str, Dict[str, float]]:
+        return dict(self.rows())
+
+
+class Poller:
+    # polls a fixed set of numeric attributes of every destination with a single pattern read
+    # per interval. samples are kept in ring buffers: one array('d') per attribute laid out as
+    # [row * capacity + slot], so memory is fixed at rows * capacity * attributes * 8 bytes
+    default_attributes: Tuple[str, ...] = ('EnqueueCount', 'DequeueCount', 'QueueSize', 'ConsumerCount')
+
+    def __init__(
+        self,
+        broker: Broker,
+        interval: float = 15.0,
+        attributes: Optional[Sequence[str]] = None,
+        capacity: int = 60,
+        destination_type: str = 'Queue',
+        clock: Callable[[], float] = time.time
+    ) -> None:
+        if capacity < 2:
+            raise ValueError(f'capacity must be at least 2: {capacity}')
+        self.broker = broker
+        self.interval = interval
+        self.attributes = tuple(attributes or self.default_attributes)
+        self.capacity = capacity
+        self.destination_type = destination_type
+        self.samples = 0
+        self._clock = clock
+        self._timestamps = _column([NAN] * capacity)
+        self._columns: Dict[str, array] = {attribute: _column([]) for attribute in self.attributes}
+        self._names: List[Optional[str]] = list()
+        self._rows: Dict[str, int] = dict()
+        # consecutive samples each row was missing from; rows missing for a full buffer are reused
+        self._missing: List[int] = list()
+        self._free: List[int] = list()
+
+    def __repr__(self) -> str:
+        return f'<activemq_manager.Poller object destinations={len(self._rows)} samples={self.samples}>'
+
+    def __aiter__(self) -> AsyncIterator[PollerSnapshot]:
+        return self.deltas()
+
+    @property
+    def mbean(self) -> str:
+        return f'org.apache.activemq:type=Broker,brokerName={self.broker.name},destinationType={self.destination_type},destinationName=*'
+
+    @property
+    def names(self) -> List[str]:
+        return [name for name in self._names if name is not None]
+
+    def _add_row(self, name: str) -> int:
+        if self._free:
+            row = self._free.pop()
+            for column in self._columns.values():
+                column[row * self.capacity:(row + 1) * self.capacity] = _column([NAN] * self.capacity)
+            self._names[row] = name
+            self._missing[row] = 0
+        else:
+            row = len(self._names)
+            empty = _column([NAN] * self.capacity)
+            for column in self._columns.values():
+                column.extend(empty)
+            self._names.append(name)
+            self._missing.append(0)
+        self._rows[name] = row
+        return row
+
+    def record(self, timestamp: float, samples: Dict[str, Dict[str, object]]) -> None:
+        # store one sample; samples is keyed by destination name
+        slot = self.samples % self.capacity
+        capacity = self.capacity
+        self._timestamps[slot] = timestamp
+
+        seen = set()
+        for name, attributes in samples.items():
+            row = self._rows.get(name)
+            if row is None:
+                row = self._add_row(name)
+            seen.add(row)
+            index = row * capacity + slot
+            for attribute, column in self._columns.items():
+                value = attributes.get(attribute)
+                column[index] = float(value) if isinstance(value, (int, float)) else NAN
+
+        for row, _name in enumerate(self._names):
+            if _name is None or row in seen:
+                continue
+            for column in self._columns.values():
+                column[row * capacity + slot] = NAN
+            self._missing[row] += 1
+            if self._missing[row] >= capacity:
+                del self._rows[_name]
+                self._names[row] = None
+                self._free.append(row)
+        for row in seen:
+            self._missing[row] = 0
+
+        self.samples += 1
+
+    async def sample(self) -> None:
+        results = await self.broker._pattern_read(self.mbean, attribute=list(self.attributes))
+        self.record(self._clock(), {
+            parse_object_name(object_name)['destinationName']: attributes
+            for object_name, attributes in results.items()
+        })
+
+    def snapshot(self, window: int = 1) -> PollerSnapshot:
+        # compare the latest sample with the sample taken window intervals earlier
+        if window < 1 or window >= self.capacity:
+            raise ValueError(f'window must be between 1 and {self.capacity - 1}: {window}')
+        elif self.samples <= window:
+            raise ActivemqManagerError('not enough samples have been collected', samples=self.samples, window=window)
+
+        slot = (self.samples - 1) % self.capacity
+        previous_slot = (self.samples - 1 - window) % self.capacity
+        active = [name is not None for name in self._names]
+
+        values: Dict[str, array] = dict()
+        deltas: Dict[str, array] = dict()
+        for attribute, column in self._columns.items():
+            current = column[slot::self.capacity]
+            previous = column[previous_slot::self.capacity]
+            values[attribute] = _column(compress(current, active))
+            deltas[attribute] = _column(compress(map(operator.sub, current, previous), active))
+
+        return PollerSnapshot(
+            self.names,
+            self._timestamps[slot],
+            self._timestamps[slot] - self._timestamps[previous_slot],
+            values,
+            deltas
+        )
+
+    def history(self, name: str, attribute: str) -> List[Tuple[float, float]]:
+        # (timestamp, value) of every sample still in the buffer, oldest first
+        row = self._rows.get(name)
+        if row is None:
+            raise ActivemqManagerError(f'destination is not being polled: {name}')
+        column = self._columns[attribute]
+        start = max(0, self.samples - self.capacity)
+        return [
+            (self._timestamps[i % self.capacity], column[row * self.capacity + i % self.capacity])
+            for i in range(start, self.samples)
+        ]
+
+    async def deltas(self, window: int = 1) -> AsyncGenerator[PollerSnapshot, None]:
+        # sample every interval and yield a snapshot once there is enough history; ticks which
+        # are missed because a sample took longer than the interval are skipped
+        deadline = time.monotonic()
+        while True:
+            await self.sample()
+            if self.samples > window:
+                yield self.snapshot(window)
+
+            deadline += self.interval
+            delay = deadline - time.monotonic()
+            if delay < 0:
+                logger.warning(f'poller for {self.broker.name} is {-delay:.1f} seconds behind; skipping missed intervals')
+                deadline += math.ceil(-delay / self.interval) * self.interval
+                delay = deadline - time.monotonic()
+            await asyncio.sleep(delay)
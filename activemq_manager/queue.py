@@ -1,29 +1,50 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+import math
+import time
 from datetime import datetime
 from typing import TYPE_CHECKING
 from uuid import UUID
 
 from .errors import ActivemqManagerError
+from .helpers import cached_attribute, encode_object_name_part
 from .message import Message
+from .table import MessageTable
 
 
 if TYPE_CHECKING:
     from datetime import datetime
-    from typing import Any, Dict, List, Optional, Type
+    from typing import Any, AsyncGenerator, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Type
     from .broker import Broker
     from .client import Client
+    from .subscription import Subscription
 
 
 logger = logging.getLogger(__name__)
+# upper bound for JMSTimestamp windows (java.lang.Long.MAX_VALUE)
+MAX_TIMESTAMP = 9223372036854775807
 
 
 class Queue:
+    # the broker caps browse results at the maxBrowsePageSize destination policy; 400 is the
+    # default of that policy and a smaller cap is detected from the first page of a browse
+    browse_page_size: int = 400
+    # upper limit on the number of windows created by the first split of the queue
+    max_initial_windows: int = 1024
+    # number of message ids packed into a single JMSMessageID IN (...) selector
+    id_selector_size: int = 200
+    # attributes behind the typed properties; a projection for reads which only need those
+    typed_attribute = ['QueueSize', 'EnqueueCount', 'DequeueCount', 'ConsumerCount']
+    __slots__ = ('broker', 'name', '_attributes', '_truncated')
+
     def __init__(self, broker, name) -> None:
         self.broker = broker
         self.name = name
         self._attributes: Dict[str, Any] = dict()
+        # attribute paths whose collections were cut at maxCollectionSize
+        self._truncated: List[str] = list()
 
     def __repr__(self) -> str:
         return f'<activemq_manager.Queue object name={self.name}>'
@@ -32,24 +53,29 @@ class Queue:
     def _client(self) -> Client:
         return self.broker._client
 
-    @staticmethod
-    async def new(broker, name) -> Queue:
-        q = Queue(broker, name)
-        return await q.update()
+    @classmethod
+    async def new(cls, broker, name, attributes: Optional[Iterable[str]] = None, config: Optional[Dict[str, Any]] = None) -> Queue:
+        q = cls(broker, name)
+        return await q.update(attributes=attributes, config=config)
+
+    @property
+    def mbean(self) -> str:
+        return f'org.apache.activemq:type=Broker,brokerName={self.broker.name},destinationType=Queue,destinationName={self.name}'
+
+    def _read_request(self, attribute=None, config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return self._client._payload('read', self.mbean, attribute=attribute, config=self.broker._config(config))
 
-    async def update(self) -> Queue:
-        self._attributes = await self.attributes()
+    async def update(self, attributes: Optional[Iterable[str]] = None, config: Optional[Dict[str, Any]] = None) -> Queue:
+        # attributes limits the read to a projection which is validated against the mbean schema
+        self.broker._store(self, await self.attributes(await self.broker.projection(self.mbean, attributes), config=config), config)
         return self
 
-    def _attribute(self, name: str, expected_type: Type) -> Any:
-        if not self._attributes:
-            ActivemqManagerError('attributes have not been cached')
-        elif name not in self._attributes:
-            ActivemqManagerError(f'attribute name does not exist: {name}')
-        elif not isinstance(self._attributes[name], expected_type):
-            ActivemqManagerError(f'attribute type is incorrect: {name}')
+    @property
+    def truncated(self) -> List[str]:
+        return self._truncated
 
-        return self._attributes[name]
+    def _attribute(self, name: str, expected_type: Type) -> Any:
+        return cached_attribute(self._attributes, name, expected_type)
 
     @property
     def size(self) -> int:
@@ -67,24 +93,301 @@ class Queue:
     def consumer_count(self) -> int:
         return self._attribute('ConsumerCount', int)
 
-    async def attributes(self, attribute=None) -> Dict[str, Any]:
-        return await self._client.dict_request('read', f'org.apache.activemq:type=Broker,brokerName={self.broker.name},destinationType=Queue,destinationName={self.name}', attribute=attribute)
+    async def attributes(self, attribute=None, config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return await self._client.dict_request('read', self.mbean, attribute=attribute, config=self.broker._config(config))
+
+    async def consumers(self, attributes: Optional[Iterable[str]] = None, batch_size: Optional[int] = None) -> AsyncGenerator[Subscription, None]:
+        async for _subscription in self.broker.subscriptions(
+            'Consumer',
+            destination_type='Queue',
+            destination_name=encode_object_name_part(self.name),
+            attributes=attributes,
+            batch_size=batch_size
+        ):
+            yield _subscription
+
+    async def producers(self, attributes: Optional[Iterable[str]] = None, batch_size: Optional[int] = None) -> AsyncGenerator[Subscription, None]:
+        async for _subscription in self.broker.subscriptions(
+            'Producer',
+            destination_type='Queue',
+            destination_name=encode_object_name_part(self.name),
+            attributes=attributes,
+            batch_size=batch_size
+        ):
+            yield _subscription
 
     async def purge(self) -> None:
         await self._client.request('exec', f'org.apache.activemq:brokerName={self.broker.name},type=Broker,destinationType=Queue,destinationName={self.name}', operation='purge')
+        self.broker.body_cache.invalidate(self.name)
 
     async def delete(self) -> None:
         await self._client.request('exec', f'org.apache.activemq:type=Broker,brokerName={self.broker.name}', operation='removeQueue(java.lang.String)', arguments=[self.name])
+        self.broker.body_cache.invalidate(self.name)
+
+    def _forget_bodies(self, ids: Optional[Iterable[str]]) -> None:
+        # drop cached bodies of messages which have left the queue
+        if ids is None:
+            self.broker.body_cache.invalidate(self.name)
+        else:
+            for id_ in ids:
+                self.broker.body_cache.discard(id_)
+
+    @classmethod
+    def _id_selectors(cls, ids: Iterable[str]) -> Iterator[str]:
+        _ids = [i.replace("'", "''") for i in ids]
+        for i in range(0, len(_ids), cls.id_selector_size):
+            quoted_ids = ', '.join(f"'{id_}'" for id_ in _ids[i:i + cls.id_selector_size])
+            yield f'JMSMessageID IN ({quoted_ids})'
+
+    async def _exec_many(self, operation: str, arguments: List[List[Any]]) -> List[Any]:
+        results = await self._client.bulk_request([
+            self._client._payload('exec', self.mbean, operation=operation, arguments=arguments_)
+            for arguments_ in arguments
+        ])
+        for result in results:
+            if isinstance(result, ActivemqManagerError):
+                raise result
+        return results
+
+    async def _matching_operation(self, operation: str, selector: Optional[str], ids: Optional[Iterable[str]], *arguments: str) -> int:
+        # selectors are a single server-side operation; id lists are packed into chunked IN selectors
+        if selector is not None and ids is None:
+            selectors = [selector]
+        elif ids is not None and selector is None:
+            ids = list(ids)
+            selectors = list(self._id_selectors(ids))
+        else:
+            raise ValueError('either selector or ids must be provided')
+        try:
+            return sum(await self._exec_many(operation, [[selector_, *arguments] for selector_ in selectors]))
+        finally:
+            if not operation.startswith('copy'):
+                self._forget_bodies(ids)
+
+    async def delete_messages(self, selector: Optional[str] = None, ids: Optional[Iterable[str]] = None) -> int:
+        logger.info(f'delete messages from {self.name} [selector={selector}]')
+        return await self._matching_operation('removeMatchingMessages(java.lang.String)', selector, ids)
+
+    async def move_messages(self, target_queue: str, selector: Optional[str] = None, ids: Optional[Iterable[str]] = None) -> int:
+        logger.info(f'moving messages from {self.name} to {target_queue} [selector={selector}]')
+        return await self._matching_operation('moveMatchingMessagesTo(java.lang.String,java.lang.String)', selector, ids, target_queue)
+
+    async def copy_messages(self, target_queue: str, selector: Optional[str] = None, ids: Optional[Iterable[str]] = None) -> int:
+        logger.info(f'copying messages from {self.name} to {target_queue} [selector={selector}]')
+        return await self._matching_operation('copyMatchingMessagesTo(java.lang.String,java.lang.String)', selector, ids, target_queue)
+
+    async def retry_messages(self, selector: Optional[str] = None, ids: Optional[Iterable[str]] = None) -> int:
+        logger.info(f'retrying messages from {self.name} [selector={selector}]')
+        if selector is not None and ids is not None:
+            raise ValueError('selector and ids cannot be used together')
+        elif selector is None and ids is None:
+            try:
+                return await self._client.request('exec', self.mbean, operation='retryMessages()', arguments=[])
+            finally:
+                self._forget_bodies(None)
+
+        # the queue mbean has no selector based retry so the matching ids are collected first
+        if selector is not None:
+            ids = [m.id async for m in self.iter_messages(selector)]
+        ids = list(ids or [])
+        try:
+            results = await self._exec_many('retryMessage(java.lang.String)', [[id_] for id_ in ids])
+        finally:
+            self._forget_bodies(ids)
+        return sum(1 for result in results if result is True)
+
+    async def fetch_bodies(self, messages: Iterable[Message]) -> int:
+        # fetch the bodies of many messages with chunked JMSMessageID IN (...) browses sent as
+        # bulk requests; the results are attached to the messages and added to the body cache.
+        # returns the number of bodies which were fetched from the broker
+        body_cache = self.broker.body_cache
+        missing: Dict[str, List[Message]] = dict()
+        for message in messages:
+            if message._data is None:
+                message._data = body_cache.get(message.id)
+            if message._data is None:
+                missing.setdefault(message.id, list()).append(message)
+        if not missing:
+            return 0
+
+        results = await self._exec_many('browseMessages(java.lang.String)', [[selector_] for selector_ in self._id_selectors(missing)])
+        fetched = 0
+        for result in results:
+            for data in result or []:
+                for message in missing.get(data.get('JMSMessageID'), []):
+                    message._data = data
+                body_cache.store(data.get('JMSMessageID'), self.name, data)
+                fetched += 1
+        return fetched
+
+    async def _browse(self, selector: Optional[str] = None) -> Dict[str, Any]:
+        if selector:
+            return await self._client.dict_request('exec', f'org.apache.activemq:brokerName={self.broker.name},type=Broker,destinationType=Queue,destinationName={self.name}', operation='browseAsTable(java.lang.String)', arguments=[selector])
+        else:
+            return await self._client.dict_request('exec', f'org.apache.activemq:brokerName={self.broker.name},type=Broker,destinationType=Queue,destinationName={self.name}', operation='browseAsTable()', arguments=[])
 
-    async def messages(self, selector=None) -> List[Message]:
+    async def _iter_browse(self, selector: Optional[str] = None) -> AsyncGenerator[Tuple[str, Any], None]:
+        # same as _browse() but the rows are decoded and returned as they arrive
         if selector:
-            message_table = await self._client.dict_request('exec', f'org.apache.activemq:brokerName={self.broker.name},type=Broker,destinationType=Queue,destinationName={self.name}', operation='browseAsTable(java.lang.String)', arguments=[selector])
+            operation, arguments = 'browseAsTable(java.lang.String)', [selector]
         else:
-            message_table = await self._client.dict_request('exec', f'org.apache.activemq:brokerName={self.broker.name},type=Broker,destinationType=Queue,destinationName={self.name}', operation='browseAsTable()', arguments=[])
+            operation, arguments = 'browseAsTable()', []
+        async for id_, attributes in self._client.stream_dict_request('exec', f'org.apache.activemq:brokerName={self.broker.name},type=Broker,destinationType=Queue,destinationName={self.name}', operation=operation, arguments=arguments):
+            yield id_, attributes
+
+    async def messages(self, selector=None) -> MessageTable:
+        message_table = MessageTable(self)
+        async for id_, attributes in self._iter_browse(selector):
+            message_table.append(id_, attributes)
 
         # check and potentially warn if the number of messages returned is less than the total queue size
         await self.update()
         if self.size > len(message_table):
             logger.warning(f'queue size is greater than the returned number of messages [qsize={self.size}, message={len(message_table)}]; use a selector to reduce the total number of messages')
 
-        return [Message(queue=self, id_=id_, attributes=attributes) for id_, attributes in message_table.items()]
+        return message_table
+
+    @staticmethod
+    def _window_selector(selector: Optional[str], window: Tuple[int, int, Optional[int]]) -> str:
+        start, end, priority = window
+        clauses = [f'JMSTimestamp >= {start}', f'JMSTimestamp < {end}']
+        if priority is not None:
+            clauses.append(f'JMSPriority = {priority}')
+        if selector:
+            clauses.insert(0, f'({selector})')
+        return ' AND '.join(clauses)
+
+    def _split_window(self, window: Tuple[int, int, Optional[int]], parts: int) -> List[Tuple[int, int, Optional[int]]]:
+        start, end, priority = window
+        if end - start <= 1:
+            # a single millisecond cannot be split any further by timestamp so fall back to priority
+            if priority is None:
+                return [(start, end, p) for p in range(10)]
+            logger.warning(f'unable to browse every message in {self.name} with JMSTimestamp={start} and JMSPriority={priority}; the browse page size was reached')
+            return []
+
+        parts = max(2, min(parts, end - start))
+        step = math.ceil((end - start) / parts)
+        return [(i, min(i + step, end), priority) for i in range(start, end, step)]
+
+    async def _browse_page(self, selector: Optional[str], with_body: bool) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        # browseAsTable and, optionally, browseMessages for the same selector in one bulk request
+        if not with_body:
+            return await self._browse(selector), dict()
+
+        _signature, _arguments = ('(java.lang.String)', [selector]) if selector else ('()', [])
+        table, messages = await self._client.bulk_request([
+            self._client._payload('exec', self.mbean, operation=f'browseAsTable{_signature}', arguments=_arguments),
+            self._client._payload('exec', self.mbean, operation=f'browseMessages{_signature}', arguments=_arguments)
+        ])
+        for result in (table, messages):
+            if isinstance(result, ActivemqManagerError):
+                raise result
+        if not isinstance(table, dict) or not isinstance(messages, list):
+            raise ActivemqManagerError('browse returned an unexpected payload')
+        return table, {data.get('JMSMessageID'): data for data in messages}
+
+    async def iter_messages(
+        self,
+        selector: Optional[str] = None,
+        concurrency: int = 4,
+        page_size: Optional[int] = None,
+        with_body: bool = False
+    ) -> AsyncGenerator[Message, None]:
+        # enumerate every message on the queue by browsing disjoint JMSTimestamp windows; any
+        # window which fills a browse page is split into smaller windows and browsed again
+        if page_size is None:
+            page_size = self.browse_page_size
+
+        def _message(id_: str, attributes: Dict[str, Any], bodies: Dict[str, Any]) -> Message:
+            message = Message(queue=self, id_=id_, attributes=attributes)
+            if id_ in bodies:
+                message._data = bodies[id_]
+                self.broker.body_cache.store(id_, self.name, bodies[id_])
+            return message
+
+        async def _first_page() -> AsyncGenerator[Message, None]:
+            if with_body:
+                table, bodies = await self._browse_page(selector, with_body)
+                for id_, attributes in table.items():
+                    yield _message(id_, attributes, bodies)
+            else:
+                async for id_, attributes in self._iter_browse(selector):
+                    yield Message(queue=self, id_=id_, attributes=attributes)
+
+        # the first page is a plain browse which is usually enough for small queues; without
+        # bodies it is streamed so the first messages are returned as soon as they are decoded
+        seen: Set[str] = set()
+        oldest = MAX_TIMESTAMP
+        async for message in _first_page():
+            seen.add(message.id)
+            timestamp = message.timestamp
+            if timestamp is not None:
+                oldest = min(oldest, int(timestamp.timestamp()) * 1000)
+            yield message
+        if not seen:
+            return
+
+        # the policy of the broker may cap the page below page_size so the first page is compared
+        # against the queue size rather than the expected page size
+        await self.update()
+        if len(seen) >= self.size:
+            return
+        # the first page was truncated which makes its length the cap of every page after it
+        page_size = min(page_size, len(seen))
+
+        # seed the windows using the oldest timestamp on the first page and the current queue size
+        if oldest == MAX_TIMESTAMP:
+            oldest = 1
+        now = max(int(time.time() * 1000) + 1, oldest + 1)
+        initial_parts = min(self.max_initial_windows, math.ceil(self.size / (page_size / 2)))
+        windows: List[Tuple[Tuple[int, int, Optional[int]], Set[str]]] = [((0, oldest, None), seen), ((now, MAX_TIMESTAMP, None), seen)]
+        windows.extend((window, seen) for window in self._split_window((oldest, now, None), initial_parts))
+
+        semaphore = asyncio.Semaphore(concurrency)
+        pages: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+        tasks: Set[asyncio.Task] = set()
+
+        async def _worker(window: Tuple[int, int, Optional[int]], parent_seen: Set[str]) -> None:
+            # hold the semaphore until the page has been handed off to bound the number of pages in memory
+            async with semaphore:
+                try:
+                    page: Any = await self._browse_page(self._window_selector(selector, window), with_body)
+                except Exception as e:
+                    page = e
+                await pages.put((window, parent_seen, page))
+
+        def _spawn(window: Tuple[int, int, Optional[int]], parent_seen: Set[str]) -> None:
+            task = asyncio.ensure_future(_worker(window, parent_seen))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        outstanding = 0
+        try:
+            for window, parent_seen in windows:
+                _spawn(window, parent_seen)
+                outstanding += 1
+
+            while outstanding > 0:
+                window, parent_seen, page = await pages.get()
+                outstanding -= 1
+                if isinstance(page, Exception):
+                    raise page
+                page, bodies = page
+
+                for id_, attributes in page.items():
+                    if id_ not in parent_seen:
+                        yield _message(id_, attributes, bodies)
+
+                if len(page) >= page_size:
+                    # only the ids of a full page need to be remembered; the sub-windows may
+                    # return these messages again
+                    child_seen = parent_seen | set(page.keys())
+                    for child in self._split_window(window, 4):
+                        _spawn(child, child_seen)
+                        outstanding += 1
+        finally:
+            for task in list(tasks):
+                task.cancel()
+            # wait for the cancelled browses so none is left running after the generator is closed
+            await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import logging
+import time
+from fnmatch import fnmatchcase
+from typing import NamedTuple, TYPE_CHECKING
+
+from .errors import ActivemqManagerError
+from .helpers import parse_object_name
+
+
+if TYPE_CHECKING:
+    from typing import Callable, Dict, List, Set
+    from .broker import Broker
+
+
+logger = logging.getLogger(__name__)
+
+
+class DestinationEvent(NamedTuple):
+    # kind is 'added' or 'removed'
+    kind: str
+    destination_type: str
+    name: str
+
+
+class DestinationRegistry:
+    # the destination names of a broker, refreshed with a search which carries ifModifiedSince;
+    # jolokia answers 304 when no mbean was registered or unregistered since the previous
+    # search so an unchanged broker costs a request without a value
+    max_age: float = 0.0  # a refresh within max_age seconds of the previous one is skipped
+
+    def __init__(self, broker: Broker) -> None:
+        self.broker = broker
+        self.not_modified = 0
+        # destination type => names
+        self._names: Dict[str, Set[str]] = dict()
+        self._sorted: Dict[str, List[str]] = dict()
+        # destination type => server timestamp of the last search, in epoch seconds
+        self._timestamps: Dict[str, int] = dict()
+        self._refreshed: Dict[str, float] = dict()
+        # concurrent refreshes of the same destination type share one request
+        self._pending: Dict[str, asyncio.Future] = dict()
+        self._subscribers: List[Callable[[DestinationEvent], None]] = list()
+
+    def __repr__(self) -> str:
+        counts = ' '.join(f'{destination_type}={len(names)}' for destination_type, names in self._names.items())
+        return f'<activemq_manager.DestinationRegistry object {counts}>'
+
+    def mbean(self, destination_type: str = 'Queue', name: str = '*') -> str:
+        return f'org.apache.activemq:type=Broker,brokerName={self.broker.name},destinationType={destination_type},destinationName={name}'
+
+    def subscribe(self, callback: Callable[[DestinationEvent], None]) -> None:
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[DestinationEvent], None]) -> None:
+        self._subscribers.remove(callback)
+
+    def _emit(self, event: DestinationEvent) -> None:
+        for callback in list(self._subscribers):
+            try:
+                callback(event)
+            except Exception as e:
+                logger.exception(e)
+
+    async def refresh(self, destination_type: str = 'Queue', force: bool = False) -> bool:
+        # returns True when the names were searched again and False when they did not change
+        refreshed = self._refreshed.get(destination_type)
+        if not force and refreshed is not None and time.monotonic() - refreshed < self.max_age:
+            return False
+
+        pending = self._pending.get(destination_type)
+        if pending is None:
+            pending = self._pending[destination_type] = asyncio.ensure_future(self._refresh(destination_type, force))
+            pending.add_done_callback(lambda _: self._pending.pop(destination_type, None))
+        return await asyncio.shield(pending)
+
+    async def _refresh(self, destination_type: str, force: bool) -> bool:
+        client = self.broker._client
+        timestamp = self._timestamps.get(destination_type)
+        config = {'ifModifiedSince': timestamp} if timestamp is not None and not force else None
+        try:
+            # a raw request keeps the timestamp of the response; the clock of the broker decides
+            # what has changed since
+            response = client.codec.loads(await client.raw_request('search', self.mbean(destination_type), config=config))
+        except ActivemqManagerError as e:
+            if e.get('status') == 304:
+                self.not_modified += 1
+                self._refreshed[destination_type] = time.monotonic()
+                return False
+            raise
+
+        self._refreshed[destination_type] = time.monotonic()
+        if isinstance(response.get('timestamp'), int):
+            self._timestamps[destination_type] = response['timestamp']
+        self._sync(destination_type, {parse_object_name(object_name)['destinationName'] for object_name in response['value']})
+        return True
+
+    def _sync(self, destination_type: str, names: Set[str]) -> None:
+        previous = self._names.get(destination_type, set())
+        self._names[destination_type] = names
+        self._sorted[destination_type] = sorted(names)
+        for name in sorted(names - previous):
+            self._emit(DestinationEvent('added', destination_type, name))
+        for name in sorted(previous - names):
+            self._emit(DestinationEvent('removed', destination_type, name))
+
+    def has(self, name: str, destination_type: str = 'Queue') -> bool:
+        return name in self._names.get(destination_type, set())
+
+    def names(self, destination_type: str = 'Queue') -> List[str]:
+        return list(self._sorted.get(destination_type, []))
+
+    def prefix(self, prefix: str, destination_type: str = 'Queue') -> List[str]:
+        names = self._sorted.get(destination_type, [])
+        start = bisect.bisect_left(names, prefix)
+        end = start
+        while end < len(names) and names[end].startswith(prefix):
+            end += 1
+        return names[start:end]
+
+    def match(self, pattern: str, destination_type: str = 'Queue') -> List[str]:
+        # the same wildcards as object name patterns: * and ?
+        if '*' not in pattern and '?' not in pattern:
+            return [pattern] if pattern in self._names.get(destination_type, set()) else []
+        literal = pattern.split('*', 1)[0].split('?', 1)[0]
+        return [name for name in self.prefix(literal, destination_type) if fnmatchcase(name, pattern)]
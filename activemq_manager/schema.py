@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from .errors import ActivemqManagerError
+from .helpers import _object_name_parts
+
+
+if TYPE_CHECKING:
+    from typing import Any, Dict, Iterable, List, Optional, Set
+
+
+def list_path(object_name: str) -> str:
+    # jolokia list paths separate the domain and the properties with a slash; slashes and
+    # exclamation marks within the object name are escaped with an exclamation mark
+    domain, properties = _object_name_parts(object_name)
+    return '/'.join(part.replace('!', '!!').replace('/', '!/') for part in (domain, properties))
+
+
+class MBeanSchema:
+    # attribute and operation metadata of an mbean as returned by a jolokia list request;
+    # every mbean of the same kind (e.g. every queue) shares the same schema
+    __slots__ = ('kind', 'attributes', 'writable', 'operations')
+
+    def __init__(self, kind: str, attributes: Dict[str, str], writable: Set[str], operations: Dict[str, List[str]]) -> None:
+        self.kind = kind
+        # attribute name => java type
+        self.attributes = attributes
+        self.writable = writable
+        # operation name => signatures, e.g. browseAsTable => ['browseAsTable()', 'browseAsTable(java.lang.String)']
+        self.operations = operations
+
+    def __repr__(self) -> str:
+        return f'<activemq_manager.MBeanSchema object kind={self.kind} attributes={len(self.attributes)} operations={len(self.operations)}>'
+
+    def __contains__(self, attribute: object) -> bool:
+        return attribute in self.attributes
+
+    @classmethod
+    def from_list(cls, kind: str, value: Dict[str, Any]) -> MBeanSchema:
+        attributes: Dict[str, str] = dict()
+        writable: Set[str] = set()
+        for name, info in (value.get('attr') or {}).items():
+            attributes[name] = info.get('type', '') if isinstance(info, dict) else ''
+            if isinstance(info, dict) and info.get('rw') is True:
+                writable.add(name)
+
+        operations: Dict[str, List[str]] = dict()
+        for name, info in (value.get('op') or {}).items():
+            # overloaded operations are listed as one entry per signature; arguments are
+            # missing when they were cut off by maxDepth
+            signatures: List[str] = list()
+            for overload in info if isinstance(info, list) else [info]:
+                args = overload.get('args') if isinstance(overload, dict) else None
+                if isinstance(args, list) and all(isinstance(arg, dict) for arg in args):
+                    signatures.append(f'{name}({",".join(arg.get("type", "") for arg in args)})')
+            operations[name] = signatures
+        return cls(kind, attributes, writable, operations)
+
+    def validate(self, attributes: Iterable[str]) -> List[str]:
+        _attributes = list(attributes)
+        unknown = [name for name in _attributes if name not in self.attributes]
+        if unknown:
+            raise ActivemqManagerError(
+                f'attributes do not exist on {self.kind} mbeans: {", ".join(unknown)}',
+                kind=self.kind,
+                unknown=unknown
+            )
+        return _attributes
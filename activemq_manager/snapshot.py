@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import logging
+import mmap
+import os
+import sys
+from typing import TYPE_CHECKING
+
+from .broker import Broker
+from .cache import RequestCache, request_key
+from .client import Client
+from .codec import get_codec
+from .errors import ActivemqManagerError
+from .helpers import activemq_stamp_datetime, canonical_object_name, object_name_matches, parse_object_name
+from .queue import Queue
+
+
+if TYPE_CHECKING:
+    from os import PathLike
+    from typing import Any, AsyncGenerator, BinaryIO, Dict, Hashable, List, Optional, Tuple, Union
+    from .codec import JsonCodec
+
+
+logger = logging.getLogger(__name__)
+SNAPSHOT_VERSION = 1
+
+
+class SnapshotWriter:
+    # one record per line: a small json header with the jolokia request, a tab and the json
+    # value of the response. json never contains a raw tab so the header can be indexed
+    # without decoding the value. records of the same request marked as parts are merged
+    # on replay which lets large results (jobs, message headers) be written in pieces
+
+    def __init__(self, file: BinaryIO, codec: Optional[Union[str, JsonCodec]] = None) -> None:
+        self._file = file
+        self._codec = get_codec(codec)
+        self.records = 0
+
+    def _write(self, header: Dict[str, Any], value: Any) -> None:
+        self._file.write(self._codec.dumps(header))
+        self._file.write(b'\t')
+        self._file.write(self._codec.dumps(value))
+        self._file.write(b'\n')
+        self.records += 1
+
+    def meta(self, **meta) -> None:
+        self._write({'meta': SNAPSHOT_VERSION}, meta)
+
+    def read(self, mbean: str, value: Dict[str, Any]) -> None:
+        self._write({'request': {'type': 'read', 'mbean': mbean}}, value)
+
+    def write(self, payload: Dict[str, Any], value: Any, part: bool = False) -> None:
+        header: Dict[str, Any] = {'request': payload}
+        if part:
+            header['part'] = True
+        self._write(header, value)
+
+
+class SnapshotQueue(Queue):
+    # a snapshot holds every message header of a queue in a single browse record
+    __slots__ = ()
+    browse_page_size = sys.maxsize
+
+
+class SnapshotBroker(Broker):
+    _queue_class = SnapshotQueue
+
+
+class SnapshotClient(Client):
+    # read-only client which answers requests from a file written by Broker.snapshot(); the
+    # file is memory-mapped and each record is only decoded when it is requested
+    _broker_class = SnapshotBroker
+
+    def __init__(self, path: Union[str, PathLike], **kwargs) -> None:
+        super().__init__(f'snapshot://{path}', coalesce=False, **kwargs)
+        self.path = path
+        self.meta: Dict[str, Any] = dict()
+        # canonical object name => span of the attributes of that mbean
+        self._reads: Dict[str, Tuple[int, int]] = dict()
+        # request key => spans of the record and its parts
+        self._records: Dict[Hashable, List[Tuple[int, int]]] = dict()
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                raise ActivemqManagerError(f'snapshot is empty: {path}')
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._index()
+
+    def __repr__(self) -> str:
+        return f'<activemq_manager.SnapshotClient object path={self.path}>'
+
+    async def __aenter__(self) -> SnapshotClient:
+        return self
+
+    async def __aexit__(self, *args, **kwargs) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        self._mmap.close()
+
+    def _index(self) -> None:
+        position, size = 0, len(self._mmap)
+        while position < size:
+            tab = self._mmap.find(b'\t', position)
+            end = self._mmap.find(b'\n', tab)
+            if tab < 0 or end < 0:
+                logger.warning(f'ignoring incomplete record at the end of {self.path} [offset={position}]')
+                break
+            header = self.codec.loads(self._mmap[position:tab])
+            span = (tab + 1, end)
+            position = end + 1
+
+            request = header.get('request')
+            if 'meta' in header:
+                self.meta = self._load(span)
+            elif request.get('type') == 'read':
+                self._reads[canonical_object_name(request['mbean'])] = span
+            elif header.get('part') is True:
+                self._records.setdefault(request_key(request), list()).append(span)
+            else:
+                self._records[request_key(request)] = [span]
+
+    def _load(self, span: Tuple[int, int]) -> Any:
+        return self.codec.loads(self._mmap[span[0]:span[1]])
+
+    def _record(self, payload: Dict[str, Any]) -> Any:
+        spans = self._records.get(request_key(payload))
+        if spans is None:
+            raise self._not_found(payload)
+        value = self._load(spans[0])
+        for span in spans[1:]:
+            if isinstance(value, dict):
+                value.update(self._load(span))
+            else:
+                value.extend(self._load(span))
+        return value
+
+    @staticmethod
+    def _not_found(payload: Dict[str, Any], error: Optional[str] = None) -> ActivemqManagerError:
+        return ActivemqManagerError(
+            error or f'request is not in the snapshot: {payload.get("mbean")}',
+            status=404,
+            error_type='javax.management.InstanceNotFoundException',
+            request=payload
+        )
+
+    @property
+    def queue_names(self) -> List[str]:
+        return [
+            parse_object_name(object_name)['destinationName'] for object_name in self._reads
+            if parse_object_name(object_name).get('destinationType') == 'Queue'
+        ]
+
+    def _project(self, payload: Dict[str, Any], attributes: Dict[str, Any]) -> Any:
+        attribute = payload.get('attribute')
+        if attribute is None:
+            return attributes
+        for name in attribute if isinstance(attribute, list) else [attribute]:
+            if name not in attributes:
+                raise self._not_found(payload, f'attribute is not in the snapshot: {name}')
+        if isinstance(attribute, list):
+            return {name: attributes[name] for name in attribute}
+        return attributes[attribute]
+
+    def _replay(self, payload: Dict[str, Any]) -> Any:
+        type_ = payload.get('type')
+        mbean = payload.get('mbean') or ''
+        is_pattern = '*' in mbean or '?' in mbean
+
+        if type_ == 'search':
+            return [object_name for object_name in self._reads if object_name_matches(mbean, object_name)]
+
+        elif type_ == 'read' and is_pattern:
+            matches = {
+                object_name: self._load(span) for object_name, span in self._reads.items()
+                if object_name_matches(mbean, object_name)
+            }
+            if not matches:
+                raise self._not_found(payload)
+            attribute = payload.get('attribute')
+            names = attribute if isinstance(attribute, list) else None if attribute is None else [attribute]
+            return {
+                object_name: attributes if names is None else {name: attributes[name] for name in names if name in attributes}
+                for object_name, attributes in matches.items()
+            }
+
+        elif type_ == 'read':
+            span = self._reads.get(canonical_object_name(mbean))
+            if span is None:
+                raise self._not_found(payload)
+            return self._project(payload, self._load(span))
+
+        elif type_ == 'exec':
+            if RequestCache.mutates(payload):
+                raise ActivemqManagerError(
+                    'snapshots are read-only',
+                    status=400,
+                    error_type='java.lang.UnsupportedOperationException',
+                    request=payload
+                )
+            elif payload.get('operation') == 'getAllJobs(java.lang.String,java.lang.String)':
+                start, end = (activemq_stamp_datetime(argument) for argument in payload['arguments'])
+                jobs = self._record(dict(payload, operation='getAllJobs()', arguments=[]))
+                return {
+                    job_id: job for job_id, job in jobs.items()
+                    if start <= activemq_stamp_datetime(job['next']) <= end
+                }
+            return self._record(payload)
+
+        raise ActivemqManagerError(f'request type is not supported by snapshots: {type_}', status=400, request=payload)
+
+    async def _post(self, payload: Any, raw: bool = False) -> Any:
+        raise ActivemqManagerError('snapshots cannot send http requests')
+
+    async def _execute(self, payloads: List[Dict[str, Any]]) -> List[Any]:
+        values: List[Any] = list()
+        for payload in payloads:
+            try:
+                values.append(self._replay(payload))
+            except ActivemqManagerError as e:
+                values.append(e)
+        return values
+
+    async def _stream(self, expected_container: str, type_, mbean, **kwargs) -> AsyncGenerator[Tuple[Optional[str], Any], None]:
+        value = self._replay(self._payload(type_, mbean, **kwargs))
+        if expected_container == '{' and isinstance(value, dict):
+            for item in value.items():
+                yield item
+        elif expected_container == '[' and isinstance(value, list):
+            for item in value:
+                yield None, item
+        else:
+            raise ActivemqManagerError('dictionary was expected' if expected_container == '{' else 'list was expected')
+
+    async def raw_request(self, type_, mbean, **kwargs) -> bytes:
+        value = self._replay(self._payload(type_, mbean, **kwargs))
+        return self.codec.dumps({'value': value, 'status': 200})
+
+    def broker(self, name: Optional[str] = None, workers: int = 10, batch_size: Optional[int] = None, config: Optional[Dict[str, Any]] = None) -> Broker:
+        return super().broker(name=name or self.meta.get('broker') or 'localhost', workers=workers, batch_size=batch_size, config=config)
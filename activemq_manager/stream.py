@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import codecs
+import json
+from typing import TYPE_CHECKING
+
+from .errors import ActivemqManagerError
+
+
+if TYPE_CHECKING:
+    from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+_START = 'start'
+_KEY = 'key'
+_ITEMS = 'items'
+_DONE = 'done'
+_WHITESPACE = ' \t\n\r'
+_INCOMPLETE = object()
+
+
+class JsonValueParser:
+    # incrementally decode a jolokia response; the members of the top-level "value" are
+    # returned one at a time as soon as they are complete while every other top-level
+    # field (status, error, timestamp, etc.) is collected into self.fields
+
+    def __init__(self) -> None:
+        self.fields: Dict[str, Any] = dict()
+        self.container: Optional[str] = None
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json_decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._state = _START
+        self._eof = False
+        # do not retry a failed decode until the buffer has doubled; this keeps large
+        # items which span many chunks from being re-scanned on every chunk
+        self._retry_length = 0
+
+    def feed(self, data: bytes) -> List[Tuple[Optional[str], Any]]:
+        self._buffer = self._buffer[self._pos:] + self._decoder.decode(data)
+        self._retry_length -= self._pos
+        self._pos = 0
+        return list(self._parse())
+
+    def close(self) -> List[Tuple[Optional[str], Any]]:
+        self._eof = True
+        self._buffer = self._buffer[self._pos:] + self._decoder.decode(b'', final=True)
+        self._pos = 0
+        items = list(self._parse())
+        if self._state != _DONE:
+            raise ActivemqManagerError('incomplete json document was returned by the api')
+        return items
+
+    def _skip_whitespace(self, index: int) -> int:
+        while index < len(self._buffer) and self._buffer[index] in _WHITESPACE:
+            index += 1
+        return index
+
+    def _decode(self, index: int) -> Tuple[Any, int]:
+        if not self._eof and len(self._buffer) < self._retry_length:
+            return _INCOMPLETE, index
+        try:
+            value, end = self._json_decoder.raw_decode(self._buffer, index)
+        except json.JSONDecodeError as e:
+            if self._eof:
+                raise ActivemqManagerError('invalid json document was returned by the api', error=str(e))
+            self._retry_length = index + 2 * (len(self._buffer) - index)
+            return _INCOMPLETE, index
+        # a value which ends with the buffer may be a truncated number
+        if end == len(self._buffer) and not self._eof:
+            return _INCOMPLETE, index
+        self._retry_length = 0
+        return value, end
+
+    def _key(self, index: int) -> Tuple[Any, int]:
+        # decode an object key along with the following colon
+        key, end = self._decode(index)
+        if key is _INCOMPLETE:
+            return _INCOMPLETE, index
+        colon = self._skip_whitespace(end)
+        if colon >= len(self._buffer):
+            return _INCOMPLETE, index
+        elif self._buffer[colon] != ':':
+            raise ActivemqManagerError('invalid json document was returned by the api')
+        return key, self._skip_whitespace(colon + 1)
+
+    def _parse(self) -> Iterator[Tuple[Optional[str], Any]]:
+        while True:
+            self._pos = self._skip_whitespace(self._pos)
+            if self._pos >= len(self._buffer):
+                return
+            char = self._buffer[self._pos]
+
+            if self._state == _START:
+                if char != '{':
+                    raise ActivemqManagerError('json object was expected from the api')
+                self._pos += 1
+                self._state = _KEY
+
+            elif self._state == _KEY:
+                if char == ',':
+                    self._pos += 1
+                    continue
+                elif char == '}':
+                    self._pos += 1
+                    self._state = _DONE
+                    continue
+
+                key, index = self._key(self._pos)
+                if key is _INCOMPLETE or index >= len(self._buffer):
+                    return
+                if key == 'value' and self._buffer[index] in '{[':
+                    self.container = self._buffer[index]
+                    self._pos = index + 1
+                    self._state = _ITEMS
+                else:
+                    value, end = self._decode(index)
+                    if value is _INCOMPLETE:
+                        return
+                    self.fields[key] = value
+                    self._pos = end
+
+            elif self._state == _ITEMS:
+                if char == ',':
+                    self._pos += 1
+                    continue
+                elif char in '}]':
+                    self._pos += 1
+                    self._state = _KEY
+                    continue
+
+                if self.container == '{':
+                    key, index = self._key(self._pos)
+                    if key is _INCOMPLETE or index >= len(self._buffer):
+                        return
+                else:
+                    key, index = None, self._pos
+                value, end = self._decode(index)
+                if value is _INCOMPLETE:
+                    return
+                self._pos = end
+                yield key, value
+
+            else:
+                raise ActivemqManagerError('unexpected data after the json document returned by the api')
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING
+
+from .helpers import cached_attribute, object_name_matches, parse_object_name
+
+
+if TYPE_CHECKING:
+    from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Type
+    from .broker import Broker
+    from .client import Client
+
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    # a consumer or producer mbean (endpoint=Consumer or endpoint=Producer) of a destination
+    # attribute names of SubscriptionViewMBean and ProducerViewMBean
+    consumer_attribute = [
+        'ClientId',
+        'ConnectionId',
+        'SessionId',
+        'SubscriptionId',
+        'DestinationName',
+        'Selector',
+        'PrefetchSize',
+        'DispatchedQueueSize',
+        'DispatchedCounter',
+        'EnqueueCounter',
+        'DequeueCounter',
+        'MessageCountAwaitingAcknowledge',
+        'SlowConsumer'
+    ]
+    producer_attribute = [
+        'ClientId',
+        'ConnectionId',
+        'SessionId',
+        'ProducerId',
+        'DestinationName',
+        'SentCount',
+        'ProducerBlocked',
+        'UserName'
+    ]
+    __slots__ = ('broker', 'object_name', 'endpoint', 'destination_type', 'destination_name', '_attributes', '_truncated')
+
+    def __init__(self, broker: Broker, object_name: str) -> None:
+        properties = parse_object_name(object_name)
+        self.broker = broker
+        self.object_name = object_name
+        self.endpoint = properties.get('endpoint', '')
+        self.destination_type = properties.get('destinationType', '')
+        self.destination_name = properties.get('destinationName', '')
+        self._attributes: Dict[str, Any] = dict()
+        self._truncated: List[str] = list()
+
+    def __repr__(self) -> str:
+        return f'<activemq_manager.Subscription object endpoint={self.endpoint} destination={self.destination_name}>'
+
+    @property
+    def _client(self) -> Client:
+        return self.broker._client
+
+    @property
+    def mbean(self) -> str:
+        return self.object_name
+
+    @property
+    def default_attribute(self) -> List[str]:
+        return self.producer_attribute if self.endpoint == 'Producer' else self.consumer_attribute
+
+    def _read_request(self, attribute=None, config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        if attribute is None:
+            attribute = self.default_attribute
+        return self._client._payload('read', self.mbean, attribute=attribute, config=self.broker._config(config))
+
+    async def update(self, attributes: Optional[Iterable[str]] = None, config: Optional[Dict[str, Any]] = None) -> Subscription:
+        attribute = await self.broker.projection(self.mbean, attributes) or self.default_attribute
+        self.broker._store(self, await self._client.dict_request('read', self.mbean, attribute=attribute, config=self.broker._config(config)), config)
+        return self
+
+    def _attribute(self, name: str, expected_type: Type) -> Any:
+        return cached_attribute(self._attributes, name, expected_type)
+
+    @property
+    def truncated(self) -> List[str]:
+        return self._truncated
+
+    @property
+    def is_consumer(self) -> bool:
+        return self.endpoint == 'Consumer'
+
+    @property
+    def client_id(self) -> str:
+        return self._attribute('ClientId', str)
+
+    @property
+    def connection_id(self) -> str:
+        return self._attribute('ConnectionId', str)
+
+    @property
+    def id(self) -> str:
+        # a consumer only exposes the parts of its id: <connection id>:<session id>:<subscription id>
+        if self.is_consumer:
+            return f'{self.connection_id}:{self._attribute("SessionId", int)}:{self._attribute("SubscriptionId", int)}'
+        return self._attribute('ProducerId', str)
+
+    @property
+    def selector(self) -> Optional[str]:
+        return self._attribute('Selector', str)
+
+    @property
+    def dispatched_queue_size(self) -> int:
+        return self._attribute('DispatchedQueueSize', int)
+
+    @property
+    def slow(self) -> bool:
+        return self._attribute('SlowConsumer', bool)
+
+    @property
+    def sent_count(self) -> int:
+        return self._attribute('SentCount', int)
+
+    @property
+    def blocked(self) -> bool:
+        return self._attribute('ProducerBlocked', bool)
+
+
+class SubscriptionIndex:
+    # which destinations each client consumes from or produces to, and the reverse; clients are
+    # keyed by their jms client id, which is the ClientId of the Connection as well
+    __slots__ = ('_subscriptions', '_by_client', '_by_destination')
+
+    def __init__(self) -> None:
+        self._subscriptions: Dict[str, Tuple[str, str, Tuple[str, str]]] = dict()
+        self._by_client: Dict[str, Set[str]] = dict()
+        self._by_destination: Dict[Tuple[str, str], Set[str]] = dict()
+
+    def __repr__(self) -> str:
+        return f'<activemq_manager.SubscriptionIndex object subscriptions={len(self)}>'
+
+    def __len__(self) -> int:
+        return len(self._subscriptions)
+
+    def add(self, subscription: Subscription) -> None:
+        client_id = subscription._attributes.get('ClientId')
+        if not isinstance(client_id, str):
+            return
+        self.discard(subscription.object_name)
+        destination = (subscription.destination_type, subscription.destination_name)
+        self._subscriptions[subscription.object_name] = (subscription.endpoint, client_id, destination)
+        self._by_client.setdefault(client_id, set()).add(subscription.object_name)
+        self._by_destination.setdefault(destination, set()).add(subscription.object_name)
+
+    def discard(self, object_name: str) -> None:
+        entry = self._subscriptions.pop(object_name, None)
+        if entry is None:
+            return
+        _, client_id, destination = entry
+        self._by_client[client_id].discard(object_name)
+        if not self._by_client[client_id]:
+            del self._by_client[client_id]
+        self._by_destination[destination].discard(object_name)
+        if not self._by_destination[destination]:
+            del self._by_destination[destination]
+
+    def sync(self, pattern: str, subscriptions: Iterable[Subscription]) -> None:
+        # replace every entry matching the search pattern with the subscriptions which were found
+        _subscriptions = list(subscriptions)
+        found = {subscription.object_name for subscription in _subscriptions}
+        for object_name in [name for name in self._subscriptions if name not in found and object_name_matches(pattern, name)]:
+            self.discard(object_name)
+        for subscription in _subscriptions:
+            self.add(subscription)
+
+    def _select(self, object_names: Iterable[str], endpoint: Optional[str]) -> List[Tuple[str, str, Tuple[str, str]]]:
+        entries = [self._subscriptions[name] for name in object_names]
+        return [entry for entry in entries if endpoint is None or entry[0] == endpoint]
+
+    def destinations(self, client_id: str, endpoint: Optional[str] = None) -> Set[Tuple[str, str]]:
+        # (destination type, destination name) of every subscription of the client
+        return {destination for _, _, destination in self._select(self._by_client.get(client_id, ()), endpoint)}
+
+    def clients(self, destination_name: str, destination_type: str = 'Queue', endpoint: Optional[str] = None) -> Set[str]:
+        # client ids of the connections which consume from or produce to the destination
+        return {client_id for _, client_id, _ in self._select(self._by_destination.get((destination_type, destination_name), ()), endpoint)}
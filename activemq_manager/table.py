@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import heapq
+from array import array
+from itertools import compress
+from typing import overload, Sequence, TYPE_CHECKING
+
+from .errors import ActivemqManagerError
+from .helpers import parse_timestamps
+from .message import Message
+
+
+if TYPE_CHECKING:
+    from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+    from .queue import Queue
+
+
+# short names for the typed columns; any other browseAsTable column is available by its own name
+_ALIASES = {
+    'id': 'JMSMessageID',
+    'timestamp': 'JMSTimestamp',
+    'persistent': 'JMSDeliveryMode',
+    'priority': 'JMSPriority',
+    'size': 'BodyLength',
+    'properties': 'StringProperties'
+}
+
+
+class _Columns:
+    # the browse result of a queue stored column by column; shared by every table which is
+    # sorted or filtered from the same browse
+    __slots__ = ('ids', 'persistent', 'priorities', 'sizes', 'other', '_timestamps')
+
+    def __init__(self) -> None:
+        self.ids: List[str] = list()
+        self.persistent = array('b')
+        self.priorities = array('b')
+        self.sizes = array('q')
+        self.other: Dict[str, List[Any]] = dict()
+        self._timestamps: Optional[array] = None
+
+    def append(self, id_: str, attributes: Dict[str, Any]) -> None:
+        count = len(self.ids)
+        self.ids.append(id_)
+        self.persistent.append(attributes.get('JMSDeliveryMode') == 'PERSISTENT')
+        _priority = attributes.get('JMSPriority')
+        self.priorities.append(_priority if isinstance(_priority, int) else 4)
+        _size = attributes.get('BodyLength')
+        self.sizes.append(_size if isinstance(_size, int) else -1)
+        for key, value in attributes.items():
+            if key in ('JMSMessageID', 'JMSDeliveryMode', 'JMSPriority', 'BodyLength'):
+                continue
+            column = self.other.get(key)
+            if column is None:
+                column = self.other[key] = [None] * count
+            column.append(value)
+        # columns which were missing from this row
+        for column in self.other.values():
+            if len(column) <= count:
+                column.append(None)
+        self._timestamps = None
+
+    @property
+    def timestamps(self) -> array:
+        # JMSTimestamp as epoch milliseconds; only parsed the first time it is needed
+        if self._timestamps is None:
+            self._timestamps = array('q', (
+                int(timestamp.timestamp() * 1000) if timestamp else -1
+                for timestamp in parse_timestamps(self.other.get('JMSTimestamp', [None] * len(self.ids)))
+            ))
+        return self._timestamps
+
+    def column(self, name: str) -> Sequence[Any]:
+        name = _ALIASES.get(name, name)
+        if name == 'JMSMessageID':
+            return self.ids
+        elif name == 'JMSDeliveryMode':
+            return [bool(value) for value in self.persistent]
+        elif name == 'JMSPriority':
+            return self.priorities
+        elif name == 'BodyLength':
+            return self.sizes
+        elif name == 'JMSTimestamp' and name in self.other:
+            return self.timestamps
+        elif name in self.other:
+            return self.other[name]
+        raise KeyError(name)
+
+    def row(self, i: int) -> Dict[str, Any]:
+        attributes = {
+            'JMSMessageID': self.ids[i],
+            'JMSDeliveryMode': 'PERSISTENT' if self.persistent[i] else 'NON-PERSISTENT',
+            'JMSPriority': self.priorities[i],
+            'BodyLength': self.sizes[i]
+        }
+        for key, column in self.other.items():
+            attributes[key] = column[i]
+        return attributes
+
+
+class MessageTable(Sequence[Message]):
+    # the result of a browse stored column-wise; Message objects are only created when rows
+    # are accessed. sort, filter and top return new tables which share the same columns
+    __slots__ = ('queue', '_columns', '__index')
+
+    def __init__(self, queue: Queue, rows: Iterable[Tuple[str, Dict[str, Any]]] = (), _columns: Optional[_Columns] = None, _index: Optional[Sequence[int]] = None) -> None:
+        self.queue = queue
+        self._columns = _columns if _columns is not None else _Columns()
+        # None selects every row in browse order
+        self.__index = _index
+        for id_, attributes in rows:
+            self._columns.append(id_, attributes)
+
+    @property
+    def _index(self) -> Sequence[int]:
+        return range(len(self._columns.ids)) if self.__index is None else self.__index
+
+    def append(self, id_: str, attributes: Dict[str, Any]) -> None:
+        # add a browseAsTable row; only tables which were not sorted or filtered can grow
+        if self.__index is not None:
+            raise ActivemqManagerError('rows cannot be added to a sorted or filtered table')
+        self._columns.append(id_, attributes)
+
+    def __repr__(self) -> str:
+        return f'<activemq_manager.MessageTable object queue={self.queue.name} rows={len(self)}>'
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @overload
+    def __getitem__(self, i: int) -> Message: ...
+
+    @overload
+    def __getitem__(self, i: slice) -> MessageTable: ...
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[Message, MessageTable]:
+        if isinstance(i, slice):
+            return self._view(self._index[i])
+        row = self._index[i]
+        return Message(self.queue, self._columns.ids[row], self._columns.row(row))
+
+    def __iter__(self) -> Iterator[Message]:
+        for row in self._index:
+            yield Message(self.queue, self._columns.ids[row], self._columns.row(row))
+
+    def _view(self, index: Iterable[int]) -> MessageTable:
+        return MessageTable(self.queue, _columns=self._columns, _index=index if isinstance(index, range) else array('l', index))
+
+    @property
+    def columns(self) -> List[str]:
+        return list(_ALIASES) + [name for name in self._columns.other if name not in _ALIASES.values()]
+
+    def column(self, name: str) -> List[Any]:
+        # values of a column in the order of this table; timestamps are epoch milliseconds
+        try:
+            column = self._columns.column(name)
+        except KeyError:
+            raise KeyError(f'column does not exist: {name}')
+        if isinstance(self._index, range) and self._index == range(len(column)):
+            return list(column)
+        return [column[row] for row in self._index]
+
+    @property
+    def ids(self) -> List[str]:
+        return self.column('id')
+
+    @property
+    def timestamps(self) -> List[int]:
+        return self.column('timestamp')
+
+    def sort(self, by: str = 'timestamp', reverse: bool = False) -> MessageTable:
+        key = self._columns.column(by).__getitem__
+        return self._view(sorted(self._index, key=key, reverse=reverse))
+
+    def select(self, mask: Iterable[bool]) -> MessageTable:
+        return self._view(compress(self._index, mask))
+
+    def filter(self, by: str, predicate: Callable[[Any], bool]) -> MessageTable:
+        column = self._columns.column(by)
+        return self._view(row for row in self._index if predicate(column[row]))
+
+    def top(self, n: int, by: str = 'size', largest: bool = True) -> MessageTable:
+        key = self._columns.column(by).__getitem__
+        if largest:
+            return self._view(heapq.nlargest(n, self._index, key=key))
+        return self._view(heapq.nsmallest(n, self._index, key=key))
+
+    def property_values(self, name: str) -> List[Optional[str]]:
+        # the value of a message property for every row; None if a message does not have it
+        properties = self._columns.column('StringProperties') if 'StringProperties' in self._columns.other else None
+        if properties is None:
+            return [None] * len(self)
+        return [(properties[row] or {}).get(name) for row in self._index]
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING
+
+from .helpers import cached_attribute
+
+
+if TYPE_CHECKING:
+    from typing import Any, Dict, Iterable, List, Optional, Type
+    from .broker import Broker
+    from .client import Client
+
+
+logger = logging.getLogger(__name__)
+
+
+class Topic:
+    __slots__ = ('broker', 'name', '_attributes', '_truncated')
+
+    def __init__(self, broker: Broker, name: str) -> None:
+        self.broker = broker
+        self.name = name
+        self._attributes: Dict[str, Any] = dict()
+        # attribute paths whose collections were cut at maxCollectionSize
+        self._truncated: List[str] = list()
+
+    def __repr__(self) -> str:
+        return f'<activemq_manager.Topic object name={self.name}>'
+
+    @property
+    def _client(self) -> Client:
+        return self.broker._client
+
+    @property
+    def mbean(self) -> str:
+        return f'org.apache.activemq:type=Broker,brokerName={self.broker.name},destinationType=Topic,destinationName={self.name}'
+
+    def _read_request(self, attribute=None, config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return self._client._payload('read', self.mbean, attribute=attribute, config=self.broker._config(config))
+
+    @classmethod
+    async def new(cls, broker: Broker, name: str, attributes: Optional[Iterable[str]] = None, config: Optional[Dict[str, Any]] = None) -> Topic:
+        t = cls(broker, name)
+        return await t.update(attributes=attributes, config=config)
+
+    async def update(self, attributes: Optional[Iterable[str]] = None, config: Optional[Dict[str, Any]] = None) -> Topic:
+        # attributes limits the read to a projection which is validated against the mbean schema
+        self.broker._store(self, await self.attributes(await self.broker.projection(self.mbean, attributes), config=config), config)
+        return self
+
+    @property
+    def truncated(self) -> List[str]:
+        return self._truncated
+
+    def _attribute(self, name: str, expected_type: Type) -> Any:
+        return cached_attribute(self._attributes, name, expected_type)
+
+    @property
+    def size(self) -> int:
+        return self._attribute('QueueSize', int)
+
+    @property
+    def enqueue_count(self) -> int:
+        return self._attribute('EnqueueCount', int)
+
+    @property
+    def dequeue_count(self) -> int:
+        return self._attribute('DequeueCount', int)
+
+    @property
+    def consumer_count(self) -> int:
+        return self._attribute('ConsumerCount', int)
+
+    @property
+    def producer_count(self) -> int:
+        return self._attribute('ProducerCount', int)
+
+    async def attributes(self, attribute=None, config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return await self._client.dict_request('read', self.mbean, attribute=attribute, config=self.broker._config(config))
+
+    async def delete(self) -> None:
+        await self._client.request('exec', f'org.apache.activemq:type=Broker,brokerName={self.broker.name}', operation='removeTopic(java.lang.String)', arguments=[self.name])
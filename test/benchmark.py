@@ -0,0 +1,97 @@
+'''
+benchmarks for the activemq_manager hot paths using the in-process jolokia simulator
+
+usage: poetry run python test/benchmark.py [--scale 10 1000 10000] [--latency 0.0]
+'''
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+from collections import namedtuple
+from typing import Callable, Dict, Tuple
+
+import activemq_manager
+from jolokia_simulator import JolokiaSimulator
+
+
+Result = namedtuple('Result', ['name', 'scale', 'requests', 'operations', 'seconds', 'peak_memory'])
+BENCHMARKS: Dict[str, Tuple[Callable, Dict[str, bool]]] = dict()
+
+
+def benchmark(name, **populate):
+    def decorator(fn):
+        BENCHMARKS[name] = (fn, populate)
+        return fn
+    return decorator
+
+
+@benchmark('Broker.queues()', queues=True)
+async def bench_queues(broker):
+    async for _ in broker.queues():
+        pass
+
+
+@benchmark('Broker.connections()', connections=True)
+async def bench_connections(broker):
+    async for _ in broker.connections():
+        pass
+
+
+@benchmark('Queue.messages()', messages=True)
+async def bench_messages(broker):
+    queue = await broker.queue('simulator.messages')
+    await queue.messages()
+
+
+@benchmark('Message.text()', messages=True)
+async def bench_message_text(broker):
+    queue = await broker.queue('simulator.messages')
+    for message in await queue.messages():
+        await message.text()
+
+
+@benchmark('Broker.jobs()', jobs=True)
+async def bench_jobs(broker):
+    async for _ in broker.jobs():
+        pass
+
+
+async def run(name, scale, latency):
+    fn, populate = BENCHMARKS[name]
+    simulator = JolokiaSimulator.populate(
+        **{key: scale for key in populate},
+        latency=latency,
+        max_browse_page_size=max(scale, 400)
+    )
+
+    async with activemq_manager.Client('http://simulator', transport=simulator) as client:
+        broker = client.broker()
+        simulator.reset_counters()
+        tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            await fn(broker)
+            seconds = time.perf_counter() - start
+            _, peak_memory = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return Result(name, scale, simulator.requests, sum(simulator.operations[t] for t in ('search', 'read', 'exec', 'list')), seconds, peak_memory)
+
+
+async def main(scales, latency, names):
+    print(f'{"benchmark":<24} {"scale":>7} {"requests":>9} {"operations":>11} {"seconds":>9} {"peak MiB":>9}')
+    for name in names:
+        for scale in scales:
+            result = await run(name, scale, latency)
+            print(f'{result.name:<24} {result.scale:>7} {result.requests:>9} {result.operations:>11} {result.seconds:>9.3f} {result.peak_memory / 1048576:>9.2f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=int, nargs='+', default=[10, 1000, 10000])
+    parser.add_argument('--latency', type=float, default=0.0, help='simulated latency per http request in seconds')
+    parser.add_argument('--benchmark', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    args = parser.parse_args()
+    asyncio.run(main(args.scale, args.latency, args.benchmark))
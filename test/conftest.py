@@ -13,6 +13,7 @@ import stomp
 
 import docker_helpers
 import activemq_manager
+from jolokia_simulator import JolokiaSimulator
 
 
 dir_ = Path(__file__).parent
@@ -102,6 +103,26 @@ async def broker(client):
     return _broker
 
 
+@pytest.fixture(scope='function')
+def simulator():
+    return JolokiaSimulator()
+
+
+@pytest_asyncio.fixture(scope='function')
+async def simulated_client(simulator):
+    async with activemq_manager.Client(
+        endpoint='http://simulator',
+        origin='http://pytest:80',
+        transport=simulator
+    ) as _client:
+        yield _client
+
+
+@pytest_asyncio.fixture(scope='function')
+async def simulated_broker(simulated_client):
+    return simulated_client.broker()
+
+
 @pytest_asyncio.fixture(scope='function')
 async def load_messages(stomp_connection, broker, lorem_ipsum):
     with open(f'{dir_}/files/lorem_ipsum.json') as fh:
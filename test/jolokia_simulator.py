@@ -0,0 +1,885 @@
+import asyncio
+import fnmatch
+import json
+import re
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import httpx
+
+
+JOB_DTFORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def canonical_object_name(domain, properties):
+    return domain + ':' + ','.join(f'{key}={properties[key]}' for key in sorted(properties))
+
+
+def split_object_name(object_name):
+    domain, _, props = object_name.partition(':')
+    properties = dict()
+    is_property_pattern = False
+    for part in props.split(','):
+        if part == '*':
+            is_property_pattern = True
+        elif part:
+            key, val = part.split('=', 1)
+            properties[key] = val
+    return domain, properties, is_property_pattern
+
+
+def iso_timestamp(millis):
+    return datetime.fromtimestamp(millis // 1000, tz=timezone.utc).isoformat()
+
+
+class JolokiaError(Exception):
+    def __init__(self, status, error_type, error):
+        self.status = status
+        self.error_type = error_type
+        self.error = error
+        super().__init__(error)
+
+
+def _not_found(mbean):
+    return JolokiaError(404, 'javax.management.InstanceNotFoundException', f'javax.management.InstanceNotFoundException : {mbean}')
+
+
+# minimal jms selector support covering the selectors issued by activemq_manager
+
+_selector_tokens = re.compile(r"\s*(?:(?P<number>-?\d+(?:\.\d+)?)|(?P<string>'(?:[^']|'')*')|(?P<op><>|<=|>=|=|<|>|\(|\)|,)|(?P<word>[A-Za-z_][\w.]*))")
+
+
+def _tokenize(selector):
+    tokens = list()
+    pos = 0
+    selector = selector.strip()
+    while pos < len(selector):
+        match = _selector_tokens.match(selector, pos)
+        if match is None:
+            raise JolokiaError(400, 'javax.jms.InvalidSelectorException', f'invalid selector: {selector}')
+        pos = match.end()
+        if match.group('number') is not None:
+            value = match.group('number')
+            tokens.append(('literal', float(value) if '.' in value else int(value)))
+        elif match.group('string') is not None:
+            tokens.append(('literal', match.group('string')[1:-1].replace("''", "'")))
+        elif match.group('op') is not None:
+            tokens.append(('op', match.group('op')))
+        else:
+            word = match.group('word')
+            if word.upper() in ('AND', 'OR', 'NOT', 'IN'):
+                tokens.append(('op', word.upper()))
+            else:
+                tokens.append(('identifier', word))
+    return tokens
+
+
+class _SelectorParser:
+    _comparisons = {
+        '=': lambda a, b: a == b,
+        '<>': lambda a, b: a != b,
+        '<': lambda a, b: a is not None and a < b,
+        '<=': lambda a, b: a is not None and a <= b,
+        '>': lambda a, b: a is not None and a > b,
+        '>=': lambda a, b: a is not None and a >= b
+    }
+
+    def __init__(self, selector):
+        self.selector = selector
+        self.tokens = _tokenize(selector)
+        self.pos = 0
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def _next(self):
+        token = self._peek()
+        self.pos += 1
+        return token
+
+    def _expect(self, kind, value=None):
+        token = self._next()
+        if token[0] != kind or (value is not None and token[1] != value):
+            raise JolokiaError(400, 'javax.jms.InvalidSelectorException', f'invalid selector: {self.selector}')
+        return token[1]
+
+    def parse(self):
+        expr = self._or()
+        if self.pos != len(self.tokens):
+            raise JolokiaError(400, 'javax.jms.InvalidSelectorException', f'invalid selector: {self.selector}')
+        return expr
+
+    def _or(self):
+        left = self._and()
+        while self._peek() == ('op', 'OR'):
+            self._next()
+            left = (lambda a, b: lambda m: a(m) or b(m))(left, self._and())
+        return left
+
+    def _and(self):
+        left = self._not()
+        while self._peek() == ('op', 'AND'):
+            self._next()
+            left = (lambda a, b: lambda m: a(m) and b(m))(left, self._not())
+        return left
+
+    def _not(self):
+        if self._peek() == ('op', 'NOT'):
+            self._next()
+            inner = self._not()
+            return lambda m: not inner(m)
+        return self._comparison()
+
+    def _comparison(self):
+        if self._peek() == ('op', '('):
+            self._next()
+            expr = self._or()
+            self._expect('op', ')')
+            return expr
+
+        identifier = self._expect('identifier')
+        kind, op = self._next()
+        if op == 'IN':
+            self._expect('op', '(')
+            values = {self._expect('literal')}
+            while self._peek() == ('op', ','):
+                self._next()
+                values.add(self._expect('literal'))
+            self._expect('op', ')')
+            return lambda m: m.header(identifier) in values
+        elif kind == 'op' and op in self._comparisons:
+            value = self._expect('literal')
+            compare = self._comparisons[op]
+            return lambda m: compare(m.header(identifier), value)
+        raise JolokiaError(400, 'javax.jms.InvalidSelectorException', f'invalid selector: {self.selector}')
+
+
+def compile_selector(selector):
+    if not selector:
+        return lambda m: True
+    return _SelectorParser(selector).parse()
+
+
+class SimulatedMessage:
+    def __init__(self, queue, body, timestamp, properties=None, persistent=True, priority=4, bytes_message=False):
+        self.id = f'ID:simulator-{uuid4()}:1:1:1:1'
+        self.queue = queue
+        self.body = body
+        self.timestamp = timestamp
+        self.properties = properties or dict()
+        self.persistent = persistent
+        self.priority = priority
+        self.bytes_message = bytes_message
+
+    def header(self, name):
+        if name == 'JMSMessageID':
+            return self.id
+        elif name == 'JMSTimestamp':
+            return self.timestamp
+        elif name == 'JMSPriority':
+            return self.priority
+        elif name == 'JMSDeliveryMode':
+            return 'PERSISTENT' if self.persistent else 'NON_PERSISTENT'
+        return self.properties.get(name)
+
+    def table_row(self):
+        return {
+            'JMSMessageID': self.id,
+            'JMSDestination': f'queue://{self.queue}',
+            'JMSTimestamp': iso_timestamp(self.timestamp),
+            'JMSDeliveryMode': 'PERSISTENT' if self.persistent else 'NON-PERSISTENT',
+            'JMSPriority': self.priority,
+            'JMSRedelivered': False,
+            'JMSExpiration': 0,
+            'JMSCorrelationID': '',
+            'JMSType': '',
+            'JMSXDeliveryCount': 0,
+            'BodyLength': len(self.body),
+            'StringProperties': {key: str(val) for key, val in self.properties.items()},
+            'PropertiesText': str(self.properties)
+        }
+
+    def message_object(self):
+        data = {
+            'JMSMessageID': self.id,
+            'JMSDestination': {'physicalName': self.queue, 'queue': True},
+            'JMSTimestamp': self.timestamp,
+            'JMSDeliveryMode': 2 if self.persistent else 1,
+            'JMSPriority': self.priority,
+            'properties': {key: val for key, val in self.properties.items()},
+            'size': len(self.body) + 256
+        }
+        encoded = self.body.encode('utf-8')
+        if self.bytes_message:
+            # java bytes are signed
+            data['content'] = {'offset': 0, 'length': len(encoded), 'data': [b - 256 if b > 127 else b for b in encoded]}
+        else:
+            data['text'] = self.body
+        return data
+
+
+class SimulatedQueue:
+    def __init__(self, name):
+        self.name = name
+        self.messages = OrderedDict()
+        self.enqueue_count = 0
+        self.dequeue_count = 0
+        self.consumer_count = 0
+
+    def attributes(self):
+        return {
+            'Name': self.name,
+            'QueueSize': len(self.messages),
+            'EnqueueCount': self.enqueue_count,
+            'DequeueCount': self.dequeue_count,
+            'DispatchCount': self.dequeue_count,
+            'ExpiredCount': 0,
+            'InFlightCount': 0,
+            'ConsumerCount': self.consumer_count,
+            'ProducerCount': 0,
+            'MemoryPercentUsage': 0,
+            'MemoryUsageByteCount': sum(len(m.body) for m in self.messages.values()),
+            'MaxPageSize': 200,
+            'AverageEnqueueTime': 0.0,
+            'AverageMessageSize': 1024,
+            'DLQ': self.name.startswith('DLQ.') or self.name == 'ActiveMQ.DLQ',
+            'Paused': False,
+            'UseCache': True
+        }
+
+
+class JolokiaSimulator(httpx.AsyncBaseTransport):
+    """
+    in-process jolokia endpoint which can be passed to activemq_manager.Client as an httpx transport
+
+    Client('http://simulator', transport=JolokiaSimulator())
+    """
+
+    def __init__(
+        self,
+        broker_name='localhost',
+        broker_version='5.16.3',
+        latency=0.0,
+        max_browse_page_size=400,
+        chunk_size=65536,
+        slave=False
+    ):
+        self.broker_name = broker_name
+        self.broker_version = broker_version
+        self.latency = latency
+        self.slave = slave
+        self.max_browse_page_size = max_browse_page_size
+        self.chunk_size = chunk_size
+        # when set, responses break off with a ReadError after this many bytes
+        self.disconnect_after = None
+        self.queues = OrderedDict()
+        self.topics = OrderedDict()
+        self.connections = OrderedDict()
+        self.jobs = OrderedDict()
+        self.network_bridges = OrderedDict()
+        # consumer and producer mbeans keyed by object name
+        self.subscriptions = OrderedDict()
+        # other simulators reachable through this one in jolokia proxy mode, keyed by target url
+        self.proxy_targets = dict()
+        self.transport_connectors = {'openwire': 'tcp://0.0.0.0:61616', 'stomp': 'stomp://0.0.0.0:61613'}
+        self.requests = 0
+        self.operations = Counter()
+        self.bytes_sent = 0
+        self._clock = int(time.time() * 1000) - 86400000
+        # epoch seconds of the last mbean registration; searches and lists with an older
+        # ifModifiedSince are answered with a 304
+        self.mbeans_changed = int(time.time())
+
+    # state helpers
+
+    def reset_counters(self):
+        self.requests = 0
+        self.operations.clear()
+        self.bytes_sent = 0
+
+    def _registered(self):
+        self.mbeans_changed = int(time.time())
+
+    def add_queue(self, name):
+        if name not in self.queues:
+            self.queues[name] = SimulatedQueue(name)
+            self._registered()
+        return self.queues[name]
+
+    def add_topic(self, name):
+        if name not in self.topics:
+            self.topics[name] = SimulatedQueue(name)
+            self._registered()
+        return self.topics[name]
+
+    def add_message(self, queue_name, body='', timestamp=None, **kwargs):
+        queue = self.add_queue(queue_name)
+        if timestamp is None:
+            self._clock += 1
+            timestamp = self._clock
+        message = SimulatedMessage(queue_name, body, timestamp, **kwargs)
+        queue.messages[message.id] = message
+        queue.enqueue_count += 1
+        return message
+
+    def add_connection(self, connector='openwire', client_id=None, remote_address=None):
+        index = len(self.connections) + 1
+        remote_address = remote_address or f'tcp://172.17.0.1:{40000 + index}'
+        name = remote_address.replace(':', '_')
+        self._registered()
+        self.connections[(connector, name)] = {
+            'Active': True,
+            'ActiveTransactionCount': 0,
+            'Blocked': False,
+            'ClientId': client_id or f'ID:simulator-client-{index}',
+            'Connected': True,
+            'DispatchQueueSize': 0,
+            'OldestActiveTransactionDuration': None,
+            'RemoteAddress': remote_address,
+            'Slow': False,
+            'UserName': 'admin',
+            'Consumers': [],
+            'Producers': []
+        }
+        return name
+
+    def add_network_bridge(self, remote_broker_name, remote_address, connector='NC'):
+        name = remote_address.replace(':', '_')
+        self._registered()
+        self.network_bridges[(connector, name)] = {
+            'RemoteAddress': remote_address,
+            'RemoteBrokerName': remote_broker_name,
+            'RemoteBrokerId': f'ID:{remote_broker_name}',
+            'LocalAddress': 'tcp://0.0.0.0:61616',
+            'LocalBrokerName': self.broker_name,
+            'CreatedByDuplex': False,
+            'EnqueueCounter': 0,
+            'DequeueCounter': 0
+        }
+        return name
+
+    def add_subscription(self, endpoint, connection_name, destination_name, destination_type='Queue', connector='openwire', selector=None):
+        connection = self.connections[(connector, connection_name)]
+        client_id = connection['ClientId']
+        index = len(self.subscriptions) + 1
+        # consumer and producer ids are <connection id>:<session id>:<value>
+        subscription_id = f'{client_id}:1:{index}'
+        properties = {
+            'type': 'Broker',
+            'brokerName': self.broker_name,
+            'destinationType': destination_type,
+            'destinationName': destination_name,
+            'endpoint': endpoint,
+            'clientId': client_id.replace(':', '_'),
+            'consumerId' if endpoint == 'Consumer' else 'producerId': subscription_id.replace(':', '_')
+        }
+        attributes = {
+            'ClientId': client_id,
+            'ConnectionId': client_id,
+            'SessionId': 1,
+            'DestinationName': destination_name,
+            'DestinationQueue': destination_type == 'Queue',
+            'UserName': 'admin'
+        }
+        if endpoint == 'Consumer':
+            attributes.update({
+                'SubscriptionId': index,
+                'Selector': selector,
+                'PrefetchSize': 1000,
+                'DispatchedQueueSize': 0,
+                'DispatchedCounter': 0,
+                'EnqueueCounter': 0,
+                'DequeueCounter': 0,
+                'MessageCountAwaitingAcknowledge': 0,
+                'SlowConsumer': False
+            })
+        else:
+            attributes.update({
+                'ProducerId': subscription_id,
+                'SentCount': 0,
+                'ProducerBlocked': False
+            })
+        object_name = canonical_object_name('org.apache.activemq', properties)
+        self.subscriptions[object_name] = attributes
+        self._registered()
+        connection['Consumers' if endpoint == 'Consumer' else 'Producers'].append(object_name)
+        destination = (self.add_queue if destination_type == 'Queue' else self.add_topic)(destination_name)
+        if endpoint == 'Consumer':
+            destination.consumer_count += 1
+        return object_name
+
+    def add_job(self, next_time=None, delay=0, period=0, repeat=0):
+        job_id = f'ID:simulator-job-{uuid4()}:1:1:1:1'
+        if next_time is None:
+            next_time = datetime.now().replace(microsecond=0) + timedelta(days=1)
+        self.jobs[job_id] = {
+            'jobId': job_id,
+            'cronEntry': '',
+            'start': next_time.strftime(JOB_DTFORMAT),
+            'next': next_time.strftime(JOB_DTFORMAT),
+            'delay': delay,
+            'period': period,
+            'repeat': repeat
+        }
+        return job_id
+
+    @classmethod
+    def populate(cls, queues=0, messages=0, connections=0, jobs=0, body='lorem ipsum', **kwargs):
+        simulator = cls(**kwargs)
+        for i in range(queues):
+            simulator.add_queue(f'simulator.queue{i}')
+        for i in range(messages):
+            simulator.add_message('simulator.messages', body, properties={'index': i})
+        for _ in range(connections):
+            simulator.add_connection()
+        start = datetime.now().replace(microsecond=0) + timedelta(minutes=1)
+        for i in range(jobs):
+            simulator.add_job(next_time=start + timedelta(seconds=i))
+        return simulator
+
+    # mbean registry
+
+    def _mbeans(self):
+        domain = 'org.apache.activemq'
+        broker = {'type': 'Broker', 'brokerName': self.broker_name}
+        yield canonical_object_name(domain, broker), ('broker', None)
+        if self.slave:
+            # a slave has not started its broker services so it only reports Slave=true
+            return
+        yield canonical_object_name(domain, dict(broker, service='JobScheduler', name='JMS')), ('scheduler', None)
+        for name, queue in self.queues.items():
+            yield canonical_object_name(domain, dict(broker, destinationType='Queue', destinationName=name)), ('queue', queue)
+        for name, topic in self.topics.items():
+            yield canonical_object_name(domain, dict(broker, destinationType='Topic', destinationName=name)), ('topic', topic)
+        for (connector, name), attributes in self.connections.items():
+            yield canonical_object_name(domain, dict(
+                broker,
+                connector='clientConnectors',
+                connectorName=connector,
+                connectionViewType='remoteAddress',
+                connectionName=name
+            )), ('connection', attributes)
+        for (connector, name), attributes in self.network_bridges.items():
+            yield canonical_object_name(domain, dict(
+                broker,
+                connector='networkConnectors',
+                networkConnectorName=connector,
+                networkBridge=name
+            )), ('bridge', attributes)
+        for object_name, attributes in self.subscriptions.items():
+            yield object_name, ('subscription', attributes)
+
+    def _resolve(self, domain, properties):
+        if domain != 'org.apache.activemq' or properties.get('type') != 'Broker' or properties.get('brokerName') != self.broker_name:
+            return None
+        keys = set(properties) - {'type', 'brokerName'}
+        if not keys:
+            return ('broker', None)
+        elif self.slave:
+            return None
+        elif keys == {'service', 'name'} and properties['service'] == 'JobScheduler' and properties['name'] == 'JMS':
+            return ('scheduler', None)
+        elif keys == {'destinationType', 'destinationName'} and properties['destinationType'] == 'Queue':
+            queue = self.queues.get(properties['destinationName'])
+            return None if queue is None else ('queue', queue)
+        elif keys == {'destinationType', 'destinationName'} and properties['destinationType'] == 'Topic':
+            topic = self.topics.get(properties['destinationName'])
+            return None if topic is None else ('topic', topic)
+        elif keys == {'connector', 'connectorName', 'connectionViewType', 'connectionName'} and properties['connector'] == 'clientConnectors':
+            attributes = self.connections.get((properties['connectorName'], properties['connectionName']))
+            return None if attributes is None else ('connection', attributes)
+        elif 'endpoint' in keys:
+            attributes = self.subscriptions.get(canonical_object_name(domain, properties))
+            return None if attributes is None else ('subscription', attributes)
+        elif keys == {'connector', 'networkConnectorName', 'networkBridge'} and properties['connector'] == 'networkConnectors':
+            attributes = self.network_bridges.get((properties['networkConnectorName'], properties['networkBridge']))
+            return None if attributes is None else ('bridge', attributes)
+        return None
+
+    def _match(self, pattern):
+        domain, properties, is_property_pattern = split_object_name(pattern)
+        is_pattern = is_property_pattern or any('*' in val or '?' in val for val in properties.values())
+        if not is_pattern:
+            mbean = self._resolve(domain, properties)
+            return [] if mbean is None else [(canonical_object_name(domain, properties), mbean)]
+
+        matches = list()
+        for candidate, mbean in self._mbeans():
+            candidate_domain, candidate_properties, _ = split_object_name(candidate)
+            if not fnmatch.fnmatchcase(candidate_domain, domain):
+                continue
+            if not is_property_pattern and set(candidate_properties) != set(properties):
+                continue
+            if all(key in candidate_properties and fnmatch.fnmatchcase(candidate_properties[key], val) for key, val in properties.items()):
+                matches.append((candidate, mbean))
+        return matches
+
+    def _attributes(self, kind, obj):
+        if kind == 'broker':
+            return {
+                'BrokerName': self.broker_name,
+                'BrokerVersion': self.broker_version,
+                'BrokerId': 'ID:simulator-broker',
+                'Slave': self.slave,
+                'TotalMessageCount': sum(len(q.messages) for q in self.queues.values()),
+                'TotalConnectionsCount': len(self.connections),
+                'TransportConnectors': dict(self.transport_connectors),
+                'Uptime': '1 hour',
+                'MemoryPercentUsage': 0,
+                'StorePercentUsage': 0
+            }
+        elif kind in ('queue', 'topic'):
+            return obj.attributes()
+        elif kind in ('connection', 'bridge', 'subscription'):
+            return dict(obj)
+        elif kind == 'scheduler':
+            return {'NextScheduleTime': min((j['next'] for j in self.jobs.values()), default='')}
+        raise JolokiaError(500, 'java.lang.IllegalStateException', f'unknown mbean kind: {kind}')
+
+    # request handlers
+
+    def _search(self, request):
+        return [object_name for object_name, _ in self._match(request['mbean'])]
+
+    @staticmethod
+    def _limit(value, max_collection_size):
+        # jolokia cuts every collection at maxCollectionSize without marking it
+        if isinstance(value, dict):
+            return {key: JolokiaSimulator._limit(val, max_collection_size) for key, val in list(value.items())[:max_collection_size]}
+        elif isinstance(value, list):
+            return [JolokiaSimulator._limit(val, max_collection_size) for val in value[:max_collection_size]]
+        return value
+
+    def _read_one(self, object_name, kind, obj, attribute, config=None, path=None):
+        config = config or {}
+        attributes = self._attributes(kind, obj)
+        if config.get('maxCollectionSize'):
+            attributes = {name: self._limit(val, config['maxCollectionSize']) for name, val in attributes.items()}
+        if attribute is None:
+            return attributes
+        names = attribute if isinstance(attribute, list) else [attribute]
+        for name in names:
+            if name not in attributes:
+                if isinstance(attribute, list) and config.get('ignoreErrors'):
+                    continue
+                raise JolokiaError(404, 'javax.management.AttributeNotFoundException', f'No such attribute: {name}')
+        if isinstance(attribute, list):
+            return {name: attributes.get(name, f'ERROR: javax.management.AttributeNotFoundException : No such attribute: {name}') for name in names}
+        value = attributes[attribute]
+        for part in (path or '').split('/'):
+            if not part:
+                continue
+            try:
+                value = value[int(part) if isinstance(value, list) else part]
+            except (KeyError, IndexError, ValueError, TypeError):
+                raise JolokiaError(400, 'javax.management.AttributeNotFoundException', f'No value for path {path}')
+        return value
+
+    def _read(self, request):
+        mbean = request['mbean']
+        attribute = request.get('attribute')
+        config = request.get('config') or {}
+        matches = self._match(mbean)
+        _, properties, is_property_pattern = split_object_name(mbean)
+        if is_property_pattern or any('*' in val for val in properties.values()):
+            if not matches:
+                raise _not_found(mbean)
+            value = dict()
+            for object_name, (kind, obj) in matches:
+                attributes = self._attributes(kind, obj)
+                if config.get('maxCollectionSize'):
+                    attributes = {name: self._limit(val, config['maxCollectionSize']) for name, val in attributes.items()}
+                names = attribute if isinstance(attribute, list) else (list(attributes) if attribute is None else [attribute])
+                value[object_name] = {name: attributes[name] for name in names if name in attributes}
+            return value
+        if not matches:
+            raise _not_found(mbean)
+        object_name, (kind, obj) = matches[0]
+        return self._read_one(object_name, kind, obj, attribute, config=config, path=request.get('path'))
+
+    _operations = {
+        'queue': [
+            'browseAsTable()', 'browseAsTable(java.lang.String)', 'browseMessages()', 'browseMessages(java.lang.String)',
+            'purge()', 'removeMessage(java.lang.String)', 'removeMatchingMessages(java.lang.String)',
+            'moveMessageTo(java.lang.String,java.lang.String)', 'moveMatchingMessagesTo(java.lang.String,java.lang.String)',
+            'copyMatchingMessagesTo(java.lang.String,java.lang.String)', 'retryMessage(java.lang.String)', 'retryMessages()'
+        ],
+        'scheduler': [
+            'getAllJobs()', 'getAllJobs(java.lang.String,java.lang.String)', 'removeJob(java.lang.String)',
+            'removeAllJobs()', 'removeAllJobs(java.lang.String,java.lang.String)'
+        ],
+        'broker': ['addQueue(java.lang.String)', 'removeQueue(java.lang.String)', 'addTopic(java.lang.String)', 'removeTopic(java.lang.String)']
+    }
+
+    @staticmethod
+    def _java_type(value):
+        if isinstance(value, bool):
+            return 'boolean'
+        elif isinstance(value, int):
+            return 'long'
+        elif isinstance(value, float):
+            return 'double'
+        elif isinstance(value, dict):
+            return 'java.util.Map'
+        elif isinstance(value, list):
+            return '[Ljavax.management.ObjectName;'
+        return 'java.lang.String'
+
+    @staticmethod
+    def _truncate(value, depth):
+        # jolokia cuts the list tree at maxDepth; every object is a level while arrays (overloads
+        # and argument lists) share the level of their items. a cut off array is serialized with
+        # its toString()
+        if isinstance(value, list):
+            if depth <= 0:
+                return str(value)
+            return [JolokiaSimulator._truncate(val, depth) for val in value]
+        if not isinstance(value, dict):
+            return value
+        if depth <= 0:
+            return {}
+        return {key: JolokiaSimulator._truncate(val, depth - 1) for key, val in value.items()}
+
+    def _list(self, request):
+        path = request.get('path') or ''
+        parts = [part.replace('!/', '/').replace('!!', '!') for part in re.split(r'(?<!!)/', path)]
+        if len(parts) < 2:
+            raise JolokiaError(400, 'java.lang.IllegalArgumentException', f'simulator only lists single mbeans: {path}')
+        mbean = f'{parts[0]}:{parts[1]}'
+        matches = self._match(mbean)
+        if not matches or len(parts) > 2:
+            raise _not_found(mbean)
+        _, (kind, obj) = matches[0]
+        operations = dict()
+        for signature in self._operations.get(kind, []):
+            name, _, args = signature[:-1].partition('(')
+            overload = {'args': [{'name': f'p{i}', 'type': arg, 'desc': ''} for i, arg in enumerate(args.split(',')) if arg], 'ret': 'java.lang.Object', 'desc': name}
+            if name in operations:
+                operations[name] = (operations[name] if isinstance(operations[name], list) else [operations[name]]) + [overload]
+            else:
+                operations[name] = overload
+        value = {
+            'desc': f'simulated {kind} mbean',
+            'attr': {
+                name: {'type': self._java_type(val), 'rw': False, 'desc': name}
+                for name, val in self._attributes(kind, obj).items()
+            },
+            'op': operations
+        }
+        max_depth = (request.get('config') or {}).get('maxDepth')
+        return self._truncate(value, max_depth) if max_depth else value
+
+    def _browse(self, queue, selector):
+        match = compile_selector(selector)
+        results = list()
+        for message in queue.messages.values():
+            if match(message):
+                results.append(message)
+                if len(results) >= self.max_browse_page_size:
+                    break
+        return results
+
+    def _matching(self, queue, selector):
+        match = compile_selector(selector)
+        return [message for message in queue.messages.values() if match(message)]
+
+    def _remove(self, queue, messages):
+        for message in messages:
+            del queue.messages[message.id]
+            queue.dequeue_count += 1
+
+    def _transfer(self, queue, messages, target, remove):
+        target_queue = self.add_queue(target)
+        for message in messages:
+            if remove:
+                del queue.messages[message.id]
+                queue.dequeue_count += 1
+            else:
+                message = SimulatedMessage(target, message.body, message.timestamp, dict(message.properties), message.persistent, message.priority, message.bytes_message)
+            message.queue = target
+            target_queue.messages[message.id] = message
+            target_queue.enqueue_count += 1
+        return len(messages)
+
+    def _jobs_between(self, start, end):
+        start_time = datetime.strptime(start, JOB_DTFORMAT)
+        end_time = datetime.strptime(end, JOB_DTFORMAT)
+        return {
+            job_id: job for job_id, job in self.jobs.items()
+            if start_time <= datetime.strptime(job['next'], JOB_DTFORMAT) <= end_time
+        }
+
+    def _exec_queue(self, queue, operation, arguments):
+        if operation in ('browseAsTable()', 'browseAsTable(java.lang.String)'):
+            return {m.id: m.table_row() for m in self._browse(queue, arguments[0] if arguments else None)}
+        elif operation in ('browseMessages()', 'browseMessages(java.lang.String)'):
+            return [m.message_object() for m in self._browse(queue, arguments[0] if arguments else None)]
+        elif operation == 'purge()':
+            self._remove(queue, list(queue.messages.values()))
+            return None
+        elif operation == 'removeMessage(java.lang.String)':
+            if arguments[0] not in queue.messages:
+                return False
+            self._remove(queue, [queue.messages[arguments[0]]])
+            return True
+        elif operation == 'removeMatchingMessages(java.lang.String)':
+            messages = self._matching(queue, arguments[0])
+            self._remove(queue, messages)
+            return len(messages)
+        elif operation == 'moveMessageTo(java.lang.String,java.lang.String)':
+            if arguments[0] not in queue.messages:
+                return False
+            return self._transfer(queue, [queue.messages[arguments[0]]], arguments[1], remove=True) == 1
+        elif operation == 'moveMatchingMessagesTo(java.lang.String,java.lang.String)':
+            return self._transfer(queue, self._matching(queue, arguments[0]), arguments[1], remove=True)
+        elif operation == 'copyMatchingMessagesTo(java.lang.String,java.lang.String)':
+            return self._transfer(queue, self._matching(queue, arguments[0]), arguments[1], remove=False)
+        elif operation == 'retryMessage(java.lang.String)':
+            message = queue.messages.get(arguments[0])
+            if message is None or 'originalDestination' not in message.properties:
+                return False
+            return self._transfer(queue, [message], message.properties['originalDestination'], remove=True) == 1
+        elif operation == 'retryMessages()':
+            count = 0
+            for message in list(queue.messages.values()):
+                if 'originalDestination' in message.properties:
+                    count += self._transfer(queue, [message], message.properties['originalDestination'], remove=True)
+            return count
+        raise JolokiaError(400, 'java.lang.IllegalArgumentException', f'No operation {operation} found on MBean {queue.name}')
+
+    def _exec_scheduler(self, operation, arguments):
+        if operation == 'getAllJobs()':
+            return dict(self.jobs)
+        elif operation == 'getAllJobs(java.lang.String,java.lang.String)':
+            return self._jobs_between(*arguments)
+        elif operation == 'removeJob(java.lang.String)':
+            self.jobs.pop(arguments[0], None)
+            return None
+        elif operation == 'removeAllJobs()':
+            self.jobs.clear()
+            return None
+        elif operation == 'removeAllJobs(java.lang.String,java.lang.String)':
+            for job_id in self._jobs_between(*arguments):
+                del self.jobs[job_id]
+            return None
+        raise JolokiaError(400, 'java.lang.IllegalArgumentException', f'No operation {operation} found on MBean JobScheduler')
+
+    def _exec_broker(self, operation, arguments):
+        if operation == 'removeQueue(java.lang.String)':
+            if self.queues.pop(arguments[0], None) is not None:
+                self._registered()
+            return None
+        elif operation == 'addQueue(java.lang.String)':
+            self.add_queue(arguments[0])
+            return None
+        elif operation == 'removeTopic(java.lang.String)':
+            if self.topics.pop(arguments[0], None) is not None:
+                self._registered()
+            return None
+        elif operation == 'addTopic(java.lang.String)':
+            self.add_topic(arguments[0])
+            return None
+        raise JolokiaError(400, 'java.lang.IllegalArgumentException', f'No operation {operation} found on MBean Broker')
+
+    def _exec(self, request):
+        mbean = request['mbean']
+        operation = request['operation'].replace(' ', '')
+        if '(' not in operation:
+            operation = f'{operation}()'
+        arguments = request.get('arguments') or []
+        matches = self._match(mbean)
+        if not matches:
+            raise _not_found(mbean)
+        _, (kind, obj) = matches[0]
+        if kind == 'queue':
+            return self._exec_queue(obj, operation, arguments)
+        elif kind == 'scheduler':
+            return self._exec_scheduler(operation, arguments)
+        elif kind == 'broker':
+            return self._exec_broker(operation, arguments)
+        raise JolokiaError(400, 'java.lang.IllegalArgumentException', f'No operation {operation} found on MBean {mbean}')
+
+    def handle(self, request):
+        if 'target' in request:
+            target = self.proxy_targets.get(request['target'].get('url'))
+            if target is None:
+                self.operations[request.get('type')] += 1
+                return {'request': request, 'error_type': 'java.io.IOException', 'error': f'Failed to retrieve RMIServer stub: {request["target"].get("url")}', 'status': 500}
+            return target.handle({key: val for key, val in request.items() if key != 'target'})
+        type_ = request.get('type')
+        self.operations[type_] += 1
+        if type_ == 'exec':
+            self.operations[f'exec:{request.get("operation", "").split("(")[0]}'] += 1
+        since = (request.get('config') or {}).get('ifModifiedSince')
+        if type_ in ('search', 'list') and since is not None and self.mbeans_changed < int(since):
+            return {'request': request, 'status': 304, 'timestamp': int(time.time())}
+        try:
+            if type_ == 'search':
+                value = self._search(request)
+            elif type_ == 'read':
+                value = self._read(request)
+            elif type_ == 'exec':
+                value = self._exec(request)
+            elif type_ == 'list':
+                value = self._list(request)
+            elif type_ == 'version':
+                value = {'agent': '1.6.2', 'protocol': '7.2'}
+            else:
+                raise JolokiaError(400, 'java.lang.IllegalArgumentException', f'unsupported request type: {type_}')
+        except JolokiaError as e:
+            return {'request': request, 'error_type': e.error_type, 'error': e.error, 'status': e.status}
+        return {'request': request, 'value': value, 'timestamp': int(time.time()), 'status': 200}
+
+    # httpx transport
+
+    async def handle_async_request(self, request):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        payload = json.loads(await request.aread())
+        if isinstance(payload, list):
+            response = [self.handle(item) for item in payload]
+        else:
+            response = self.handle(payload)
+
+        content = json.dumps(response).encode('utf-8')
+        self.bytes_sent += len(content)
+        return httpx.Response(
+            200,
+            headers={'Content-Type': 'text/plain;charset=utf-8'},
+            stream=_ChunkedStream(content, self.chunk_size, self.disconnect_after),
+            request=request
+        )
+
+
+class _ChunkedStream(httpx.AsyncByteStream):
+    def __init__(self, content, chunk_size, disconnect_after=None):
+        self.content = content
+        self.chunk_size = chunk_size
+        self.disconnect_after = disconnect_after
+
+    async def __aiter__(self):
+        for i in range(0, len(self.content), self.chunk_size):
+            if self.disconnect_after is not None and i >= self.disconnect_after:
+                raise httpx.ReadError('simulated connection reset')
+            yield self.content[i:i + self.chunk_size]
+
+
+class JolokiaRouter(httpx.AsyncBaseTransport):
+    """
+    route requests to one simulator per host so several brokers can share one set of client kwargs
+
+    JolokiaRouter({'broker1': JolokiaSimulator('broker1'), 'broker2': JolokiaSimulator('broker2')})
+    """
+
+    def __init__(self, routes=None):
+        self.routes = dict(routes or {})
+
+    async def handle_async_request(self, request):
+        simulator = self.routes.get(request.url.host)
+        if simulator is None:
+            raise httpx.ConnectError(f'simulated connection refused: {request.url.host}', request=request)
+        return await simulator.handle_async_request(request)
@@ -1,9 +1,12 @@
-from datetime import datetime
+import json
+from datetime import datetime, timedelta, timezone
 from uuid import UUID
 
 import pytest
 
 from activemq_manager import Broker, ActivemqManagerError, Connection, Queue, Message, MessageData, ScheduledJob
+from activemq_manager.helpers import activemq_stamp_datetime, canonical_object_name, parse_object_name, parse_timestamp, parse_timestamps
+from activemq_manager.stream import JsonValueParser
 
 
 @pytest.mark.asyncio
@@ -18,6 +21,27 @@ async def test_broker(broker, activemq_version):
     assert _attributes.get('BrokerVersion') == activemq_version
 
 
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('load_messages')
+async def test_bulk_request(client, broker):
+    results = await client.bulk_request([
+        {'type': 'read', 'mbean': f'org.apache.activemq:type=Broker,brokerName={broker.name}', 'attribute': 'BrokerName'},
+        {'type': 'read', 'mbean': f'org.apache.activemq:type=Broker,brokerName={broker.name},destinationType=Queue,destinationName=pytest.queue3', 'attribute': 'QueueSize'},
+        {'type': 'read', 'mbean': f'org.apache.activemq:type=Broker,brokerName={broker.name},destinationType=Queue,destinationName=pytest.does_not_exist', 'attribute': 'QueueSize'}
+    ], batch_size=2)
+    assert results[0] == broker.name
+    assert results[1] == 3
+    assert type(results[2]) is ActivemqManagerError
+    assert results[2].get('status') == 404
+
+    # queues() should hydrate every queue through the bulk api
+    queue_names = set()
+    async for q in broker.queues(batch_size=1):
+        assert type(q.size) is int
+        queue_names.add(q.name)
+    assert {'pytest.queue1', 'pytest.queue2', 'pytest.queue3', 'pytest.queue4'}.issubset(queue_names)
+
+
 # these tests cannot be used as STOMP does not keep an open connections
 @pytest.mark.asyncio
 @pytest.mark.usefixtures('stomp_connection')
@@ -46,6 +70,10 @@ async def test_queues(broker):
         assert type(q.dequeue_count) is int
         assert type(q.consumer_count) is int
 
+    # pattern reads should hydrate the same queues without per-queue requests
+    sizes = {q.name: q.size async for q in broker.queues()}
+    assert {q.name: q.size async for q in broker.queues(pattern_read=True)} == sizes
+
     # assert the number of mesages in each queue
     assert (await broker.queue('pytest.queue1')).size == 1
     assert (await broker.queue('pytest.queue2')).size == 2
@@ -114,6 +142,22 @@ async def test_message_move(broker, stomp_connection, lorem_ipsum):
     assert source_message.id == target_message.id
 
 
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('load_messages')
+async def test_bulk_message_operations(broker):
+    test_queue = await broker.queue('pytest.queue3')
+    messages = await test_queue.messages()
+
+    assert await test_queue.copy_messages('pytest.queue_copy_target', selector="test_prop1 = 'abcd'") == 3
+    assert await test_queue.move_messages('pytest.queue_move_target', ids=[messages[0].id]) == 1
+    assert await test_queue.delete_messages(ids=[m.id for m in messages[1:]]) == 2
+
+    await test_queue.update()
+    assert test_queue.size == 0
+    assert (await broker.queue('pytest.queue_copy_target')).size == 3
+    assert (await broker.queue('pytest.queue_move_target')).size == 1
+
+
 def test_parse_byte_array():
     value = 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. Praesent consectetur dictum leo, et euismod sem fermentum in. Class aptent taciti sociosqu ad litora torquent per conubia nostra, per inceptos himenaeos. Integer rhoncus quam vitae elit ullamcorper ultricies. Mauris a elit metus. Quisque in purus non ipsum vestibulum suscipit. Sed mattis ornare ante, non rutrum nisl tristique non. Ut finibus mattis arcu sit amet convallis. Ut rhoncus augue tortor, at commodo libero consequat eu. Aenean ligula orci, malesuada non tellus nec, dictum bibendum lacus. Fusce in nunc lacinia, condimentum dolor sed, mollis turpis.'
     value_byte_array = {
@@ -137,6 +181,61 @@ def test_parse_byte_array():
     assert str(excinfo.value) == "data is not a byte array: {'data': 'abcd'}"
 
 
+def test_object_names():
+    object_name = 'org.apache.activemq:type=Broker,brokerName=localhost,destinationType=Queue,destinationName=a.b'
+    assert parse_object_name(object_name) == {'type': 'Broker', 'brokerName': 'localhost', 'destinationType': 'Queue', 'destinationName': 'a.b'}
+    assert canonical_object_name(object_name) == 'org.apache.activemq:brokerName=localhost,destinationName=a.b,destinationType=Queue,type=Broker'
+    assert canonical_object_name('org.apache.activemq:type=Broker,brokerName=*,*') == 'org.apache.activemq:brokerName=*,type=Broker,*'
+
+
+def test_timestamps():
+    assert activemq_stamp_datetime('2022-01-05 10:30:20') == datetime(2022, 1, 5, 10, 30, 20)
+    assert activemq_stamp_datetime('2022-01-05T10:30:20.123Z') == datetime(2022, 1, 5, 10, 30, 20, 123000)
+    assert activemq_stamp_datetime('2022-01-05 10:30:20.123 EST') == datetime(2022, 1, 5, 10, 30, 20, 123000)
+
+    expected = datetime(2022, 1, 5, 15, 30, 20, tzinfo=timezone.utc)
+    assert parse_timestamp('2022-01-05T10:30:20-05:00') == expected
+    assert parse_timestamp('2022-01-05T10:30:20-0500') == expected
+    assert parse_timestamp('2022-01-05T15:30:20Z') == expected
+    assert parse_timestamp(1641396620000) == expected
+    assert parse_timestamp('2022-01-05T15:30:20.250+00:00') == expected + timedelta(milliseconds=250)
+    # anything else falls back to dateparser
+    assert parse_timestamp('Wed, 05 Jan 2022 15:30:20 GMT').timestamp() == expected.timestamp()
+    assert parse_timestamp(None) is None
+    assert parse_timestamps(['2022-01-05T15:30:20Z', None, '2022-01-05T15:30:20Z']) == [expected, None, expected]
+
+
+def test_json_value_parser():
+    value = {'ID:1': {'text': 'caf\u00e9 \u2615', 'size': 12345}, 'ID:2': {'text': '{"nested": [1, 2]}', 'size': 7}}
+    document = json.dumps({'request': {'type': 'exec'}, 'value': value, 'timestamp': 1642500000, 'status': 200}).encode('utf-8')
+
+    # feed the document one byte at a time to split every token and multi-byte character
+    parser = JsonValueParser()
+    items = list()
+    for i in range(len(document)):
+        items.extend(parser.feed(document[i:i + 1]))
+    items.extend(parser.close())
+    assert items == list(value.items())
+    assert parser.container == '{'
+    assert parser.fields == {'request': {'type': 'exec'}, 'timestamp': 1642500000, 'status': 200}
+
+    # list values yield the items without keys
+    parser = JsonValueParser()
+    items = parser.feed(b'{"value": [1, 22, 333], "status": 200}') + parser.close()
+    assert items == [(None, 1), (None, 22), (None, 333)]
+
+    # error responses do not have a value
+    parser = JsonValueParser()
+    assert parser.feed(b'{"error_type": "x", "error": "failed", "status": 404}') + parser.close() == []
+    assert parser.container is None
+    assert parser.fields['status'] == 404
+
+    with pytest.raises(ActivemqManagerError):
+        parser = JsonValueParser()
+        parser.feed(b'{"value": [1, 2')
+        parser.close()
+
+
 @pytest.mark.asyncio
 @pytest.mark.usefixtures('load_jobs')
 async def test_jobs(broker, stomp_connection):
@@ -150,3 +249,7 @@ async def test_jobs(broker, stomp_connection):
         assert type(j.next) is datetime
         assert type(j.start) is datetime
         assert type(j.delay) is int
+
+    # delete every job with batched removeJob calls
+    assert await broker.delete_jobs(ids=[j.id async for j in broker.jobs()]) == 10
+    assert await broker.job_count() == 0
@@ -0,0 +1,1101 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+from activemq_manager import AdaptiveLimit, Broker, ActivemqManagerError, Client, Connection, DestinationEvent, Fleet, Instrumentation, JsonCodec, MBeanSchema, Metrics, Queue, Message, MessageTable, Poller, RequestCache, ScheduledJob, SnapshotClient, Subscription, Topic, span
+from activemq_manager import helpers, message as message_module
+from activemq_manager.codec import response_status
+from activemq_manager.concurrency import fan_out
+from activemq_manager.schema import list_path
+from jolokia_simulator import JolokiaRouter, JolokiaSimulator
+
+
+@pytest.mark.asyncio
+async def test_simulated_broker(simulated_broker, simulator):
+    assert (await simulated_broker.attribute('BrokerName')) == simulator.broker_name
+    assert (await simulated_broker.attribute('BrokerVersion')) == simulator.broker_version
+    with pytest.raises(ActivemqManagerError) as excinfo:
+        await simulated_broker.attribute('DoesNotExist')
+    assert excinfo.value.get('status') == 404
+
+
+@pytest.mark.asyncio
+async def test_simulated_queues(simulated_broker, simulator):
+    for i in range(250):
+        simulator.add_queue(f'pytest.queue{i}')
+    simulator.add_message('pytest.queue7', 'abcd')
+    simulator.reset_counters()
+
+    queues = [q async for q in simulated_broker.queues(batch_size=100)]
+    assert len(queues) == 250
+    assert all(type(q) is Queue and type(q.size) is int for q in queues)
+    assert {q.name: q.size for q in queues}['pytest.queue7'] == 1
+    # one search plus three bulk reads
+    assert simulator.requests == 4
+    assert simulator.operations['read'] == 250
+
+    await (await simulated_broker.queue('pytest.queue7')).delete()
+    with pytest.raises(ActivemqManagerError) as excinfo:
+        await simulated_broker.queue('pytest.queue7')
+    assert 'queue not found: pytest.queue7' in str(excinfo.value)
+
+
+@pytest.mark.asyncio
+async def test_simulated_projection(simulated_broker, simulator):
+    for i in range(5):
+        simulator.add_queue(f'pytest.queue{i}')
+    simulator.add_message('pytest.queue3', 'abcd')
+    simulator.add_connection()
+    simulator.reset_counters()
+
+    # the schema is listed once and shared by every read of the same kind of mbean
+    for pattern_read in (False, True):
+        queues = {q.name: q async for q in simulated_broker.queues(pattern_read=pattern_read, attributes=Queue.typed_attribute)}
+        assert queues['pytest.queue3'].size == 1
+        assert set(queues['pytest.queue3']._attributes) == set(Queue.typed_attribute)
+    assert simulator.operations['list'] == 1
+    schema = await simulated_broker.schema(queues['pytest.queue3'].mbean)
+    assert schema.attributes['QueueSize'] == 'long'
+    assert schema.operations['browseAsTable'] == ['browseAsTable()', 'browseAsTable(java.lang.String)']
+    assert schema.operations['moveMessageTo'] == ['moveMessageTo(java.lang.String,java.lang.String)']
+    assert schema.operations['purge'] == ['purge()']
+
+    test_queue = await simulated_broker.queue('pytest.queue3', attributes=['QueueSize'])
+    assert test_queue.size == 1
+    with pytest.raises(ActivemqManagerError) as excinfo:
+        test_queue.enqueue_count
+    assert 'attribute was not read: EnqueueCount' in str(excinfo.value)
+    await test_queue.update()
+    assert test_queue.enqueue_count == 1
+
+    with pytest.raises(ActivemqManagerError) as excinfo:
+        await test_queue.update(attributes=['QueueSize', 'DoesNotExist'])
+    assert excinfo.value.get('unknown') == ['DoesNotExist']
+    with pytest.raises(ActivemqManagerError):
+        [q async for q in simulated_broker.queues(pattern_read=True, attributes=['DoesNotExist'])]
+
+    connections = [c async for c in simulated_broker.connections(attributes=['ClientId', 'Consumers'])]
+    assert set(connections[0]._attributes) == {'ClientId', 'Consumers'}
+    assert simulator.operations['list'] == 2
+
+    # one level less cuts off the argument lists and with them every signature
+    truncated = simulator.handle({'type': 'list', 'path': list_path(queues['pytest.queue3'].mbean), 'config': {'maxDepth': 3}})
+    assert MBeanSchema.from_list('Queue', truncated['value']).operations['moveMessageTo'] == []
+
+
+@pytest.mark.asyncio
+async def test_simulated_processing_parameters(simulator):
+    for _ in range(3):
+        name = simulator.add_connection()
+        simulator.connections[('openwire', name)]['Consumers'] = [
+            f'org.apache.activemq:type=Broker,brokerName={simulator.broker_name},destinationType=Queue,destinationName=pytest.queue,endpoint=Consumer,clientId=c{i},consumerId=ID_{i}'
+            for i in range(50)
+        ]
+    simulator.connections[('openwire', name)]['Consumers'] = simulator.connections[('openwire', name)]['Consumers'][:5]
+
+    async with Client('http://simulator', config={'maxCollectionSize': 20}, transport=simulator) as client:
+        broker = client.broker(simulator.broker_name, config={'ignoreErrors': True})
+        simulator.reset_counters()
+        connections = [c async for c in broker.connections(attributes=['ClientId', 'Consumers'])]
+        assert [len(c._attributes['Consumers']) for c in connections] == [20, 20, 5]
+        assert [c.truncated for c in connections] == [['Consumers'], ['Consumers'], []]
+
+        # per call parameters override those of the broker and the client
+        connections = [c async for c in broker.connections(attributes=['ClientId', 'Consumers'], config={'maxCollectionSize': None})]
+        assert [len(c._attributes['Consumers']) for c in connections] == [50, 50, 5]
+        assert all(c.truncated == [] for c in connections)
+        await connections[0].update(attributes=['Consumers'], config={'maxCollectionSize': 10})
+        assert connections[0].truncated == ['Consumers']
+
+        assert await broker.attribute('TransportConnectors', path='openwire') == simulator.transport_connectors['openwire']
+        with pytest.raises(ValueError):
+            await broker.attributes(config={'maxSize': 1})
+
+
+@pytest.mark.asyncio
+async def test_simulated_connections(simulated_broker, simulator):
+    for _ in range(5):
+        simulator.add_connection()
+
+    assert await simulated_broker.connection_count() == 5
+    async for c in simulated_broker.connections():
+        assert type(c) is Connection
+        assert type(c.remote_address) is str
+        assert type(c.active) is bool
+        assert type(c.slow) is bool
+
+
+@pytest.mark.asyncio
+async def test_simulated_subscriptions(simulated_broker, simulator):
+    connections = [simulator.add_connection() for _ in range(3)]
+    for i in range(120):
+        simulator.add_subscription('Consumer', connections[0], f'pytest.queue{i}')
+    simulator.add_subscription('Consumer', connections[1], 'pytest.queue7', selector="color = 'red'")
+    simulator.add_subscription('Consumer', connections[1], 'pytest.topic', destination_type='Topic')
+    simulator.add_subscription('Producer', connections[2], 'pytest.queue7')
+    simulator.reset_counters()
+
+    test_queue = await simulated_broker.queue('pytest.queue7')
+    consumers = [s async for s in test_queue.consumers()]
+    assert all(type(s) is Subscription and s.is_consumer for s in consumers)
+    assert sorted(s.client_id for s in consumers) == ['ID:simulator-client-1', 'ID:simulator-client-2']
+    assert {s.selector for s in consumers} == {None, "color = 'red'"}
+    assert sorted(s.id for s in consumers) == ['ID:simulator-client-1:1:8', 'ID:simulator-client-2:1:121']
+    assert all(s.slow is False for s in consumers)
+    producers = [s async for s in test_queue.producers(attributes=['SentCount'])]
+    assert [(p.client_id, p.sent_count) for p in producers] == [('ID:simulator-client-3', 0)]
+    # the default projections only name attributes which the mbeans expose
+    assert (await simulated_broker.schema(consumers[0].mbean)).validate(Subscription.consumer_attribute)
+    producer = await producers[0].update()
+    assert (await simulated_broker.schema(producer.mbean)).validate(Subscription.producer_attribute)
+    assert producer.id == 'ID:simulator-client-3:1:123'
+    index = simulated_broker.subscription_index
+    assert index.clients('pytest.queue7') == {'ID:simulator-client-1', 'ID:simulator-client-2', 'ID:simulator-client-3'}
+    assert index.clients('pytest.queue7', endpoint='Producer') == {'ID:simulator-client-3'}
+
+    # consumers of a connection are read in pages without reading the Consumers attribute
+    connection = {c.client_id: c async for c in simulated_broker.connections()}['ID:simulator-client-1']
+    simulator.reset_counters()
+    consumers = [s async for s in connection.consumers(attributes=['DispatchedQueueSize'], batch_size=50)]
+    assert len(consumers) == 120
+    assert simulator.operations['read'] == 120
+    # search and three pages; the consumer schema was listed before
+    assert simulator.requests == 4
+    assert len(index.destinations('ID:simulator-client-1')) == 120
+
+    # a complete search replaces the index entries it covers
+    for object_name in list(simulator.subscriptions)[:100]:
+        del simulator.subscriptions[object_name]
+    index = await simulated_broker.index_subscriptions()
+    assert len(index.destinations('ID:simulator-client-1')) == 20
+    assert index.destinations('ID:simulator-client-2') == {('Queue', 'pytest.queue7'), ('Topic', 'pytest.topic')}
+    assert index.clients('pytest.topic', destination_type='Topic') == {'ID:simulator-client-2'}
+
+    with pytest.raises(ActivemqManagerError):
+        [s async for s in test_queue.consumers(attributes=['DoesNotExist'])]
+
+
+@pytest.mark.asyncio
+async def test_simulated_messages(simulated_broker, simulator):
+    for i in range(3):
+        simulator.add_message('pytest.messages', f'message {i}', properties={'index': i})
+    simulator.add_message('pytest.messages', 'bytes message', bytes_message=True)
+
+    test_queue = await simulated_broker.queue('pytest.messages')
+    messages = await test_queue.messages()
+    assert len(messages) == 4
+    for m in messages:
+        assert type(m) is Message
+        assert type(m.timestamp) is datetime
+        assert m.persistent is True
+    assert await messages[0].text() == 'message 0'
+    assert await messages[3].text() == 'bytes message'
+
+    await messages[0].move('pytest.target')
+    await messages[1].delete()
+    await test_queue.update()
+    assert test_queue.size == 2
+    assert (await simulated_broker.queue('pytest.target')).size == 1
+
+
+@pytest.mark.asyncio
+async def test_simulated_jobs(simulated_broker, simulator):
+    start = datetime(2030, 1, 1)
+    for i in range(10):
+        simulator.add_job(next_time=start + timedelta(hours=i))
+
+    assert await simulated_broker.job_count(start=start) == 10
+    async for j in simulated_broker.jobs(start=start):
+        assert type(j) is ScheduledJob
+        assert type(j.next) is datetime
+        await j.delete()
+    assert await simulated_broker.job_count(start=start) == 0
+
+
+@pytest.mark.asyncio
+async def test_simulated_pattern_reads(simulated_broker, simulator):
+    for i in range(50):
+        simulator.add_queue(f'pytest.queue{i}')
+        simulator.add_topic(f'pytest.topic{i}')
+        simulator.add_connection()
+    simulator.add_message('pytest.queue3', 'abcd')
+    simulator.reset_counters()
+
+    queues = {q.name: q async for q in simulated_broker.queues(pattern_read=True)}
+    assert len(queues) == 50
+    assert queues['pytest.queue3'].size == 1
+    assert all(type(q) is Queue and q.broker is simulated_broker for q in queues.values())
+
+    topics = [t async for t in simulated_broker.topics(pattern_read=True)]
+    assert len(topics) == 50
+    assert all(type(t) is Topic and type(t.consumer_count) is int for t in topics)
+    # with ignoreErrors a failed attribute is read back as an "ERROR: ..." string
+    topics[0]._attributes['ConsumerCount'] = 'ERROR: java.lang.IllegalStateException'
+    with pytest.raises(ActivemqManagerError):
+        topics[0].consumer_count
+    del topics[0]._attributes['ConsumerCount']
+    with pytest.raises(ActivemqManagerError):
+        topics[0].consumer_count
+
+    connections = [c async for c in simulated_broker.connections(pattern_read=True)]
+    assert len(connections) == 50
+    assert all(c.type == 'openwire' and type(c.remote_address) is str for c in connections)
+    assert set(connections[0]._attributes) == set(Connection.default_attribute)
+
+    # each collection is hydrated with a single read
+    assert simulator.requests == 3
+    assert simulator.operations['search'] == 0
+
+    # the search + bulk read path returns the same topics
+    assert {t.name async for t in simulated_broker.topics()} == {t.name for t in topics}
+    await (await simulated_broker.topic('pytest.topic0')).delete()
+    with pytest.raises(ActivemqManagerError):
+        await simulated_broker.topic('pytest.topic0')
+
+    # patterns that do not match anything produce an empty result
+    simulator.queues.clear()
+    assert [q async for q in simulated_broker.queues(pattern_read=True)] == []
+
+
+@pytest.mark.asyncio
+async def test_simulated_iter_messages(simulated_broker, simulator):
+    simulator.max_browse_page_size = 100
+    for i in range(2000):
+        simulator.add_message('pytest.messages', f'message {i}', properties={'index': i})
+    # more messages than a single page in the same millisecond
+    for i in range(150):
+        simulator.add_message('pytest.messages', f'burst {i}', timestamp=simulator._clock, priority=i % 10)
+    simulator.add_message('pytest.messages', 'filtered', properties={'skip': 'yes'})
+
+    test_queue = await simulated_broker.queue('pytest.messages')
+    assert len(await test_queue.messages()) == 100
+
+    ids = [m.id async for m in test_queue.iter_messages(page_size=100, concurrency=8)]
+    assert len(ids) == len(set(ids)) == 2151
+    assert set(ids) == set(simulator.queues['pytest.messages'].messages)
+
+    ids = [m.id async for m in test_queue.iter_messages(selector="skip = 'yes'", page_size=100)]
+    assert len(ids) == 1
+
+    # a broker policy which caps pages below browse_page_size is detected from the first page
+    ids = [m.id async for m in test_queue.iter_messages(concurrency=8)]
+    assert len(ids) == len(set(ids)) == 2151
+
+    # stopping early should not leave any browse tasks behind
+    async for m in test_queue.iter_messages(page_size=100):
+        assert type(m) is Message
+        break
+
+
+@pytest.mark.asyncio
+async def test_simulated_streaming(simulated_client, simulated_broker, simulator):
+    simulator.chunk_size = 64
+    for _ in range(500):
+        simulator.add_job()
+    for i in range(50):
+        simulator.add_message('pytest.messages', f'message {i}')
+
+    assert await simulated_broker.job_count() == 500
+    assert len({j.id async for j in simulated_broker.jobs()}) == 500
+    assert len(await (await simulated_broker.queue('pytest.messages')).messages()) == 50
+
+    # an error response has no value so nothing is yielded before the error is raised
+    items = list()
+    with pytest.raises(ActivemqManagerError) as excinfo:
+        async for item in simulated_client.stream_dict_request('read', 'org.apache.activemq:type=Broker,brokerName=missing'):
+            items.append(item)
+    assert excinfo.value.get('status') == 404
+    assert items == []
+
+    # a response which breaks off part way raises after the members which arrived in full
+    simulator.disconnect_after = 4096
+    items = list()
+    with pytest.raises(ActivemqManagerError) as excinfo:
+        async for item in simulated_client.stream_dict_request('exec', simulated_broker._scheduler_mbean, operation='getAllJobs()'):
+            items.append(item)
+    assert excinfo.value.get('endpoint') == simulated_client.endpoint
+    assert 0 < len(items) < 500
+    simulator.disconnect_after = None
+
+    with pytest.raises(ActivemqManagerError) as excinfo:
+        async for _ in simulated_client.stream_list_request('read', f'org.apache.activemq:type=Broker,brokerName={simulated_broker.name}'):
+            pass
+    assert 'list was expected' in str(excinfo.value)
+
+
+@pytest.mark.asyncio
+async def test_simulated_bulk_message_operations(simulated_broker, simulator):
+    messages = [simulator.add_message('pytest.dlq', f'message {i}', properties={'index': i, 'originalDestination': 'pytest.orders'}) for i in range(1000)]
+    simulator.add_message('pytest.dlq', "quote's", properties={'kind': 'other'})
+    test_queue = await simulated_broker.queue('pytest.dlq')
+    simulator.reset_counters()
+
+    # ids are packed into IN selectors and sent with bulk requests
+    assert await test_queue.delete_messages(ids=[m.id for m in messages[:450]]) == 450
+    assert simulator.requests == 1
+    assert simulator.operations['exec:removeMatchingMessages'] == 3
+
+    assert await test_queue.copy_messages('pytest.copy', selector='index >= 900') == 100
+    assert await test_queue.move_messages('pytest.moved', ids=[m.id for m in messages[450:500]]) == 50
+    assert await test_queue.retry_messages(ids=[m.id for m in messages[500:510]]) == 10
+    assert await test_queue.retry_messages(selector='index < 520') == 10
+    assert await test_queue.delete_messages(selector="kind = 'other'") == 1
+    assert await test_queue.retry_messages() == 480
+
+    await test_queue.update()
+    assert test_queue.size == 0
+    assert (await simulated_broker.queue('pytest.copy')).size == 100
+    assert (await simulated_broker.queue('pytest.moved')).size == 50
+    assert (await simulated_broker.queue('pytest.orders')).size == 500
+
+    with pytest.raises(ValueError):
+        await test_queue.delete_messages()
+    with pytest.raises(ValueError):
+        await test_queue.move_messages('pytest.moved', selector='index > 0', ids=[])
+
+
+@pytest.mark.asyncio
+async def test_simulated_delete_jobs(simulated_broker, simulator):
+    now = datetime.now().replace(microsecond=0)
+    job_ids = [simulator.add_job(next_time=now + timedelta(hours=i)) for i in range(1, 301)]
+    simulator.reset_counters()
+
+    assert await simulated_broker.delete_jobs(ids=job_ids[:250]) == 250
+    assert simulator.operations['exec:removeJob'] == 250
+    assert simulator.requests == 3
+    assert await simulated_broker.job_count() == 50
+
+    assert await simulated_broker.delete_jobs(start=now + timedelta(hours=251), end=now + timedelta(hours=260)) == 10
+    assert await simulated_broker.job_count() == 40
+    assert await simulated_broker.delete_jobs() == 40
+    assert await simulated_broker.job_count() == 0
+
+    with pytest.raises(ValueError):
+        await simulated_broker.delete_jobs(start=now, ids=job_ids)
+
+
+@pytest.mark.asyncio
+async def test_simulated_job_shards(simulated_broker, simulator):
+    simulated_broker.job_shard_target = 50
+    # a fixed start keeps the shard boundaries independent of the wall clock
+    start = datetime(2030, 1, 1)
+    for i in range(1000):
+        simulator.add_job(next_time=start + timedelta(minutes=i * 7))
+    # a burst which overflows a shard and has to be split
+    for i in range(600):
+        simulator.add_job(next_time=start + timedelta(days=2, seconds=i // 20))
+    simulator.reset_counters()
+
+    jobs = [j async for j in simulated_broker.jobs(start=start, concurrency=8)]
+    assert len(jobs) == len({j.id for j in jobs}) == 1600
+    assert [j.next for j in jobs] == sorted(j.next for j in jobs)
+    assert simulator.operations['exec:getAllJobs'] > 1
+
+    # a window with few jobs is fetched with a single request
+    simulator.reset_counters()
+    assert await simulated_broker.job_count(start=start, end=start + timedelta(hours=12)) == len(range(0, 12 * 60 + 1, 7))
+    assert simulator.operations['exec:getAllJobs'] == 1
+
+    assert await simulated_broker.job_count(start=start, end=start + timedelta(days=1)) == len([
+        j for j in simulator.jobs.values() if j['next'] <= (start + timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S')
+    ])
+
+    histogram = await simulated_broker.job_histogram(bucket=timedelta(days=1), start=start)
+    assert sum(histogram.values()) == 1600
+    assert histogram[start + timedelta(days=2)] == 600 + len([i for i in range(1000) if 2 * 1440 <= i * 7 < 3 * 1440])
+
+
+@pytest.mark.asyncio
+async def test_simulated_cache(simulator):
+    now = [0.0]
+    cache = RequestCache(maxsize=3, ttl={'Queue': 10.0}, clock=lambda: now[0])
+    simulator.add_message('pytest.queue1', 'abcd')
+    simulator.add_queue('pytest.queue2')
+    simulator.add_queue('pytest.queue3')
+    simulator.add_queue('pytest.queue4')
+
+    async with Client('http://simulator', transport=simulator, cache=cache) as client:
+        broker = client.broker()
+        queue1 = await broker.queue('pytest.queue1')
+        simulator.reset_counters()
+
+        # repeated reads are served from the cache regardless of the object name key order
+        for _ in range(3):
+            await queue1.update()
+        await client.request('read', 'org.apache.activemq:destinationName=pytest.queue1,destinationType=Queue,type=Broker,brokerName=localhost')
+        assert simulator.operations['read'] == 0
+        assert queue1.size == 1
+
+        # entries expire after the ttl of the mbean type
+        now[0] = 11.0
+        await queue1.update()
+        assert simulator.operations['read'] == 1
+
+        # mutations invalidate the entries of the broker
+        await queue1.purge()
+        await queue1.update()
+        assert queue1.size == 0
+        assert simulator.operations['read'] == 2
+
+        # least recently used entries are evicted
+        for name in ('pytest.queue2', 'pytest.queue3', 'pytest.queue4', 'pytest.queue1'):
+            await (await broker.queue(name)).update()
+        assert len(cache) == 3
+        assert cache.evictions > 0
+
+        # bulk requests only send the requests which missed the cache
+        simulator.reset_counters()
+        results = await client.bulk_request([
+            client._payload('read', queue1.mbean, attribute=None),
+            client._payload('read', queue1.mbean, attribute='QueueSize')
+        ])
+        assert results[1] == 0
+        assert simulator.operations['read'] == 1
+
+        cache.invalidate()
+        assert len(cache) == 0
+        assert cache.stats()['hits'] > 0
+
+
+@pytest.mark.asyncio
+async def test_simulated_coalescing(simulated_client, simulated_broker, simulator):
+    simulator.latency = 0.05
+    simulator.add_message('pytest.orders', 'abcd')
+    simulator.reset_counters()
+
+    # identical concurrent reads share a single request
+    queues = await asyncio.gather(*[simulated_broker.queue('pytest.orders') for _ in range(30)])
+    assert all(q.size == 1 for q in queues)
+    assert simulator.operations['search'] == 1
+    assert simulator.operations['read'] == 1
+    assert simulated_client._inflight == {}
+
+    # mutations are never coalesced
+    simulator.reset_counters()
+    await asyncio.gather(*[queues[0].purge() for _ in range(3)])
+    assert simulator.operations['exec'] == 3
+
+    # cancelling one caller does not cancel the shared request for the others
+    simulator.reset_counters()
+    first = asyncio.ensure_future(simulated_broker.attributes())
+    second = asyncio.ensure_future(simulated_broker.attributes())
+    await asyncio.sleep(0.01)
+    first.cancel()
+    assert (await second)['BrokerName'] == simulator.broker_name
+    assert first.cancelled()
+    assert simulator.requests == 1
+
+    # the request is cancelled once every caller is gone
+    task = asyncio.ensure_future(simulated_broker.attributes())
+    await asyncio.sleep(0.01)
+    flights = [flight for flight, _ in simulated_client._inflight.values()]
+    task.cancel()
+    await asyncio.sleep(0.01)
+    assert len(flights) == 1 and flights[0].task.cancelled()
+
+    # a stale request can be cancelled and sent again right away
+    task = asyncio.ensure_future(simulated_broker.attribute('BrokerName'))
+    await asyncio.sleep(0.01)
+    task.cancel()
+    assert await asyncio.ensure_future(simulated_broker.attribute('BrokerName')) == simulator.broker_name
+    assert simulated_client._inflight == {}
+
+    # a caller which joins a flight after an invalidation does not cache its response
+    async with Client('http://simulator', transport=simulator, cache=RequestCache()) as client:
+        broker = client.broker(simulator.broker_name)
+        first = asyncio.ensure_future(broker.attributes())
+        await asyncio.sleep(0.01)
+        client.cache.invalidate()
+        second = asyncio.ensure_future(broker.attributes())
+        await asyncio.gather(first, second)
+        assert len(client.cache) == 0
+
+
+def test_adaptive_limit():
+    limit = AdaptiveLimit(maximum=8, initial=2)
+    for _ in range(100):
+        limit.record(0.01)
+    assert limit.limit == 8
+
+    limit.record(0.01, error=True)
+    assert limit.limit == 4
+    # only one decrease per round trip
+    limit.record(0.01, error=True)
+    assert limit.limit == 4
+
+    with pytest.raises(ValueError):
+        AdaptiveLimit(maximum=0)
+
+
+@pytest.mark.asyncio
+async def test_simulated_fan_out(simulated_broker, simulator):
+    for i in range(50):
+        simulator.add_queue(f'pytest.queue{i}')
+    simulator.latency = 0.01
+
+    # concurrent fan-outs on the same broker do not interfere with each other
+    results = await asyncio.gather(*[
+        asyncio.ensure_future(_collect(simulated_broker.queues(batch_size=5))) for _ in range(3)
+    ])
+    assert all(sorted(q.name for q in queues) == sorted(f'pytest.queue{i}' for i in range(50)) for queues in results)
+    assert 1 <= simulated_broker._limit.limit <= simulated_broker._limit.maximum
+
+    # the first error is raised and the remaining work is cancelled
+    async def _worker(item):
+        if item == 3:
+            raise ActivemqManagerError('pytest')
+        await asyncio.sleep(0.01)
+        return item
+
+    with pytest.raises(ActivemqManagerError):
+        async for _ in fan_out(_worker, range(100), AdaptiveLimit(maximum=4)):
+            pass
+
+
+async def _collect(iterable):
+    return [item async for item in iterable]
+
+
+@pytest.mark.asyncio
+async def test_simulated_fleet():
+    simulators = {f'broker{i}': JolokiaSimulator(broker_name=f'broker{i}') for i in range(4)}
+    for name, simulator in simulators.items():
+        simulator.add_queue(f'{name}.queue')
+        simulator.add_connection()
+    simulators['broker0'].add_network_bridge('broker1', 'tcp://broker1:61616')
+    simulators['broker1'].add_network_bridge('broker2', 'tcp://broker2:61616')
+    simulators['broker1'].add_network_bridge('broker0', 'tcp://broker0:61616')
+    simulators['broker3'].latency = 0.5
+    router = JolokiaRouter(simulators)
+
+    async with Fleet(['http://broker0:8161', 'http://broker3:8161', 'http://offline:8161'], timeout=0.2, transport=router) as fleet:
+        assert [broker.name for broker in fleet.brokers] == ['broker0']
+        assert set(fleet.errors) == {'http://broker3:8161', 'http://offline:8161'}
+
+        # peers are discovered through the network bridges of each broker
+        discovered = await fleet.discover()
+        assert sorted(broker.name for broker in discovered) == ['broker1', 'broker2']
+
+        results = [result async for result in fleet.queues()]
+        assert {result.broker.name: [q.name for q in result.value] for result in results} == {
+            'broker0': ['broker0.queue'],
+            'broker1': ['broker1.queue'],
+            'broker2': ['broker2.queue']
+        }
+        assert {result.source for result in results} == {'http://broker0:8161', 'http://broker1:8161', 'http://broker2:8161'}
+
+        # a slow broker times out without holding up the others
+        fleet.timeout = 1.0
+        await fleet.connect()
+        assert 'broker3' in [broker.name for broker in fleet.brokers]
+        results = [result async for result in fleet.connections(timeout=0.2)]
+        assert [result.broker.name for result in results][-1] == 'broker3'
+        assert results[-1].error is not None and results[-1].value is None
+        assert all(len(result.value) == 1 for result in results[:-1])
+
+    # errors other than timeouts, e.g. a login page instead of json, are isolated per broker
+    router.routes['login'] = httpx.MockTransport(lambda request: httpx.Response(200, text='<html>login</html>'))
+    async with Fleet(['http://broker0:8161', 'http://login:8161'], timeout=1.0, transport=router) as fleet:
+        assert [broker.name for broker in fleet.brokers] == ['broker0']
+        assert fleet.errors['http://login:8161'].get('source') == 'http://login:8161'
+
+        router.routes['broker0'] = router.routes['login']
+        results = [result async for result in fleet.attributes()]
+        assert len(results) == 1 and results[0].value is None
+        assert results[0].error.get('broker') == 'broker0'
+
+
+@pytest.mark.asyncio
+async def test_simulated_fleet_proxy():
+    agent = JolokiaSimulator(broker_name='agent')
+    for i in range(3):
+        agent.proxy_targets[f'service:jmx:rmi:///jndi/rmi://broker{i}:1099/jmxrmi'] = JolokiaSimulator(broker_name=f'broker{i}')
+    agent.proxy_targets['service:jmx:rmi:///jndi/rmi://broker0:1099/jmxrmi'].add_network_bridge('broker2', '/broker2:61616')
+
+    fleet = Fleet(
+        proxy='http://agent',
+        targets=['service:jmx:rmi:///jndi/rmi://broker0:1099/jmxrmi', {'url': 'service:jmx:rmi:///jndi/rmi://broker1:1099/jmxrmi'}],
+        concurrency=2,
+        transport=agent
+    )
+    async with fleet:
+        assert sorted(broker.name for broker in fleet.brokers) == ['broker0', 'broker1']
+        assert [broker.name for broker in await fleet.discover()] == ['broker2']
+        results = {result.broker.name: result.value async for result in fleet.attribute('BrokerName')}
+        assert results == {'broker0': 'broker0', 'broker1': 'broker1', 'broker2': 'broker2'}
+        assert agent.requests > 0
+
+
+@pytest.mark.asyncio
+async def test_simulated_poller(simulated_broker, simulator):
+    for i in range(3):
+        simulator.add_queue(f'pytest.queue{i}')
+    for _ in range(100):
+        simulator.add_message('pytest.queue0', 'abcd')
+
+    clock = [1000.0]
+    poller = simulated_broker.poller(interval=0.01, capacity=4)
+    poller._clock = lambda: clock[0]
+    assert type(poller) is Poller
+
+    await poller.sample()
+    with pytest.raises(ActivemqManagerError):
+        poller.snapshot()
+
+    # 20 messages in and 60 out of queue0 over 10 seconds
+    for _ in range(20):
+        simulator.add_message('pytest.queue0', 'abcd')
+    queue0 = simulator.queues['pytest.queue0']
+    for message_id in list(queue0.messages)[:60]:
+        del queue0.messages[message_id]
+        queue0.dequeue_count += 1
+    clock[0] += 10
+    await poller.sample()
+
+    snapshot = poller.snapshot()
+    assert snapshot.names == ['pytest.queue0', 'pytest.queue1', 'pytest.queue2']
+    assert snapshot.seconds == 10
+    assert list(snapshot.enqueue_rate) == [2.0, 0.0, 0.0]
+    assert list(snapshot.dequeue_rate) == [6.0, 0.0, 0.0]
+    assert list(snapshot.growth) == [-4.0, 0.0, 0.0]
+    assert list(snapshot.time_to_drain)[:2] == [15.0, 0.0]
+    assert snapshot.to_dict()['pytest.queue0']['TimeToDrain'] == 15.0
+    assert simulator.operations['read'] == 2
+
+    # removed queues are dropped once they have been missing for the whole buffer
+    del simulator.queues['pytest.queue2']
+    simulator.add_queue('pytest.queue3')
+    for _ in range(4):
+        clock[0] += 10
+        await poller.sample()
+    assert poller.names == ['pytest.queue0', 'pytest.queue1', 'pytest.queue3']
+    assert len(poller.history('pytest.queue0', 'QueueSize')) == 4
+
+    # the free row is reused instead of growing the buffers
+    simulator.add_queue('pytest.queue4')
+    await poller.sample()
+    assert poller.names == ['pytest.queue0', 'pytest.queue1', 'pytest.queue4', 'pytest.queue3']
+    assert len(poller._columns['QueueSize']) == 4 * 4
+    assert poller.snapshot().names == poller.names
+
+    # async iteration yields a snapshot for every interval
+    poller = simulated_broker.poller(interval=0.01, attributes=['QueueSize'])
+    snapshots = list()
+    async for snapshot in poller:
+        snapshots.append(snapshot)
+        if len(snapshots) == 3:
+            break
+    assert poller.samples == 4
+    assert list(snapshots[-1].growth) == [0.0] * 4
+    with pytest.raises(ActivemqManagerError):
+        snapshots[-1].enqueue_rate
+
+
+@pytest.mark.asyncio
+async def test_simulated_timestamps(simulated_broker, simulator, monkeypatch):
+    # jolokia returns JMSTimestamp as an iso 8601 string with an offset
+    expected = datetime(2022, 1, 5, 15, 30, 20, tzinfo=timezone.utc)
+    for i in range(10):
+        simulator.add_message('pytest.timestamps', f'message {i}', timestamp=int(expected.timestamp()) * 1000 + (i // 5) * 1000)
+
+    # the fast path never falls back to dateparser
+    def _dateparser_parse(timestamp):
+        raise AssertionError(f'dateparser was used for {timestamp}')
+    monkeypatch.setattr(helpers, '_dateparser_parse', _dateparser_parse)
+
+    # a table parses each distinct timestamp once
+    parse_timestamp = helpers.parse_timestamp
+    calls = list()
+    monkeypatch.setattr(helpers, 'parse_timestamp', lambda timestamp: calls.append(timestamp) or parse_timestamp(timestamp))
+    test_queue = await simulated_broker.queue('pytest.timestamps')
+    messages = await test_queue.messages()
+    assert list(messages.timestamps) == [int(expected.timestamp() * 1000)] * 5 + [int(expected.timestamp() * 1000) + 1000] * 5
+    assert len(calls) == 2
+
+    # each message parses its timestamp once, the first time it is read
+    calls.clear()
+    monkeypatch.setattr(message_module, 'parse_timestamp', lambda timestamp: calls.append(timestamp) or parse_timestamp(timestamp))
+    rows = [messages[i] for i in range(10)]
+    assert calls == []
+    assert [m.timestamp for m in rows] == [expected] * 5 + [expected + timedelta(seconds=1)] * 5
+    assert all(m.timestamp.tzinfo is not None for m in rows)
+    assert len(calls) == 10
+
+
+@pytest.mark.asyncio
+async def test_simulated_message_table(simulated_broker, simulator):
+    start = int(datetime.now().timestamp()) * 1000 - 60000
+    for i in range(20):
+        simulator.add_message('pytest.table', 'x' * (i % 7), timestamp=start + i * 1000, properties={'index': i}, persistent=i % 2 == 0, priority=i % 10)
+
+    test_queue = await simulated_broker.queue('pytest.table')
+    messages = await test_queue.messages()
+    assert type(messages) is MessageTable
+    assert len(messages) == 20
+    assert messages.timestamps == sorted(messages.timestamps)
+    assert messages.property_values('index') == [str(i) for i in range(20)]
+
+    # sort, filter and top only reorder the shared columns
+    newest = messages.sort('timestamp', reverse=True)
+    assert newest[0].id == messages[-1].id
+    assert newest._columns is messages._columns
+    assert [m.persistent for m in messages.filter('persistent', lambda p: p)] == [True] * 10
+    assert messages.filter('priority', lambda p: p >= 8).column('priority') == [8, 9, 8, 9]
+    assert messages.top(3, 'size').column('size') == [6, 6, 5]
+    assert messages.top(2, 'timestamp', largest=False).ids == messages.ids[:2]
+    assert messages.select(i < 5 for i in range(20)).ids == messages[:5].ids
+    with pytest.raises(KeyError):
+        messages.column('DoesNotExist')
+
+    # rows are materialized as Message objects only when accessed
+    message = messages[3]
+    assert type(message) is Message
+    assert message.properties == {'index': '3'}
+    assert message.persistent is False
+    assert type(message.timestamp) is datetime
+    assert int(message.timestamp.timestamp() * 1000) == messages.timestamps[3]
+    assert message.timestamp is message.timestamp
+    assert await message.text() == 'xxx'
+    with pytest.raises(AttributeError):
+        message.extra = True
+
+
+@pytest.mark.asyncio
+async def test_simulated_message_body(simulated_broker, simulator, tmp_path):
+    body = 'caf\u00e9 \u2615 ' * 10000
+    simulator.add_message('pytest.bodies', body, bytes_message=True)
+    simulator.add_message('pytest.bodies', body)
+
+    bytes_message, text_message = await (await simulated_broker.queue('pytest.bodies')).messages()
+    for message in (bytes_message, text_message):
+        assert await message.body() == body.encode('utf-8')
+        assert await message.text() == body
+        assert await message.save_body(tmp_path / 'body', chunk_size=1000) == len(body.encode('utf-8'))
+        assert (tmp_path / 'body').read_bytes() == body.encode('utf-8')
+    assert await bytes_message.text(encoding='latin-1') == body.encode('utf-8').decode('latin-1')
+
+    # offset and length are honored and unsigned values are accepted
+    assert Message.decode_byte_array({'offset': 1, 'length': 3, 'data': [0, 104, -61, -87, 0]}) == b'h\xc3\xa9'
+    assert Message.decode_byte_array({'offset': 0, 'length': 2, 'data': [195, 169]}) == b'\xc3\xa9'
+    assert Message.parse_byte_array({'offset': 0, 'length': 2, 'data': [-61, -87]}) == '\u00e9'
+
+    # binary bodies are decoded leniently unless strict decoding is asked for
+    binary = {'offset': 0, 'length': 3, 'data': [104, -1, 105]}
+    assert Message.parse_byte_array(binary) == 'h\ufffdi'
+    with pytest.raises(UnicodeDecodeError):
+        Message.parse_byte_array(binary, errors='strict')
+
+
+@pytest.mark.asyncio
+async def test_simulated_fetch_bodies(simulated_broker, simulator):
+    for i in range(450):
+        simulator.add_message('pytest.dlq', f'message {i}')
+
+    test_queue = await simulated_broker.queue('pytest.dlq')
+    messages = await test_queue.messages()
+    simulator.reset_counters()
+
+    # one bulk request with chunked IN selectors instead of a browse per message
+    assert await test_queue.fetch_bodies(messages[:250]) == 250
+    assert simulator.requests == 1
+    assert simulator.operations['exec:browseMessages'] == 2
+    assert await test_queue.fetch_bodies(messages[:250]) == 0
+    assert [await m.text() for m in messages[:250]] == [f'message {i}' for i in range(250)]
+    assert simulator.requests == 1
+    assert simulated_broker.body_cache.stats()['entries'] == 250
+
+    # bodies are dropped from the cache when their messages leave the queue
+    await messages[0].delete()
+    assert messages[0].id not in simulated_broker.body_cache
+    await test_queue.move_messages('pytest.target', ids=[messages[1].id])
+    assert messages[1].id not in simulated_broker.body_cache
+    await test_queue.copy_messages('pytest.target', ids=[messages[2].id])
+    assert messages[2].id in simulated_broker.body_cache
+    await test_queue.delete_messages(selector="JMSMessageID = 'does-not-exist'")
+    assert len(simulated_broker.body_cache) == 0
+
+    # the cache is bounded by the estimated size of the bodies
+    simulated_broker.body_cache.maxbytes = 5 * (512 + len('message 10'))
+    await test_queue.fetch_bodies(messages[10:20])
+    assert len(simulated_broker.body_cache) == 5
+    assert simulated_broker.body_cache.stats()['evictions'] == 5
+
+    # headers and bodies in one pass
+    simulated_broker.body_cache.invalidate()
+    simulator.reset_counters()
+    messages = [m async for m in test_queue.iter_messages(page_size=100, with_body=True)]
+    requests = simulator.requests
+    # windows are browsed concurrently so the messages are compared by id rather than by position
+    expected = {m.id: m.body for m in simulator.queues['pytest.dlq'].messages.values()}
+    assert len(expected) == 448
+    assert {m.id: await m.text() for m in messages} == expected
+    assert len(messages) == 448
+    assert simulator.requests == requests
+
+
+@pytest.mark.asyncio
+async def test_simulated_snapshot(simulated_broker, simulator, tmp_path):
+    for i in range(3):
+        simulator.add_queue(f'pytest.queue{i}')
+    for i in range(2500):
+        simulator.add_message('pytest.queue1', f'message {i}')
+    simulator.add_topic('pytest.topic')
+    for _ in range(3):
+        simulator.add_connection()
+    now = datetime.now().replace(microsecond=0)
+    for i in range(6):
+        simulator.add_job(next_time=now + timedelta(days=i + 1))
+
+    path = tmp_path / 'broker.snapshot'
+    records = await simulated_broker.snapshot(path, messages=True)
+    simulator.reset_counters()
+
+    async with SnapshotClient(path) as client:
+        broker = client.broker()
+        assert broker.name == simulator.broker_name
+        assert await broker.attribute('BrokerVersion') == simulator.broker_version
+        assert sorted(client.queue_names) == ['pytest.queue0', 'pytest.queue1', 'pytest.queue2']
+
+        for pattern_read in (False, True):
+            queues = {q.name: q async for q in broker.queues(pattern_read=pattern_read)}
+            assert queues['pytest.queue1'].size == 2500
+        assert [t.name async for t in broker.topics()] == ['pytest.topic']
+        assert len([c async for c in broker.connections()]) == 3
+        assert len([c async for c in broker.connections(pattern_read=True)]) == 3
+
+        assert await broker.job_count() == 6
+        assert await broker.job_count(end=now + timedelta(days=3)) == 3
+        assert all(type(job) is ScheduledJob for job in [j async for j in broker.jobs()])
+
+        test_queue = await broker.queue('pytest.queue1')
+        messages = await test_queue.messages()
+        assert len(messages) == 2500
+        assert len({m.id for m in messages}) == 2500
+        assert len([m async for m in test_queue.iter_messages()]) == 2500
+        assert len(await (await broker.queue('pytest.queue0')).messages()) == 0
+
+        # snapshots are read-only and only hold what was recorded
+        with pytest.raises(ActivemqManagerError) as excinfo:
+            await test_queue.purge()
+        assert 'read-only' in str(excinfo.value)
+        with pytest.raises(ActivemqManagerError):
+            await broker.queue('pytest.missing')
+        with pytest.raises(ActivemqManagerError) as excinfo:
+            await test_queue.messages(selector="JMSPriority = 4")
+        assert excinfo.value.get('status') == 404
+
+    # the simulator was not contacted while the snapshot was replayed
+    assert simulator.requests == 0
+    assert records == len(path.read_bytes().splitlines())
+
+
+@pytest.mark.asyncio
+async def test_simulated_instrumentation(simulator):
+    class Recorder(Instrumentation):
+        def __init__(self):
+            self.events = list()
+            self.spans = list()
+
+        def before_request(self, event):
+            self.events.append(('before', event))
+
+        def after_request(self, event):
+            self.events.append(('after', event))
+
+        def span_finished(self, span):
+            self.spans.append(span)
+
+    for i in range(250):
+        simulator.add_queue(f'pytest.queue{i}')
+    metrics, recorder = Metrics(), Recorder()
+    async with Client(endpoint='http://simulator', origin='http://pytest:80', transport=simulator, instruments=[metrics, recorder]) as client:
+        broker = client.broker()
+        assert len([q async for q in broker.queues(batch_size=100)]) == 250
+        with pytest.raises(ActivemqManagerError):
+            await broker.attribute('DoesNotExist')
+
+        # the bulk reads are labelled per request, the failed read with its jolokia status
+        assert metrics.count('read', 'Queue') == 250
+        assert metrics.count('search') == 1
+        assert metrics.count('read', 'Broker', status='404') == 1
+        assert metrics.in_flight == 0
+        rendered = metrics.render()
+        assert 'activemq_manager_request_duration_seconds_bucket{source="http://simulator",operation="read",mbean="Queue",le="+Inf"} 250' in rendered
+        assert 'activemq_manager_bytes_total{source="http://simulator",direction="in"}' in rendered
+
+        assert [kind for kind, _ in recorder.events] == ['before', 'after'] * 5
+        assert all(event.bytes_out > 0 and event.bytes_in > 0 for kind, event in recorder.events if kind == 'after')
+        # the bulk_update fan-out was not started below a span so it is reported on its own
+        assert [s.name for s in recorder.spans] == ['Broker.bulk_update']
+        assert len(recorder.spans[0].children) == 3
+
+        with span('sweep') as sweep:
+            assert len([q async for q in broker.queues(batch_size=100)]) == 250
+        assert len(recorder.spans) == 1
+        names = [s.name for _, s in sweep.walk()]
+        assert names[:3] == ['sweep', 'search Queue', 'Broker.bulk_update']
+        assert names.count('read Queue') == 3
+        assert len(sweep.slowest(2)) == 2
+        assert 'Broker.bulk_update[2]' in sweep.format()
+
+    # errors other than network errors are counted as well and do not leave a request in flight
+    def _failing(request):
+        raise httpx.DecodingError('simulated decoding error', request=request)
+    async with Client(endpoint='http://simulator', transport=httpx.MockTransport(_failing), instruments=[metrics]) as client:
+        with pytest.raises(httpx.DecodingError):
+            await client.broker().attribute('BrokerVersion')
+    assert metrics.in_flight == 0
+    assert metrics.count('read', 'Broker', status='error') == 1
+
+
+@pytest.mark.asyncio
+async def test_simulated_endpoints():
+    # two consoles of the master, the second one faster, and the console of its slave
+    master, console, replica = JolokiaSimulator(latency=0.02), JolokiaSimulator(), JolokiaSimulator(slave=True)
+    for simulator in (master, console, replica):
+        simulator.add_queue('pytest.queue')
+    router = JolokiaRouter({'master': master, 'console': console, 'replica': replica})
+    with pytest.raises(ValueError):
+        Client([], transport=router)
+
+    async with Client(['http://master', 'http://console', 'http://replica'], origin='http://pytest:80', transport=router) as client:
+        broker = client.broker()
+        # the role of every endpoint is probed once, after which reads go to the fastest one
+        # which reaches the master; a slave has no destination mbeans
+        for _ in range(10):
+            await broker.attribute('BrokerVersion')
+        assert [endpoint.master for endpoint in client.endpoints] == [True, True, False]
+        assert master.requests == 1 and console.requests == 11 and replica.requests == 1
+        assert (await broker.queue('pytest.queue')).size == 0
+        assert replica.handle({'type': 'read', 'mbean': (await broker.queue('pytest.queue')).mbean})['status'] == 404
+        assert replica.operations['read'] == 2 and replica.operations['search'] == 0
+
+        # writes go to the first endpoint whose broker is not a slave
+        await (await broker.queue('pytest.queue')).purge()
+        assert master.operations['exec'] == 1 and console.operations['exec'] == 0 and replica.operations['exec'] == 0
+
+        # reads fail over when an endpoint times out; it is skipped until it recovers
+        def _timeout(request):
+            raise httpx.ReadTimeout('simulated timeout', request=request)
+        router.routes['console'] = httpx.MockTransport(_timeout)
+        master.reset_counters()
+        assert await broker.attribute('BrokerVersion') == master.broker_version
+        assert not client.endpoints[1].healthy
+        await broker.attribute('BrokerVersion')
+        assert master.requests == 2
+
+        # writes are not retried when the master is down and reads are not sent on to the slave
+        del router.routes['master']
+        replica.reset_counters()
+        with pytest.raises(ActivemqManagerError) as excinfo:
+            await client.request('exec', 'org.apache.activemq:type=Broker,brokerName=localhost,destinationType=Queue,destinationName=pytest.queue', operation='purge()')
+        assert excinfo.value.get('endpoint') == 'http://master'
+        with pytest.raises(ActivemqManagerError) as excinfo:
+            await broker.attribute('BrokerVersion')
+        assert replica.requests == 0
+
+        # the next write looks for a new master
+        with pytest.raises(ActivemqManagerError) as excinfo:
+            await client.request('exec', 'org.apache.activemq:type=Broker,brokerName=localhost,destinationType=Queue,destinationName=pytest.queue', operation='purge()')
+        assert 'none of the endpoints' in str(excinfo.value)
+
+    # reads slower than the 90th percentile of the fastest endpoint are hedged to the next one
+    first, second = JolokiaSimulator(), JolokiaSimulator(latency=0.02)
+    router = JolokiaRouter({'first': first, 'second': second})
+    async with Client(['http://first', 'http://second'], transport=router, hedge_percentile=0.9) as client:
+        broker = client.broker()
+        for _ in range(20):
+            await broker.attribute('BrokerVersion')
+        assert client.hedged == 0 and second.requests == 1
+        first.latency, second.latency = 1.0, 0.0
+        second.reset_counters()
+        assert await broker.attribute('BrokerVersion') == second.broker_version
+        assert client.hedged == 1 and second.requests == 1
+
+        # the cancelled request counts against the slow endpoint so reads move to the other one
+        for _ in range(20):
+            await broker.attribute('BrokerVersion')
+        assert client.endpoints[0].latency > client.endpoints[1].latency
+        assert client.hedged < 10 and second.requests == 21
+
+
+@pytest.mark.asyncio
+async def test_simulated_codec(simulator):
+    class CountingCodec(JsonCodec):
+        def __init__(self):
+            self.calls = 0
+
+        def loads(self, data):
+            self.calls += 1
+            return super().loads(data)
+
+    with pytest.raises(ValueError):
+        Client('http://simulator', codec='yaml')
+    assert Client('http://simulator', codec='json').codec.name == 'json'
+
+    for i in range(3):
+        simulator.add_queue(f'pytest.queue{i}')
+    codec = CountingCodec()
+    async with Client('http://simulator', origin='http://pytest:80', transport=simulator, codec=codec) as client:
+        broker = client.broker()
+        assert len([q async for q in broker.queues()]) == 3
+        calls = codec.calls
+        assert calls == 2
+
+        # raw responses are returned without being decoded unless they hold an error
+        mbean = 'org.apache.activemq:type=Broker,brokerName=localhost,destinationType=Queue,destinationName=pytest.queue1'
+        content = await client.raw_request('read', mbean, attribute=['Name', 'QueueSize'])
+        assert type(content) is bytes and codec.calls == calls
+        assert codec.loads(content)['value'] == {'Name': 'pytest.queue1', 'QueueSize': 0}
+        with pytest.raises(ActivemqManagerError) as excinfo:
+            await client.raw_request('read', mbean.replace('queue1', 'missing'))
+        assert excinfo.value.get('status') == 404
+        assert codec.calls == calls + 2
+
+    # only the status of the response itself counts, not a status key within its value
+    assert response_status(b'{"value":{"a":{"status":500},"b":[{"status":1}]},"timestamp":1,"status":200}') == 200
+    assert response_status(b'{"status":200,"value":{"a":{"status":500}}}') == 200
+    assert response_status(b'{"error":"x","status":404,"stacktrace":"\\"status\\":500"}') == 404
+    assert response_status(b'{"value":{"status":500}}') is None
+
+
+@pytest.mark.asyncio
+async def test_simulated_destination_registry(simulated_broker, simulator):
+    for name in ('orders.eu', 'orders.us', 'orders.us.retry', 'billing'):
+        simulator.add_queue(name)
+    simulator.add_topic('events')
+    events = list()
+    simulated_broker.destinations.subscribe(events.append)
+
+    assert [q.name async for q in simulated_broker.queues(pattern='orders.*')] == ['orders.eu', 'orders.us', 'orders.us.retry']
+    registry = simulated_broker.destinations
+    assert registry.prefix('orders.us') == ['orders.us', 'orders.us.retry']
+    assert registry.match('orders.??') == ['orders.eu', 'orders.us']
+    assert registry.names() == ['billing', 'orders.eu', 'orders.us', 'orders.us.retry']
+    assert events[0] == DestinationEvent('added', 'Queue', 'billing') and len(events) == 4
+
+    # pretend the mbeans were registered a while ago; the broker answers the next searches with a 304
+    simulator.mbeans_changed -= 10
+    simulator.reset_counters()
+    assert (await simulated_broker.queue('billing')).name == 'billing'
+    assert len([q async for q in simulated_broker.queues()]) == 4
+    assert simulator.operations['search'] == 2
+    assert registry.not_modified == 2
+    with pytest.raises(ActivemqManagerError) as excinfo:
+        await simulated_broker.queue('missing')
+    assert 'queue not found: missing' in str(excinfo.value)
+
+    # a changed mbean tree is searched again and the differences are reported
+    events.clear()
+    await (await simulated_broker.queue('billing')).delete()
+    simulator.add_queue('orders.ca')
+    assert await registry.refresh() is True
+    assert events == [DestinationEvent('added', 'Queue', 'orders.ca'), DestinationEvent('removed', 'Queue', 'billing')]
+    assert not registry.has('billing')
+
+    # topics are tracked separately
+    assert (await simulated_broker.topic('events')).name == 'events'
+    assert registry.names('Topic') == ['events']
+    simulated_broker.destinations.unsubscribe(events.append)